@@ -0,0 +1,49 @@
+"""Batch scoring throughput (rows/sec) as a function of batch size.
+
+    python benchmarks/bench_batch.py --model models/current --sizes 1 100 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from neurocinema import synthetic  # noqa: E402
+from neurocinema.batch import score_chunk  # noqa: E402
+from neurocinema.model import GrossModel  # noqa: E402
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="repeat each size for at least this long")
+    args = parser.parse_args(argv)
+
+    model = GrossModel.load(args.model)
+    columns, _ = synthetic.generate(max(args.sizes), seed=1)
+    for size in args.sizes:
+        chunk = {k: v[:size] for k, v in columns.items()}
+        score_chunk(model, chunk)  # warm-up
+        calls, start = 0, time.perf_counter()
+        while True:
+            score_chunk(model, chunk)
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= args.min_seconds:
+                break
+        print(json.dumps({
+            "batch_size": size,
+            "calls": calls,
+            "ms_per_call": round(elapsed / calls * 1000, 3),
+            "rows_per_sec": round(size * calls / elapsed, 1),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Throughput and tail latency of ``POST /predict`` with and without coalescing.
+
+Starts ``neurocinema.server`` once per ``--window-ms`` value (0 disables
+micro-batching) with the prediction cache off, so every request reaches
+the model, and drives it with the same concurrent keep-alive load:
+
+    python benchmarks/bench_coalesce.py --model models/current --requests 20000 --concurrency 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import urllib.request
+
+from bench_latency import run_load, sample_payloads, wait_for_port
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="artifact directory written by neurocinema.train")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[0.0, 1.0, 2.0])
+    parser.add_argument("--batch-rows", type=int, default=256)
+    parser.add_argument("--queue-size", type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    url = f"http://127.0.0.1:{args.port}/predict"
+    payloads = sample_payloads(args.requests)
+    warmup = sample_payloads(500, seed=99)
+    for window in args.window_ms:
+        cmd = [
+            sys.executable, "-m", "neurocinema.server", "--model", args.model, "--port", str(args.port),
+            "--cache-size", "0", "--batch-window-ms", str(window),
+            "--batch-rows", str(args.batch_rows), "--queue-size", str(args.queue_size),
+        ]
+        proc = subprocess.Popen(cmd, cwd=os.path.join(os.path.dirname(__file__), ".."), stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port("127.0.0.1", args.port)
+            asyncio.run(run_load(url, warmup, args.concurrency))
+            result = asyncio.run(run_load(url, payloads, args.concurrency))
+            with urllib.request.urlopen(f"http://127.0.0.1:{args.port}/health") as fh:
+                batching = json.load(fh).get("batching")
+            result["window_ms"] = window
+            if batching:
+                result["mean_batch_rows"] = round(batching["meanBatchRows"], 1)
+                result["rejected"] = batching["rejected"]
+            print(json.dumps(result))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Feature encoding throughput.
+
+    python benchmarks/bench_encode.py --rows 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from neurocinema import synthetic  # noqa: E402
+from neurocinema.features import FeatureEncoder  # noqa: E402
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    columns, _ = synthetic.generate(args.rows, seed=1)
+    start = time.perf_counter()
+    encoder = FeatureEncoder.fit(columns)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    X = encoder.encode(columns)
+    encode_s = time.perf_counter() - start
+    print(json.dumps({
+        "rows": args.rows,
+        "vocabulary_sizes": {f: len(v) for f, v in encoder.vocabularies.items()},
+        "fit_s": round(fit_s, 3),
+        "encode_s": round(encode_s, 3),
+        "rows_per_sec": round(args.rows / encode_s, 1),
+        "matrix_mb": round(X.nbytes / 2**20, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Latency/throughput benchmark for ``POST /predict``.
+
+Starts ``neurocinema.server`` in a subprocess (or targets ``--url``) and
+fires requests from ``--concurrency`` keep-alive connections:
+
+    python benchmarks/bench_latency.py --model models/current --requests 20000 --concurrency 32
+
+``--unique N`` cycles through only N distinct films, which exercises the
+server's prediction cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from neurocinema import synthetic  # noqa: E402
+
+
+def sample_payloads(n: int, seed: int = 1) -> list[bytes]:
+    columns, _ = synthetic.generate(n, seed=seed)
+    payloads = []
+    for i in range(n):
+        movie = {k: (v[i].item() if hasattr(v[i], "item") else v[i]) for k, v in columns.items()}
+        payloads.append(json.dumps(movie).encode())
+    return payloads
+
+
+async def worker(host: str, port: int, path: str, payloads: list[bytes], latencies: list[float]) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    try:
+        for body in payloads:
+            head = f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            start = time.perf_counter()
+            writer.write(head.encode() + body)
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if b" 200 " not in status_line:
+                errors += 1
+    finally:
+        writer.close()
+    return errors
+
+
+async def run_load(url: str, payloads: list[bytes], concurrency: int) -> dict:
+    parts = urlsplit(url)
+    latencies: list[float] = []
+    shards = [payloads[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(worker(parts.hostname, parts.port, parts.path or "/predict", s, latencies) for s in shards))
+    elapsed = time.perf_counter() - start
+    ms = np.asarray(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": int(sum(errors)),
+        "concurrency": concurrency,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+    }
+
+
+def wait_for_port(host: str, port: int, timeout: float = 30.0) -> None:
+    import socket
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not come up on {host}:{port}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="artifact directory; starts a local server")
+    parser.add_argument("--url", default="http://127.0.0.1:8765/predict")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--unique", type=int, help="distinct films to cycle through (default: all distinct)")
+    args = parser.parse_args(argv)
+
+    proc = None
+    parts = urlsplit(args.url)
+    if args.model:
+        cmd = [sys.executable, "-m", "neurocinema.server", "--model", args.model, "--host", parts.hostname, "--port", str(parts.port)]
+        proc = subprocess.Popen(cmd, cwd=os.path.join(os.path.dirname(__file__), ".."), stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(parts.hostname, parts.port)
+        payloads = sample_payloads(args.unique or args.requests)
+        payloads = (payloads * (args.requests // len(payloads) + 1))[: args.requests]
+        # Warm up with films outside the measured set so they are not cache hits.
+        asyncio.run(run_load(args.url, sample_payloads(200, seed=99), args.concurrency))
+        print(json.dumps(asyncio.run(run_load(args.url, payloads, args.concurrency))))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
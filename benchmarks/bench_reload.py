@@ -0,0 +1,121 @@
+"""Hot model reloads under load: no failed requests, no doubled memory.
+
+Publishes two artifacts into a scratch registry, starts
+``neurocinema.server --registry`` on it and drives ``POST /predict``
+with concurrent keep-alive load while the current version is flipped
+between the two every ``--swap-every`` seconds:
+
+    python benchmarks/bench_reload.py --models models/a models/b --requests 40000 --concurrency 32
+
+Prints the load result, the number of swaps the server completed and its
+anonymous and file-backed resident memory before the load and at peak.
+Exits non-zero if any request failed or a swap was missed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from bench_latency import run_load, sample_payloads, wait_for_port
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from neurocinema.registry import ModelRegistry  # noqa: E402
+
+
+def memory(pid: int) -> dict[str, int]:
+    """Resident anonymous and file-backed memory of ``pid`` in MB."""
+    usage = {}
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                usage[name] = int(value.split()[0]) // 1024
+    return usage
+
+
+def health(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as fh:
+        return json.load(fh)
+
+
+async def flip(registry: ModelRegistry, versions: list[str], every: float, done: asyncio.Event) -> int:
+    swaps = 0
+    while not done.is_set():
+        try:
+            await asyncio.wait_for(done.wait(), every)
+        except asyncio.TimeoutError:
+            swaps += 1
+            registry.activate(versions[swaps % len(versions)])
+    return swaps
+
+
+async def measure(args, url: str, payloads: list[bytes], registry: ModelRegistry, versions: list[str], pid: int) -> dict:
+    done = asyncio.Event()
+    peak = memory(pid)
+
+    async def sample() -> None:
+        while not done.is_set():
+            for name, value in memory(pid).items():
+                peak[name] = max(peak[name], value)
+            await asyncio.sleep(0.05)
+
+    flipper = asyncio.ensure_future(flip(registry, versions, args.swap_every, done))
+    sampler = asyncio.ensure_future(sample())
+    result = await run_load(url, payloads, args.concurrency)
+    done.set()
+    result["swaps_requested"] = await flipper
+    await sampler
+    result["peak_mb"] = peak
+    return result
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs=2, required=True, help="two artifact directories with different versions")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--requests", type=int, default=40000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--swap-every", type=float, default=0.5, help="seconds between version flips")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(root)
+        versions = [registry.publish(path, activate=False) for path in args.models]
+        registry.activate(versions[0])
+        cmd = [
+            sys.executable, "-m", "neurocinema.server", "--registry", root, "--port", str(args.port),
+            "--cache-size", "0", "--reload-interval", str(args.swap_every / 5),
+        ]
+        proc = subprocess.Popen(cmd, cwd=os.path.join(os.path.dirname(__file__), ".."), stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port("127.0.0.1", args.port)
+            url = f"http://127.0.0.1:{args.port}/predict"
+            asyncio.run(run_load(url, sample_payloads(500, seed=99), args.concurrency))
+            before = memory(proc.pid)
+            result = asyncio.run(measure(args, url, sample_payloads(args.requests), registry, versions, proc.pid))
+            # Give the server a moment to pick up the last flip.
+            deadline = time.monotonic() + 10.0
+            while (reloads := health(args.port)["registry"]["reloads"]) < result["swaps_requested"]:
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.05)
+        finally:
+            proc.terminate()
+            proc.wait()
+    result.update(reloads=reloads, before_mb=before)
+    print(json.dumps(result))
+    if result["errors"] or reloads < result["swaps_requested"]:
+        sys.exit("requests failed or reloads were missed")
+
+
+if __name__ == "__main__":
+    main()
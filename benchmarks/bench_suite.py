@@ -0,0 +1,288 @@
+"""Reproducible end-to-end benchmark: encoding, training, inference, cache, memory.
+
+Runs every ``--sizes`` value in a fresh process on seeded synthetic films
+(``neurocinema.synthetic``: the 14 ``movieData`` fields, Zipf-distributed
+talent and a heavy-tailed gross) and records, per size:
+
+    seconds      generate, fit_encoder, encode, talent_index, talent_features,
+                 train (point and quantile models), batch (score_chunk over
+                 every row), single_row_p50/p99 (one film through
+                 predict_distribution) and cache_hit_p50/p99 (validation,
+                 canonical key and cache lookup, as on a server hit)
+    peak_rss_mb  the process's peak resident memory after each stage
+    accuracy     rmse_log / r2_log on the 20% training holdout and the
+                 revenue-category accuracy on fresh films
+
+and writes them as JSON together with the environment they ran in:
+
+    python benchmarks/bench_suite.py --out bench.json
+    python benchmarks/bench_suite.py --baseline bench.json
+    python benchmarks/bench_suite.py --sizes 10000 1000000 10000000 --large --out bench-large.json
+
+With ``--baseline`` a second run is compared size by size; a time or
+memory figure more than ``--tolerance`` (relative) above the baseline, or
+an accuracy figure more than ``--accuracy-tolerance`` (absolute) worse,
+is reported and the exit status is 1 (p99 latencies are reported but
+not compared). Timings and latency percentiles are best of ``--repeat``
+runs (training runs once). Peak memory is about 2 KB per row: the
+default sizes (10k and 1M rows) stay near 2 GB, and sizes above
+``LARGE_ROWS`` (10M rows need about 20 GB) only run with ``--large``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from neurocinema import synthetic  # noqa: E402
+from neurocinema.batch import DEFAULT_CHUNK_ROWS, score_chunk  # noqa: E402
+from neurocinema.cache import PredictionCache, canonical_key  # noqa: E402
+from neurocinema.features import FeatureEncoder, records_to_columns  # noqa: E402
+from neurocinema.model import GrossModel  # noqa: E402
+from neurocinema.schema import FIELDS, prediction_buckets, validate  # noqa: E402
+from neurocinema.talent import TalentIndex  # noqa: E402
+
+SUITE_VERSION = 1
+
+# Metrics where larger is better; everything else is compared as a cost.
+HIGHER_IS_BETTER = ("r2_log", "bucket_accuracy")
+
+# Tail latencies of microsecond calls are too noisy to fail a run on.
+REPORT_ONLY = ("single_row_p99", "cache_hit_p99")
+
+# Films drawn for the single-row and cache-hit loops, and fresh films for accuracy.
+SAMPLE_FILMS = 2000
+HOLDOUT_ROWS = 100_000
+
+# Peak memory is about 2 KB per row; bigger sizes must be asked for with --large.
+DEFAULT_SIZES = (10_000, 1_000_000)
+LARGE_ROWS = 2_000_000
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def best_of(repeat: int, fn) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def latency(repeat: int, fn, items: list) -> list[float]:
+    """Best-of-``repeat`` p50 and p99 seconds per call of ``fn`` over ``items``, with GC off as in timeit."""
+    for item in items[:10]:
+        fn(item)
+    best = [float("inf")] * 2
+    elapsed = np.empty(len(items))
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for i, item in enumerate(items):
+                start = time.perf_counter()
+                fn(item)
+                elapsed[i] = time.perf_counter() - start
+            best = np.minimum(best, np.percentile(elapsed, [50, 99]))
+    finally:
+        gc.enable()
+    return best.round(7).tolist()
+
+
+def run_size(rows: int, seed: int, repeat: int) -> dict:
+    """All measurements for one dataset size, in this process."""
+    seconds: dict[str, float] = {}
+    memory: dict[str, float] = {}
+
+    def stage(name: str, value: float) -> None:
+        seconds[name] = round(value, 6)
+        memory[name] = peak_rss_mb()
+
+    start = time.perf_counter()
+    columns, gross = synthetic.generate(rows, seed=seed)
+    stage("generate", time.perf_counter() - start)
+
+    elapsed, encoder = best_of(repeat, lambda: FeatureEncoder.fit(columns))
+    stage("fit_encoder", elapsed)
+    elapsed, X = best_of(repeat, lambda: encoder.encode(columns))
+    stage("encode", elapsed)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        talent = TalentIndex.create(index_dir, columns, gross)
+        stage("talent_index", time.perf_counter() - start)
+        elapsed, track_records = best_of(repeat, lambda: talent.features(columns, gross))
+        stage("talent_features", elapsed)
+        X = np.hstack([X, track_records])
+        del track_records
+
+        start = time.perf_counter()
+        model = GrossModel.fit_matrix(encoder, X, np.log1p(gross), seed=seed, talent=talent)
+        stage("train", time.perf_counter() - start)
+        del X
+
+        def score_all() -> None:
+            for lo in range(0, rows, DEFAULT_CHUNK_ROWS):
+                score_chunk(model, {f: v[lo : lo + DEFAULT_CHUNK_ROWS] for f, v in columns.items()})
+
+        elapsed, _ = best_of(repeat, score_all)
+        stage("batch", elapsed)
+
+        # Films as the server sees them: JSON-like dicts of Python values.
+        rng = np.random.default_rng(seed + 1)
+        picks = rng.choice(rows, min(SAMPLE_FILMS, rows), replace=False)
+        films = [{f: columns[f][i].item() for f in FIELDS} for i in picks]
+
+        seconds["single_row_p50"], seconds["single_row_p99"] = latency(
+            repeat, lambda film: model.predict_distribution(records_to_columns([film])), films
+        )
+        memory["single_row"] = peak_rss_mb()
+
+        cache = PredictionCache(max_entries=len(films), ttl=3600.0)
+        for film in films:
+            cache.put(model.version, canonical_key(validate(film)), b"{}")
+        seconds["cache_hit_p50"], seconds["cache_hit_p99"] = latency(
+            repeat, lambda film: cache.get(model.version, canonical_key(validate(film))), films
+        )
+        if cache.misses:
+            raise RuntimeError(f"{cache.misses} cache lookups missed")
+
+        holdout, holdout_gross = synthetic.generate(min(HOLDOUT_ROWS, rows), seed=seed + 2)
+        predicted = model.predict(holdout)
+        accuracy = {
+            "rmse_log": round(model.metrics["rmse_log"], 4),
+            "r2_log": round(model.metrics["r2_log"], 4),
+            "bucket_accuracy": round(float(np.mean(
+                prediction_buckets(predicted, model.thresholds) == prediction_buckets(holdout_gross, model.thresholds)
+            )), 4),
+        }
+        vocabulary_sizes = {f: len(v) for f, v in encoder.vocabularies.items()}
+
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "peak_rss_mb": memory,
+        "throughput_rows_per_s": {
+            "encode": round(rows / seconds["encode"], 1),
+            "batch": round(rows / seconds["batch"], 1),
+        },
+        "accuracy": accuracy,
+        "vocabulary_sizes": vocabulary_sizes,
+    }
+
+
+def environment(threads: int | None) -> dict:
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(__file__) or "."
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "threads": threads or os.environ.get("OMP_NUM_THREADS"),
+        "commit": commit,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float, accuracy_tolerance: float) -> list[str]:
+    """Human-readable regressions of ``current`` against ``baseline``, matched by size."""
+    regressions = []
+    previous = {r["rows"]: r for r in baseline["results"]}
+    for result in current["results"]:
+        base = previous.get(result["rows"])
+        if base is None:
+            continue
+        for group in ("seconds", "peak_rss_mb"):
+            for name, value in result[group].items():
+                old = base.get(group, {}).get(name)
+                if name in REPORT_ONLY:
+                    continue
+                if old and value > old * (1 + tolerance):
+                    regressions.append(f"{result['rows']} rows: {group}.{name} {old} -> {value} (+{value / old - 1:.0%})")
+        for name, value in result["accuracy"].items():
+            old = base.get("accuracy", {}).get(name)
+            if old is None:
+                continue
+            worse = old - value if name in HIGHER_IS_BETTER else value - old
+            if worse > accuracy_tolerance:
+                regressions.append(f"{result['rows']} rows: accuracy.{name} {old} -> {value}")
+    return regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--large", action="store_true", help=f"allow sizes above {LARGE_ROWS:,} rows (about 2 KB of memory per row)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="best-of runs for every stage except training")
+    parser.add_argument("--threads", type=int, help="OpenMP threads for training and scoring (default: all cores)")
+    parser.add_argument("--out", help="write the results here (default: stdout)")
+    parser.add_argument("--baseline", help="results of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative increase in time and memory")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.01)
+    parser.add_argument("--worker", type=int, metavar="ROWS", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    large = [rows for rows in args.sizes if rows > LARGE_ROWS]
+    if large and not args.large and args.worker is None:
+        parser.error(f"sizes above {LARGE_ROWS:,} rows need about {max(large) * 2 / 1e6:.0f} GB of memory; pass --large")
+
+    if args.worker is not None:
+        print(json.dumps(run_size(args.worker, args.seed, args.repeat)))
+        return
+
+    env = dict(os.environ)
+    if args.threads:
+        env["OMP_NUM_THREADS"] = str(args.threads)
+    results = []
+    for rows in args.sizes:
+        # A fresh process per size keeps peak memory per size and rules out warm caches.
+        cmd = [sys.executable, __file__, "--worker", str(rows), "--seed", str(args.seed), "--repeat", str(args.repeat)]
+        proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, text=True)
+        if proc.returncode:
+            sys.exit(f"benchmark at {rows} rows failed with exit status {proc.returncode}")
+        results.append(json.loads(proc.stdout.splitlines()[-1]))
+        print(f"{rows} rows done", file=sys.stderr)
+    report = {"suite": SUITE_VERSION, "seed": args.seed, "repeat": args.repeat, "environment": environment(args.threads), "results": results}
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare(report, baseline, args.tolerance, args.accuracy_tolerance)
+        for line in regressions:
+            print("regression:", line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
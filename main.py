@@ -1,6 +1,8 @@
 import React, { useState } from 'react';
 import { Film, DollarSign, Calendar, User, Star, Globe, Building, Clock, TrendingUp, BarChart3, Play, Sparkles, Target, Award } from 'lucide-react';
 
+const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
+
 const MovieRevenueDemo = () => {
   const [currentStep, setCurrentStep] = useState('welcome');
   const [movieData, setMovieData] = useState({
@@ -21,6 +23,7 @@ const MovieRevenueDemo = () => {
   });
   const [prediction, setPrediction] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [error, setError] = useState(null);
 
   const resetDemo = () => {
     setCurrentStep('welcome');
@@ -42,6 +45,7 @@ const MovieRevenueDemo = () => {
     });
     setPrediction(null);
     setIsLoading(false);
+    setError(null);
   };
 
   const handleInputChange = (field, value) => {
@@ -51,52 +55,41 @@ const MovieRevenueDemo = () => {
     }));
   };
 
-  const mockPrediction = (data) => {
-    // Simple mock prediction based on budget and score
-    const budget = parseFloat(data.budget) || 50000000;
-    const score = parseFloat(data.score) || 7.0;
-    const runtime = parseFloat(data.runtime) || 120;
-    const votes = parseFloat(data.votes) || 50000;
-    
-    // Mock calculation (in real app, this would use XGBoost)
-    let basePrediction = budget * 1.5; // Base multiplier
-    
-    // Adjust based on score
-    if (score >= 8.0) basePrediction *= 1.8;
-    else if (score >= 7.0) basePrediction *= 1.4;
-    else if (score >= 6.0) basePrediction *= 1.1;
-    else basePrediction *= 0.8;
-    
-    // Adjust based on genre
-    if (data.genre.toLowerCase().includes('action')) basePrediction *= 1.3;
-    if (data.genre.toLowerCase().includes('comedy')) basePrediction *= 1.2;
-    if (data.genre.toLowerCase().includes('drama')) basePrediction *= 0.9;
-    
-    // Add some randomness
-    basePrediction *= (0.8 + Math.random() * 0.4);
-    
-    return Math.max(basePrediction, 1000000); // Minimum 1M
-  };
-
-  const getPredictionRange = (gross) => {
-    if (gross <= 10000000) return { range: "Low Revenue", color: "text-orange-500", bg: "bg-orange-100" };
-    else if (gross <= 40000000) return { range: "Medium-Low Revenue", color: "text-yellow-500", bg: "bg-yellow-100" };
-    else if (gross <= 70000000) return { range: "Medium Revenue", color: "text-blue-500", bg: "bg-blue-100" };
-    else if (gross <= 120000000) return { range: "Medium-High Revenue", color: "text-indigo-500", bg: "bg-indigo-100" };
-    else if (gross <= 200000000) return { range: "High Revenue", color: "text-purple-500", bg: "bg-purple-100" };
-    else return { range: "Ultra High Revenue", color: "text-green-500", bg: "bg-green-100" };
+  const predictionRanges = [
+    { max: 10000000, range: "Low Revenue", color: "text-orange-500", bg: "bg-orange-100" },
+    { max: 40000000, range: "Medium-Low Revenue", color: "text-yellow-500", bg: "bg-yellow-100" },
+    { max: 70000000, range: "Medium Revenue", color: "text-blue-500", bg: "bg-blue-100" },
+    { max: 120000000, range: "Medium-High Revenue", color: "text-indigo-500", bg: "bg-indigo-100" },
+    { max: 200000000, range: "High Revenue", color: "text-purple-500", bg: "bg-purple-100" },
+    { max: Infinity, range: "Ultra High Revenue", color: "text-green-500", bg: "bg-green-100" },
+  ];
+
+  // The server's label follows the thresholds stored with the model; the
+  // cutoffs here are only a fallback.
+  const getPredictionRange = (gross, probabilities, label) => {
+    const { max, ...bucket } = predictionRanges.find(b => (label ? b.range === label : gross <= b.max));
+    return { ...bucket, probability: probabilities?.[bucket.range] };
   };
 
-  const handlePredict = () => {
+  const handlePredict = async () => {
     setIsLoading(true);
-    // Simulate model training and prediction
-    setTimeout(() => {
-      const predictedGross = mockPrediction(movieData);
-      const prediction = getPredictionRange(predictedGross);
-      setPrediction({ gross: predictedGross, ...prediction });
+    setError(null);
+    try {
+      const response = await fetch(`${API_URL}/predict?explain=1`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(movieData)
+      });
+      const result = await response.json();
+      if (!response.ok) throw new Error(result.error || `Prediction failed (${response.status})`);
+      const prediction = getPredictionRange(result.gross, result.rangeProbabilities, result.range);
+      setPrediction({ gross: result.gross, ...prediction, interval: result.interval, talent: result.talent, similar: result.similar, attributions: result.attributions });
       setCurrentStep('results');
+    } catch (err) {
+      setError(err.message);
+    } finally {
       setIsLoading(false);
-    }, 3000);
+    }
   };
 
   const isFormComplete = () => {
@@ -419,15 +412,16 @@ const MovieRevenueDemo = () => {
             <div className="mt-12 text-center">
               <button
                 onClick={handlePredict}
-                disabled={!isFormComplete()}
+                disabled={!isFormComplete() || isLoading}
                 className={`px-12 py-4 rounded-xl font-bold text-lg transition-all duration-300 transform hover:scale-105 shadow-2xl ${
                   isFormComplete()
                     ? 'bg-gradient-to-r from-red-600 to-red-700 hover:from-red-700 hover:to-red-800 text-white'
                     : 'bg-gray-700 cursor-not-allowed text-gray-400'
                 }`}
               >
-                {isFormComplete() ? 'Generate Prediction' : 'Complete Required Fields'}
+                {isLoading ? 'Analyzing...' : isFormComplete() ? 'Generate Prediction' : 'Complete Required Fields'}
               </button>
+              {error && <p className="mt-4 text-red-400">{error}</p>}
             </div>
           </div>
         </div>
@@ -0,0 +1,24 @@
+"""NeuroCinema box-office prediction backend."""
+
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+__all__ = ["FIELDS", "GrossModel", "ValidationError", "prediction_range", "validate"]
+
+# Imported on first use, so ``python -m neurocinema.<module>`` does not load the
+# module twice (once through the package, once as ``__main__``).
+_EXPORTS = {
+    "GrossModel": ".model",
+    "FIELDS": ".schema",
+    "ValidationError": ".schema",
+    "prediction_range": ".schema",
+    "validate": ".schema",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
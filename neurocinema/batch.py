@@ -0,0 +1,183 @@
+"""Score whole release slates from CSV, JSONL or Parquet.
+
+    python -m neurocinema.batch --model models/current slate.parquet -o scored.csv
+
+Input is read in chunks of ``--chunk-rows``; each chunk is encoded
+column-wise and scored with a single model call, and its results are
+written out before the next chunk is read. ``--explain`` adds each
+prediction's per-field attributions (see ``neurocinema.explain``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import IO, Any, Iterable, Iterator, Sequence
+
+import numpy as np
+
+from .model import GrossModel
+from .schema import FIELDS, REVENUE_LABELS, prediction_buckets
+
+FORMATS = ("csv", "jsonl", "parquet")
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    return "csv"
+
+
+def _columns(rows: list[dict], fields: Sequence[str]) -> dict[str, list]:
+    return {f: [row.get(f, "") for row in rows] for f in fields}
+
+
+def iter_csv(fh: IO[str], chunk_rows: int, fields: Sequence[str] = FIELDS) -> Iterator[dict[str, list]]:
+    rows: list[dict] = []
+    for row in csv.DictReader(fh):
+        rows.append(row)
+        if len(rows) == chunk_rows:
+            yield _columns(rows, fields)
+            rows = []
+    if rows:
+        yield _columns(rows, fields)
+
+
+def iter_jsonl(fh: IO[str], chunk_rows: int, fields: Sequence[str] = FIELDS) -> Iterator[dict[str, list]]:
+    rows: list[dict] = []
+    for n, line in enumerate(fh, 1):
+        if line.strip():
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"line {n} is not a JSON object")
+            rows.append(row)
+        if len(rows) == chunk_rows:
+            yield _columns(rows, fields)
+            rows = []
+    if rows:
+        yield _columns(rows, fields)
+
+
+def iter_parquet(source: Any, chunk_rows: int, fields: Sequence[str] = FIELDS) -> Iterator[dict[str, Any]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet input requires pyarrow (pip install pyarrow)") from None
+    parquet = pq.ParquetFile(source)
+    present = [f for f in fields if f in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=present):
+        yield {name: batch.column(name).to_numpy(zero_copy_only=False) for name in present}
+
+
+def iter_chunks(
+    source: Any, fmt: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, fields: Sequence[str] = FIELDS
+) -> Iterator[dict[str, Any]]:
+    """Yield columnar chunks of ``fields`` from a path or binary file object."""
+    if fmt == "parquet":
+        yield from iter_parquet(source, chunk_rows, fields)
+        return
+    fh = open(source, newline="", encoding="utf-8") if isinstance(source, str) else io.TextIOWrapper(source, "utf-8", newline="")
+    with fh:
+        yield from (iter_csv if fmt == "csv" else iter_jsonl)(fh, chunk_rows, fields)
+
+
+def score_chunk(model: GrossModel, columns: dict[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+    return score_matrix(model, model.encode(columns))
+
+
+def score_matrix(model: GrossModel, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    gross = model.predict_matrix(X)
+    return gross, prediction_buckets(gross, model.thresholds)
+
+
+def format_chunk(
+    columns: dict[str, Any],
+    gross: np.ndarray,
+    buckets: np.ndarray,
+    offset: int,
+    fmt: str,
+    header: bool,
+    attributions: tuple[np.ndarray, float] | None = None,
+) -> bytes:
+    labels = np.asarray(REVENUE_LABELS)[buckets]
+    names = columns.get("name")
+    names = [""] * len(gross) if names is None else names
+    rows = zip(range(offset, offset + len(gross)), names, gross.round(2).tolist(), labels.tolist())
+    if attributions is not None:
+        values, base = attributions
+        rows = ((*row, a) for row, a in zip(rows, values.round(6).tolist()))
+    if fmt == "jsonl":
+        if attributions is None:
+            return "".join(json.dumps({"row": i, "name": n, "gross": g, "range": r}) + "\n" for i, n, g, r in rows).encode()
+        return "".join(
+            json.dumps({"row": i, "name": n, "gross": g, "range": r,
+                        "attributions": {"baseLogGross": base, "fields": dict(zip(FIELDS, a))}}) + "\n"
+            for i, n, g, r, a in rows
+        ).encode()
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        extra = ("base_log_gross", *(f"attr_{f}" for f in FIELDS)) if attributions is not None else ()
+        writer.writerow(("row", "name", "gross", "range", *extra))
+    if attributions is None:
+        writer.writerows(rows)
+    else:
+        writer.writerows((i, n, g, r, base, *a) for i, n, g, r, a in rows)
+    return out.getvalue().encode()
+
+
+def score_stream(
+    model: GrossModel, chunks: Iterable[dict[str, Any]], out_fmt: str, explain: bool = False
+) -> Iterator[tuple[int, bytes]]:
+    """Score each input chunk and yield ``(n_rows, formatted output)``.
+
+    With ``explain`` every row also gets its per-field attributions.
+    """
+    offset = 0
+    for columns in chunks:
+        # Encoded once: with ``explain`` the attributions reuse the scored matrix.
+        X = model.encode(columns)
+        gross, buckets = score_matrix(model, X)
+        attributions = model.explain_matrix(X) if explain else None
+        yield len(gross), format_chunk(columns, gross, buckets, offset, out_fmt, header=offset == 0, attributions=attributions)
+        offset += len(gross)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV, JSONL or Parquet file of movieData rows")
+    parser.add_argument("--model", required=True, help="artifact directory written by neurocinema.train")
+    parser.add_argument("-o", "--output", help="output file (default stdout); .jsonl selects JSON lines")
+    parser.add_argument("--input-format", choices=FORMATS)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--explain", action="store_true", help="add per-field attributions of each prediction")
+    args = parser.parse_args(argv)
+
+    model = GrossModel.load(args.model)
+    in_fmt = args.input_format or detect_format(args.input)
+    out_fmt = "jsonl" if args.output and detect_format(args.output) == "jsonl" else "csv"
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for n, data in score_stream(model, iter_chunks(args.input, in_fmt, args.chunk_rows), out_fmt, args.explain):
+            out.write(data)
+            rows += n
+    finally:
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"scored {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
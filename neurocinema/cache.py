@@ -0,0 +1,94 @@
+"""Server-side cache of single-film predictions."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Mapping
+
+from .features import normalize
+from .schema import FIELDS, NUMERIC_DEFAULTS, NUMERIC_FIELDS
+
+# ``name`` does not influence the prediction, so renaming a film still hits.
+KEY_FIELDS = tuple(f for f in FIELDS if f != "name")
+
+
+def canonical_key(movie: Mapping[str, Any]) -> bytes:
+    """Hash of the normalized fields, equal for payloads the model cannot tell apart."""
+    values = []
+    for field in KEY_FIELDS:
+        value = movie.get(field)
+        if field in NUMERIC_FIELDS:
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                number = NUMERIC_DEFAULTS[field]
+            values.append(number)
+        else:
+            values.append(normalize(field, "" if value is None else str(value)))
+    return hashlib.blake2b(json.dumps(values).encode(), digest_size=16).digest()
+
+
+class PredictionCache:
+    """Bounded LRU cache with a per-entry TTL, scoped to one model version.
+
+    The first lookup under a new model version drops every entry, so a
+    reloaded model never serves predictions made by its predecessor.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.version: str | None = None
+        self._entries: OrderedDict[bytes, tuple[float, Any]] = OrderedDict()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version: str) -> None:
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version: str, key: bytes) -> Any | None:
+        self._check_version(version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def put(self, version: str, key: bytes, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._check_version(version)
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "modelVersion": self.version,
+        }
@@ -0,0 +1,76 @@
+"""Loading historical box-office data."""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from typing import Sequence
+
+import numpy as np
+
+from .features import DictColumn
+from .schema import FIELDS
+
+
+def read_csv(path: str) -> tuple[dict[str, list], np.ndarray]:
+    """Read a movies CSV with the ``movieData`` columns plus ``gross``.
+
+    Rows without a usable ``gross`` are dropped.
+    """
+    columns: dict[str, list] = {f: [] for f in FIELDS}
+    gross: list[float] = []
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            try:
+                value = float(row.get("gross") or "")
+            except ValueError:
+                continue
+            gross.append(value)
+            for field, values in columns.items():
+                values.append(row.get(field) or "")
+    return columns, np.asarray(gross, dtype=np.float64)
+
+
+class Dataset:
+    """Read-only view of a directory written by ``neurocinema.ingest``.
+
+    Columns are memory-mapped on first use; string columns come back as
+    ``DictColumn`` so the encoder and the talent index factorize them for free.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "schema.json")) as fh:
+            schema = json.load(fh)
+        self.n_rows: int = schema["n_rows"]
+        self.types: dict[str, str] = schema["columns"]
+        self._cache: dict[str, np.ndarray | DictColumn] = {}
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def _map(self, name: str, ext: str, dtype: str) -> np.ndarray:
+        if self.n_rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, f"{name}.{ext}"), dtype=dtype, mode="r", shape=(self.n_rows,))
+
+    def column(self, name: str) -> np.ndarray | DictColumn:
+        if name not in self._cache:
+            kind = self.types[name]
+            if kind == "float64":
+                self._cache[name] = self._map(name, "f64", "<f8")
+            elif kind == "datetime64[D]":
+                self._cache[name] = self._map(name, "d64", "<M8[D]")
+            else:
+                with open(os.path.join(self.directory, f"{name}.dict"), encoding="utf-8") as fh:
+                    dictionary = fh.read().splitlines()
+                self._cache[name] = DictColumn(self._map(name, "i32", "<i4"), dictionary)
+        return self._cache[name]
+
+    def columns(self, fields: Sequence[str] = FIELDS) -> dict[str, np.ndarray | DictColumn]:
+        return {f: self.column(f) for f in fields}
+
+    @property
+    def gross(self) -> np.ndarray:
+        return self.column("gross")
@@ -0,0 +1,176 @@
+"""Exact per-feature attributions (Shapley values) of the point model.
+
+Attributions follow path-dependent TreeSHAP: the value of a feature
+subset is the tree's expected output when the remaining features follow
+the training data down each split, using the number of training rows
+that reached every node (``CompiledTrees.cover``). They are exact and
+sum, with ``expected_value``, to the raw log-gross prediction.
+
+Instead of recursing through every tree for every row, each root-to-leaf
+path is summarised once per model. For each distinct feature ``j`` on a
+path, ``z[j]`` is the fraction of training rows that followed the path at
+``j``'s splits, and ``o[j]`` is 1 when the row itself satisfies all of
+them. The path's leaf value ``v`` then adds to feature ``i``::
+
+    v * (o[i] - z[i]) * sum_k k! (d - k - 1)! / d! * e_k
+
+where ``d`` is the number of distinct features on the path and ``e_k``
+is the ``t**k`` coefficient of ``prod_{j != i} (z[j] + o[j] t)``. Paths
+are grouped by ``d``, so a block of rows costs ``O(d**2)`` array
+operations per group over ``(rows, paths)``, independent of the number of
+trees. A path's contribution depends on the row only through its ``d``
+bits ``o``, so for paths with at most ``TABLE_FEATURES`` distinct
+features it is tabulated once for all ``2**d`` patterns and rows just
+look it up.
+
+Feature attributions are summed per ``movieData`` field: the talent track
+record features count towards their director/star/writer/company and
+the release month towards ``released``.
+"""
+
+from __future__ import annotations
+
+from math import factorial
+from typing import Sequence
+
+import numpy as np
+
+from .schema import FIELDS
+from .trees import CompiledTrees
+
+# Rows per block; a block's (d, paths, rows) arrays stay a few MB.
+BLOCK_ROWS = 64
+
+# Paths with up to this many distinct features use a lookup table.
+TABLE_FEATURES = 10
+
+# Model features that are not named after their field.
+FEATURE_FIELDS = {"log_budget": "budget", "log_votes": "votes", "release_month": "released"}
+
+
+def field_of(feature: str) -> str:
+    """The ``movieData`` field a model feature is derived from."""
+    if feature in FEATURE_FIELDS:
+        return FEATURE_FIELDS[feature]
+    return feature if feature in FIELDS else feature.split("_", 1)[0]
+
+
+class TreeExplainer:
+    """Path summaries of one output of a ``CompiledTrees`` ensemble."""
+
+    def __init__(self, trees: CompiledTrees, output: int = 0):
+        if trees.cover is None:
+            raise ValueError("the compiled trees carry no node covers; recompile the model")
+        self.n_features = trees.n_features
+        left, right = trees.left.tolist(), trees.right.tolist()
+        feature, threshold = trees.feature.tolist(), trees.threshold.tolist()
+        missing_left, cover = trees.missing_left.tolist(), trees.cover.tolist()
+        expected = float(trees.baseline[output])
+        groups: dict[int, list[tuple]] = {}
+        for t in np.flatnonzero(trees.output == output).tolist():
+            root = int(trees.roots[t])
+            # Each entry: node, {feature: [lo, hi, nan_ok, z]} along the way there.
+            stack = [(root, {})]
+            while stack:
+                i, conditions = stack.pop()
+                if left[i] < 0:
+                    value = float(trees.value[i])
+                    expected += value * cover[i] / cover[root]
+                    groups.setdefault(len(conditions), []).append((value, conditions))
+                    continue
+                f = feature[i]
+                for child, goes_left in ((left[i], True), (right[i], False)):
+                    lo, hi, nan_ok, z = conditions.get(f, (-np.inf, np.inf, True, 1.0))
+                    if goes_left:
+                        hi = min(hi, threshold[i])
+                    else:
+                        lo = max(lo, threshold[i])
+                    nan_ok = nan_ok and missing_left[i] == goes_left
+                    stack.append((child, {**conditions, f: (lo, hi, nan_ok, z * cover[child] / cover[i])}))
+        self.expected_value = expected
+        self._groups = []
+        for d, paths in sorted(groups.items()):
+            if d == 0:
+                continue  # single-leaf trees only shift the expected value
+            slots = [sorted(c.items()) for _, c in paths]
+            # Slot-major (d, paths) so that per-slot slices are contiguous.
+            feat = np.array([[f for f, _ in s] for s in slots], dtype=np.intp).T
+            lo, hi, nan_ok, z = (np.array([[c[k] for _, c in s] for s in slots]).T[..., None] for k in range(4))
+            # Sums each (slot, path) contribution into its feature column.
+            scatter = np.zeros((feat.size, self.n_features))
+            scatter[np.arange(feat.size), feat.ravel()] = 1.0
+            value = np.array([v for v, _ in paths])[:, None]
+            table = None
+            if d <= TABLE_FEATURES:
+                patterns = (np.arange(2**d) >> np.arange(d)[:, None]) & 1
+                one = np.broadcast_to(patterns[:, None, :].astype(bool), (d, len(paths), 2**d))
+                # Flattened to (d, paths * 2**d) for one gather per slot.
+                table = _path_values(one, z, value).reshape(d, -1)
+            self._groups.append((feat, lo, hi, nan_ok.astype(bool), z, value, scatter, table))
+
+    def shap_values(self, X: np.ndarray) -> np.ndarray:
+        """``(n_rows, n_features)`` attributions in raw (log-gross) units."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got shape {X.shape}")
+        out = np.zeros(X.shape)
+        for start in range(0, len(X), BLOCK_ROWS):
+            columns = np.ascontiguousarray(X[start : start + BLOCK_ROWS].T)
+            for group in self._groups:
+                out[start : start + columns.shape[1]] += self._group_values(columns, *group)
+        return out
+
+    @staticmethod
+    def _group_values(columns, feat, lo, hi, nan_ok, z, value, scatter, table) -> np.ndarray:
+        # Everything is (slot, path, row).
+        x = columns[feat]
+        with np.errstate(invalid="ignore"):
+            one = ((x > lo) & (x <= hi)) | (np.isnan(x) & nan_ok)
+        if table is None:
+            phi = _path_values(one, z, value)
+        else:
+            d = len(one)
+            code = (np.arange(one.shape[1]) << d)[:, None] + one[0]
+            for j in range(1, d):
+                code += one[j].astype(np.intp) << j
+            phi = table.take(code, axis=1)
+        return scatter.T.dot(phi.reshape(-1, x.shape[2])).T
+
+
+def _path_values(one: np.ndarray, z: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """Per-slot contributions ``(d, paths, rows)`` of paths with ``d`` distinct features."""
+    d = len(one)
+    weights = [factorial(k) * factorial(d - k - 1) / factorial(d) for k in range(d)]
+    o = one.astype(np.float64)
+    # Coefficients of prod_j (z_j + o_j t), lowest power first.
+    poly = np.zeros((d + 1, *one.shape[1:]))
+    poly[0] = 1.0
+    for j in range(d):
+        shifted = o[j] * poly[: j + 1]
+        poly[: j + 2] *= z[j]
+        poly[1 : j + 2] += shifted
+    off = sum(w * poly[k] for k, w in enumerate(weights))
+    phi = np.empty(one.shape)
+    for i in range(d):
+        zi = z[i]
+        # Divide out (z_i + t) for rows on the path at i, or z_i otherwise.
+        quotient = poly[d]
+        on = weights[d - 1] * quotient
+        for k in range(d - 1, 0, -1):
+            quotient = poly[k] - zi * quotient
+            on += weights[k - 1] * quotient
+        phi[i] = np.where(one[i], on, off / zi) * (o[i] - zi)
+    return phi * value
+
+
+def field_attributions(
+    explainer: TreeExplainer, X: np.ndarray, feature_names: Sequence[str], fields: Sequence[str] = FIELDS
+) -> np.ndarray:
+    """``(n_rows, len(fields))`` attributions summed per ``movieData`` field."""
+    values = explainer.shap_values(X)
+    index = {field: j for j, field in enumerate(fields)}
+    totals = np.zeros((len(X), len(fields)))
+    for j, name in enumerate(feature_names):
+        totals[:, index[field_of(name)]] += values[:, j]
+    return totals
+
@@ -0,0 +1,193 @@
+"""Turn ``movieData`` fields into the numeric matrix the model is trained on.
+
+String columns are mapped through integer vocabularies that are built once
+at training time and saved next to the model. Encoding works per column:
+each column is factorized with ``np.unique`` so normalization and the
+vocabulary lookup run once per distinct value, never per row.
+
+``name`` is only an identifier and is not a model input.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping, Sequence
+
+import numpy as np
+
+from .schema import FIELDS, NUMERIC_DEFAULTS
+
+MONTHS = (
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december",
+)
+
+# Vocabulary-encoded columns, low-cardinality first.
+CATEGORICAL_FIELDS = ("genre", "rating", "country", "director", "star", "writer", "company")
+NUMERIC_FEATURES = ("log_budget", "runtime", "score", "year", "log_votes", "release_month")
+
+# Id reserved for missing values and anything not in the vocabulary.
+UNKNOWN = 0
+
+_ISO_DATE = re.compile(r"^\s*\d{4}-(\d{1,2})")
+_SPACES = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class DictColumn:
+    """Dictionary-encoded string column: row ``i`` is ``dictionary[codes[i]]``.
+
+    Ingested datasets store strings this way; encoding such a column skips
+    the ``np.unique`` pass because the codes already factorize it.
+    """
+
+    codes: np.ndarray
+    dictionary: Sequence[str]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index: Any) -> "DictColumn":
+        return DictColumn(self.codes[index], self.dictionary)
+
+    def decode(self) -> np.ndarray:
+        return np.asarray(self.dictionary, dtype=str)[self.codes]
+
+
+def records_to_columns(records: Iterable[Mapping[str, Any]]) -> dict[str, list]:
+    """Pivot a list of ``movieData`` dicts into one list per field."""
+    columns: dict[str, list] = {f: [] for f in FIELDS}
+    for record in records:
+        for field, values in columns.items():
+            values.append(record.get(field, ""))
+    return columns
+
+
+def _numbers(values: Sequence[Any], default: float) -> np.ndarray:
+    try:
+        # Whole-column cast; handles numeric arrays and clean numeric strings.
+        out = np.asarray(values).astype(np.float64)
+    except (TypeError, ValueError):
+        out = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                out[i] = default
+    out[~np.isfinite(out)] = default
+    return out
+
+
+def _strings(values: Sequence[Any]) -> np.ndarray:
+    arr = np.asarray(values)
+    if arr.dtype.kind == "O":
+        arr = np.where(np.equal(arr, None), "", arr)
+    return arr.astype(str)
+
+
+def normalize(field: str, value: str) -> str:
+    """Canonical form of one string value: trimmed, lower-case, single spaces.
+
+    ``genre`` keeps only its first entry, so ``"Action, Comedy"`` is ``"action"``.
+    """
+    if field == "genre":
+        value = re.split(r"[,/|]", value, maxsplit=1)[0]
+    return _SPACES.sub(" ", value).strip().lower()
+
+
+def distinct(values: Sequence[Any] | DictColumn) -> tuple[list[str], np.ndarray]:
+    """Distinct raw strings of a column and the row -> distinct index map."""
+    if isinstance(values, DictColumn):
+        return list(values.dictionary), np.asarray(values.codes)
+    uniques, inverse = np.unique(_strings(values), return_inverse=True)
+    return uniques.tolist(), inverse.reshape(-1)
+
+
+def factorize(field: str, values: Sequence[Any] | DictColumn) -> tuple[list[str], np.ndarray]:
+    """Distinct normalized values of a column and the row -> distinct index map."""
+    uniques, inverse = distinct(values)
+    return [normalize(field, u) for u in uniques], inverse
+
+
+def release_month(value: Any) -> int:
+    """Month number from ``"June 13, 1980 (United States)"`` or ISO dates; 0 if unknown."""
+    text = str(value or "").strip().lower()
+    match = _ISO_DATE.match(text)
+    if match:
+        month = int(match.group(1))
+        return month if 1 <= month <= 12 else 0
+    for i, name in enumerate(MONTHS):
+        if text.startswith(name):
+            return i + 1
+    return 0
+
+
+class FeatureEncoder:
+    """Vocabulary-backed encoder from columnar ``movieData`` to ``float32``.
+
+    ``vocabularies[field]`` lists the known values of a string column in id
+    order starting at 1; ids are assigned by descending training frequency
+    (ties broken alphabetically), so refitting on the same data always gives
+    the same ids. Values outside the vocabulary, including blanks, encode
+    as ``UNKNOWN``.
+    """
+
+    def __init__(self, vocabularies: Mapping[str, Sequence[str]]):
+        self.vocabularies = {f: list(vocabularies.get(f, ())) for f in CATEGORICAL_FIELDS}
+        self._ids = {f: {v: i + 1 for i, v in enumerate(vocab)} for f, vocab in self.vocabularies.items()}
+
+    @property
+    def feature_names(self) -> tuple[str, ...]:
+        return NUMERIC_FEATURES + CATEGORICAL_FIELDS
+
+    @classmethod
+    def fit(cls, columns: Mapping[str, Sequence[Any]], min_count: int = 1) -> "FeatureEncoder":
+        """Build vocabularies from training data, dropping values seen fewer than ``min_count`` times."""
+        vocabularies = {}
+        for field in CATEGORICAL_FIELDS:
+            if field not in columns:
+                vocabularies[field] = []
+                continue
+            normalized, inverse = factorize(field, columns[field])
+            counts: dict[str, int] = {}
+            for value, n in zip(normalized, np.bincount(inverse, minlength=len(normalized)).tolist()):
+                if value:
+                    counts[value] = counts.get(value, 0) + n
+            ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            vocabularies[field] = [value for value, n in ranked if n >= min_count]
+        return cls(vocabularies)
+
+    def ids(self, field: str, values: Sequence[Any]) -> np.ndarray:
+        """Vocabulary ids for one string column."""
+        normalized, inverse = factorize(field, values)
+        lookup = self._ids[field]
+        table = np.fromiter((lookup.get(v, UNKNOWN) for v in normalized), dtype=np.int32, count=len(normalized))
+        return table[inverse]
+
+    def encode(self, columns: Mapping[str, Sequence[Any]]) -> np.ndarray:
+        """Encode into a C-contiguous ``(n_rows, len(feature_names))`` ``float32`` matrix."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        blank = [""] * n
+        num = {f: _numbers(columns.get(f, blank), d) for f, d in NUMERIC_DEFAULTS.items()}
+        X = np.empty((n, len(self.feature_names)), dtype=np.float32)
+        X[:, 0] = np.log1p(np.maximum(num["budget"], 0.0))
+        X[:, 1] = num["runtime"]
+        X[:, 2] = num["score"]
+        X[:, 3] = num["year"]
+        X[:, 4] = np.log1p(np.maximum(num["votes"], 0.0))
+        uniques, inverse = distinct(columns.get("released", blank))
+        X[:, 5] = np.array([release_month(u) for u in uniques], dtype=np.float32)[inverse]
+        for j, field in enumerate(CATEGORICAL_FIELDS, start=len(NUMERIC_FEATURES)):
+            X[:, j] = self.ids(field, columns.get(field, blank))
+        return X
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"vocabularies": self.vocabularies}, fh, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureEncoder":
+        with open(path, encoding="utf-8") as fh:
+            return cls(json.load(fh)["vocabularies"])
@@ -0,0 +1,342 @@
+"""Streaming ingestion of historical box-office data into a columnar dataset.
+
+    python -m neurocinema.ingest movies.csv --out data/movies
+    python -m neurocinema.ingest weekend.jsonl --out data/movies --append
+
+The input (CSV, JSONL or Parquet with the ``movieData`` columns plus
+``gross``) flows through a chain of generators one chunk at a time:
+
+    read -> clean -> dedupe -> encode -> write
+
+so memory depends on the chunk size and on the number of distinct
+strings and films, never on the size of the file. The output is a
+directory of raw little-endian column files that ``data.Dataset``
+memory-maps:
+
+    schema.json       row count, column types and dictionary sizes
+    <col>.f64         float64 numbers (NaN when missing)
+    <col>.i32         int32 codes into <col>.dict for string columns
+    <col>.dict        distinct strings, one per line, in code order
+    release_date.d64  parsed ``released`` dates (datetime64[D], NaT if unknown)
+    keys-<rows>.npy   sorted (title, year) hashes used to drop duplicates,
+                      one per row; ``schema.json`` names the current file
+
+A run commits (writes a new keys file, then replaces ``schema.json``)
+only when the whole input was read; a run that fails is rolled back to the rows and
+dictionaries ``schema.json`` already counted, and so is anything an
+interrupted ``--append`` run left behind.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, Mapping
+
+import numpy as np
+
+from . import batch
+from .features import MONTHS, _strings, distinct, normalize
+from .schema import FIELDS, NUMERIC_FIELDS, TEXT_FIELDS
+
+NUMBER_COLUMNS = NUMERIC_FIELDS + ("gross",)
+STRING_COLUMNS = TEXT_FIELDS
+INGEST_FIELDS = FIELDS + ("gross",)
+
+# Rows hashed at a time when the film keys have to be rebuilt from the columns.
+REBUILD_ROWS = 1_000_000
+
+_MONTH_DAY_YEAR = re.compile(r"^([a-z]+)\s+(\d{1,2}),\s*(\d{4})")
+_MONTH_YEAR = re.compile(r"^([a-z]+)\s+(\d{4})")
+_ISO = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})")
+_YEAR = re.compile(r"^(\d{4})\b")
+
+
+def parse_release_date(text: str) -> np.datetime64:
+    """``"June 13, 1980 (United States)"``, ``"June 1980"``, ISO or a bare year."""
+    text = text.strip().lower()
+    try:
+        if m := _ISO.match(text):
+            return np.datetime64(date(int(m[1]), int(m[2]), int(m[3])), "D")
+        if (m := _MONTH_DAY_YEAR.match(text)) and m[1] in MONTHS:
+            return np.datetime64(date(int(m[3]), MONTHS.index(m[1]) + 1, int(m[2])), "D")
+        if (m := _MONTH_YEAR.match(text)) and m[1] in MONTHS:
+            return np.datetime64(date(int(m[2]), MONTHS.index(m[1]) + 1, 1), "D")
+        if m := _YEAR.match(text):
+            return np.datetime64(date(int(m[1]), 1, 1), "D")
+    except ValueError:
+        pass
+    return np.datetime64("NaT", "D")
+
+
+@dataclass
+class IngestStats:
+    rows_read: int = 0
+    rows_dropped: int = 0
+    duplicates: int = 0
+    rows_written: int = 0
+
+
+def _numbers(values: Any) -> np.ndarray:
+    """Like ``features._numbers`` but keeps missing values as NaN."""
+    try:
+        return np.asarray(values).astype(np.float64)
+    except (TypeError, ValueError):
+        uniques, inverse = distinct(values)
+        table = np.empty(len(uniques), dtype=np.float64)
+        for i, text in enumerate(uniques):
+            try:
+                table[i] = float(text.replace(",", "").replace("$", ""))
+            except ValueError:
+                table[i] = np.nan
+        return table[inverse]
+
+
+def read(source: Any, fmt: str, chunk_rows: int) -> Iterator[dict[str, Any]]:
+    return batch.iter_chunks(source, fmt, chunk_rows, INGEST_FIELDS)
+
+
+def clean(chunks: Iterable[Mapping[str, Any]], stats: IngestStats) -> Iterator[dict[str, np.ndarray]]:
+    """Parse numbers and dates, tidy strings, drop rows without a positive gross."""
+    for chunk in chunks:
+        n = len(next(iter(chunk.values())))
+        stats.rows_read += n
+        blank = [""] * n
+        out: dict[str, np.ndarray] = {}
+        for name in NUMBER_COLUMNS:
+            values = _numbers(chunk.get(name, blank))
+            values[~np.isfinite(values)] = np.nan
+            out[name] = values
+        for name in STRING_COLUMNS:
+            uniques, inverse = distinct(chunk.get(name, blank))
+            out[name] = np.asarray([" ".join(u.split()) for u in uniques], dtype=object)[inverse]
+        uniques, inverse = distinct(out["released"])
+        out["release_date"] = np.array([parse_release_date(u) for u in uniques], dtype="datetime64[D]")[inverse]
+        missing_year = np.isnan(out["year"]) & ~np.isnat(out["release_date"])
+        out["year"][missing_year] = out["release_date"][missing_year].astype("datetime64[Y]").astype(int) + 1970
+        keep = out["gross"] > 0
+        stats.rows_dropped += int(n - keep.sum())
+        yield {name: values[keep] for name, values in out.items()}
+
+
+def film_keys(names: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """64-bit hash of (normalized title, year) per row."""
+    labels = np.char.add(np.char.add(_strings(names), "|"), np.nan_to_num(years, nan=-1).astype(np.int64).astype(str))
+    uniques, inverse = np.unique(labels, return_inverse=True)
+    hashed = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(normalize("name", u).encode(), digest_size=8).digest(), "little") for u in uniques.tolist()),
+        dtype=np.uint64,
+        count=len(uniques),
+    )
+    return hashed[inverse.reshape(-1)]
+
+
+class SeenFilms:
+    """Sorted ``uint64`` (title, year) hashes of every film ingested so far."""
+
+    def __init__(self, keys: np.ndarray | None = None):
+        self.keys = np.empty(0, dtype=np.uint64) if keys is None else keys
+
+    def first_sightings(self, keys: np.ndarray) -> np.ndarray:
+        """Mask of rows not seen before (nor earlier in ``keys``); records them."""
+        _, first = np.unique(keys, return_index=True)
+        fresh = np.zeros(len(keys), dtype=bool)
+        fresh[first] = True
+        if len(self.keys):
+            pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            fresh &= self.keys[pos] != keys
+        self.keys = np.union1d(self.keys, keys[fresh])
+        return fresh
+
+
+def dedupe(chunks: Iterable[dict[str, np.ndarray]], seen: SeenFilms, stats: IngestStats) -> Iterator[dict[str, np.ndarray]]:
+    """Drop films whose (title, year) was already seen in this or an earlier run."""
+    for chunk in chunks:
+        keep = seen.first_sightings(film_keys(chunk["name"], chunk["year"]))
+        stats.duplicates += int(len(keep) - keep.sum())
+        yield {name: values[keep] for name, values in chunk.items()}
+
+
+class DatasetWriter:
+    """Appends encoded chunks to the column files of a dataset directory."""
+
+    def __init__(self, directory: str, append: bool = False):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        schema_path = os.path.join(directory, "schema.json")
+        self.n_rows = 0
+        self.dictionaries: dict[str, dict[str, int]] = {name: {} for name in STRING_COLUMNS}
+        self.seen = SeenFilms()
+        self.keys_file: str | None = None
+        dict_bytes = {name: 0 for name in STRING_COLUMNS}
+        if append and os.path.exists(schema_path):
+            with open(schema_path) as fh:
+                schema = json.load(fh)
+            self.n_rows = schema["n_rows"]
+            dict_bytes = schema.get("dict_bytes") or {name: self._complete_lines(name) for name in STRING_COLUMNS}
+            self.keys_file = schema.get("keys", "keys.npy")
+            self.seen = self._load_keys()
+        else:
+            # The column files are truncated below; without a schema nothing trusts them meanwhile.
+            if os.path.exists(schema_path):
+                os.remove(schema_path)
+            for path in self._column_paths():
+                open(path, "wb").close()
+        self._committed = (self.n_rows, dict_bytes)
+        # Drop whatever an interrupted run appended past the committed rows.
+        self._truncate()
+        for name in STRING_COLUMNS:
+            with open(self._path(name, "dict"), encoding="utf-8") as fh:
+                self.dictionaries[name] = {v: i for i, v in enumerate(fh.read().splitlines())}
+        self._files = {name: open(self._path(name, "f64"), "ab") for name in NUMBER_COLUMNS}
+        for name in STRING_COLUMNS:
+            self._files[name] = open(self._path(name, "i32"), "ab")
+            self._files[name + ".dict"] = open(self._path(name, "dict"), "ab")
+        self._files["release_date"] = open(self._path("release_date", "d64"), "ab")
+
+    def _column_paths(self) -> list[str]:
+        paths = [self._path(name, "f64") for name in NUMBER_COLUMNS]
+        paths += [self._path(name, ext) for name in STRING_COLUMNS for ext in ("i32", "dict")]
+        return paths + [self._path("release_date", "d64")]
+
+    def _load_keys(self) -> SeenFilms:
+        """The committed film keys, rebuilt from the name and year columns if they do not match the rows."""
+        try:
+            keys = np.load(os.path.join(self.directory, self.keys_file))
+        except (FileNotFoundError, ValueError):
+            keys = None
+        if keys is not None and len(keys) == self.n_rows:
+            return SeenFilms(keys)
+        with open(self._path("name", "dict"), encoding="utf-8") as fh:
+            names = np.asarray(fh.read().splitlines(), dtype=object)
+        codes = np.memmap(self._path("name", "i32"), dtype="<i4", mode="r", shape=(self.n_rows,)) if self.n_rows else []
+        years = np.memmap(self._path("year", "f64"), dtype="<f8", mode="r", shape=(self.n_rows,)) if self.n_rows else []
+        rebuilt = [np.empty(0, dtype=np.uint64)]
+        for start in range(0, self.n_rows, REBUILD_ROWS):
+            stop = start + REBUILD_ROWS
+            rebuilt.append(film_keys(names[codes[start:stop]], np.asarray(years[start:stop])))
+        return SeenFilms(np.unique(np.concatenate(rebuilt)))
+
+    def _complete_lines(self, name: str) -> int:
+        """Bytes up to the last newline of a dictionary from before sizes were recorded."""
+        with open(self._path(name, "dict"), "rb") as fh:
+            return fh.read().rfind(b"\n") + 1
+
+    def _truncate(self) -> None:
+        n_rows, dict_bytes = self._committed
+        for name in NUMBER_COLUMNS:
+            os.truncate(self._path(name, "f64"), 8 * n_rows)
+        for name in STRING_COLUMNS:
+            os.truncate(self._path(name, "i32"), 4 * n_rows)
+            os.truncate(self._path(name, "dict"), dict_bytes[name])
+        os.truncate(self._path("release_date", "d64"), 8 * n_rows)
+
+    def _path(self, name: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{name}.{ext}")
+
+    def encode(self, chunk: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Dictionary-encode the string columns, growing the dictionaries."""
+        out = {name: chunk[name].astype("<f8") for name in NUMBER_COLUMNS}
+        out["release_date"] = chunk["release_date"].astype("<M8[D]")
+        for name in STRING_COLUMNS:
+            dictionary = self.dictionaries[name]
+            uniques, inverse = distinct(chunk[name])
+            new = [u for u in uniques if u not in dictionary]
+            for value in new:
+                dictionary[value] = len(dictionary)
+            if new:
+                self._files[name + ".dict"].write("".join(v + "\n" for v in new).encode("utf-8"))
+            table = np.fromiter((dictionary[u] for u in uniques), dtype="<i4", count=len(uniques))
+            out[name] = table[inverse]
+        return out
+
+    def write(self, chunk: Mapping[str, np.ndarray]) -> int:
+        encoded = self.encode(chunk)
+        for name, values in encoded.items():
+            self._files[name].write(values.tobytes())
+        n = len(encoded["gross"])
+        self.n_rows += n
+        return n
+
+    def commit(self) -> None:
+        """Close the column files and make the written rows visible to readers."""
+        for fh in self._files.values():
+            fh.close()
+        # A new file per commit: until schema.json names it, the previous one stays in force.
+        keys_file = f"keys-{self.n_rows}.npy"
+        tmp = os.path.join(self.directory, keys_file + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.save(fh, self.seen.keys)
+        os.replace(tmp, os.path.join(self.directory, keys_file))
+        columns = {name: "float64" for name in NUMBER_COLUMNS}
+        columns.update({name: "dict" for name in STRING_COLUMNS})
+        columns["release_date"] = "datetime64[D]"
+        dict_bytes = {name: os.path.getsize(self._path(name, "dict")) for name in STRING_COLUMNS}
+        # Written last: readers only trust rows counted here.
+        tmp = os.path.join(self.directory, "schema.json.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(
+                {
+                    "n_rows": self.n_rows,
+                    "columns": columns,
+                    "dict_bytes": dict_bytes,
+                    "keys": keys_file,
+                    "updated": datetime.now().isoformat(),
+                },
+                fh,
+                indent=2,
+            )
+        os.replace(tmp, os.path.join(self.directory, "schema.json"))
+        self.keys_file = keys_file
+        for name in os.listdir(self.directory):
+            if name.startswith("keys") and name.endswith(".npy") and name != keys_file:
+                os.remove(os.path.join(self.directory, name))
+
+    def rollback(self) -> None:
+        """Close the column files and cut them back to the last committed run."""
+        for fh in self._files.values():
+            fh.close()
+        self._truncate()
+        self.n_rows = self._committed[0]
+
+
+def ingest(source: Any, directory: str, fmt: str = "csv", chunk_rows: int = 100_000, append: bool = False) -> IngestStats:
+    stats = IngestStats()
+    writer = DatasetWriter(directory, append)
+    try:
+        for chunk in dedupe(clean(read(source, fmt, chunk_rows), stats), writer.seen, stats):
+            stats.rows_written += writer.write(chunk)
+    except BaseException:
+        writer.rollback()
+        raise
+    writer.commit()
+    return stats
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV, JSONL or Parquet with the movieData columns plus gross")
+    parser.add_argument("--out", required=True, help="dataset directory")
+    parser.add_argument("--input-format", choices=batch.FORMATS)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--append", action="store_true", help="add to an existing dataset, skipping known films")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    stats = ingest(args.input, args.out, args.input_format or batch.detect_format(args.input), args.chunk_rows, args.append)
+    report = asdict(stats)
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(json.dumps(report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
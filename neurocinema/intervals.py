@@ -0,0 +1,75 @@
+"""P10/P50/P90 gross and revenue-bucket probabilities from quantile models.
+
+Next to the point model, training fits one small quantile-loss booster
+per entry of ``QUANTILES`` on the same encoded matrix and log-gross
+target. Their trees are stacked with the point model's
+(``CompiledTrees.stack``), so one pass over the rows yields the point
+prediction and all three quantiles.
+
+Each quantile is calibrated on the held-out split: the offset added to
+quantile ``q`` is the ``q``-quantile of the held-out residuals, so P10
+and P90 bound 80% of held-out films. The calibrated quantiles are then
+sorted per row so they can never cross.
+
+Bucket probabilities come from a split normal in log space through the
+three quantiles. Its median is P50, and the lower and upper halves have
+the spreads that put P10 and P90 exactly at the 10th and 90th
+percentiles. Evaluating it costs one ``erf`` per bucket threshold, with
+no sampling.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from .schema import REVENUE_THRESHOLDS
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+# Kept small so that point plus intervals costs about 1.5x a point prediction.
+QUANTILE_PARAMS = {
+    "learning_rate": 0.3,
+    "max_iter": 20,
+    "max_leaf_nodes": 15,
+    "min_samples_leaf": 100,
+}
+
+# Standard normal 90th percentile.
+_Z90 = 1.2815515655446004
+
+
+def calibrate(predicted: np.ndarray, y: np.ndarray, quantiles: Sequence[float] = QUANTILES) -> np.ndarray:
+    """Per-quantile offsets making held-out coverage match each quantile."""
+    residual = np.asarray(y, dtype=np.float64)[:, None] - predicted
+    return np.array([np.quantile(residual[:, j], q) for j, q in enumerate(quantiles)])
+
+
+def adjust(raw: np.ndarray, offsets: Sequence[float]) -> np.ndarray:
+    """Calibrated, non-crossing log-gross quantiles from raw model outputs."""
+    return np.maximum.accumulate(raw + np.asarray(offsets), axis=1)
+
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    # Abramowitz & Stegun 7.1.26; absolute error below 1.5e-7.
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-x * x))
+
+
+def bucket_probabilities(log_quantiles: np.ndarray, thresholds: Sequence[float] = REVENUE_THRESHOLDS) -> np.ndarray:
+    """Probability of each ``getPredictionRange`` bucket, ``(n_rows, len(thresholds) + 1)``.
+
+    ``log_quantiles`` holds the calibrated ``log1p`` P10, P50 and P90 per row.
+    """
+    p10, p50, p90 = log_quantiles[:, 0:1], log_quantiles[:, 1:2], log_quantiles[:, 2:3]
+    cuts = np.log1p(np.asarray(thresholds, dtype=np.float64))[None, :]
+    spread = np.where(cuts < p50, p50 - p10, p90 - p50) / _Z90
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (cuts - p50) / np.maximum(spread, 1e-12)
+    cdf = 0.5 * (1.0 + _erf(z / np.sqrt(2.0)))
+    n = len(log_quantiles)
+    return np.diff(np.hstack([np.zeros((n, 1)), cdf, np.ones((n, 1))]), axis=1)
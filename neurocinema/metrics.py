@@ -0,0 +1,205 @@
+"""Per-stage timings of the prediction path in Prometheus text format.
+
+``POST /predict`` is split into stages, each timed into
+``neurocinema_stage_seconds{stage=...}``:
+
+    validation     JSON decoding and the ``isFormComplete`` checks
+    cache_lookup   canonical key and prediction-cache lookup
+    queue          wait for the micro-batcher to start the film's batch
+    encoding       pivoting the batch into columns and encoding it
+    inference      compiled-tree scoring, intervals and bucket probabilities
+    similar        similar-films lookup (with ``--similar-index``)
+    explain        attributions (``?explain=1``)
+    serialization  building the JSON response
+
+Encoding, inference, similar and explain are timed once per model call,
+which covers a whole batch of coalesced films. A stage histogram with a
+growing tail next to a flat request histogram points at the stage behind
+a p99 spike.
+
+``SamplingProfiler`` samples the stacks of threads that are inside a
+stage and prefixes each stack with that stage. Its folded output
+(``stage;frame;frame count``) feeds straight into flame graph tools.
+"""
+
+from __future__ import annotations
+
+import bisect
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+# Seconds; covers sub-millisecond cache hits up to multi-second batches.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+METRICS = {
+    "neurocinema_stage_seconds": ("histogram", "Time spent in each stage of POST /predict."),
+    "neurocinema_http_request_seconds": ("histogram", "Time from a parsed request to its response headers."),
+    "neurocinema_http_requests_total": ("counter", "Requests by route and status."),
+    "neurocinema_predictions_total": ("counter", "Films answered by POST /predict, by cache result."),
+    "neurocinema_batch_rows": ("histogram", "Films scored per model call by the micro-batcher."),
+    "neurocinema_cache_entries": ("gauge", "Predictions held in the cache."),
+    "neurocinema_cache_evictions_total": ("counter", "Cache entries evicted for space."),
+    "neurocinema_batch_queue_depth": ("gauge", "Films waiting for the micro-batcher."),
+    "neurocinema_batch_rejected_total": ("counter", "Films rejected because the batch queue was full."),
+    "neurocinema_model_reloads_total": ("counter", "Registry versions swapped in."),
+    "neurocinema_model_info": ("gauge", "The model version being served."),
+}
+
+BATCH_ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        # First bucket whose upper bound is >= value (Prometheus ``le``).
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Metrics:
+    """Counters, gauges and histograms keyed by metric name and labels.
+
+    Observations may come from the event loop and worker threads alike.
+    ``active`` maps thread ids to the stage they are in, for the profiler.
+    """
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._values: dict[tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+        self.active: dict[int, str] = {}
+
+    def histogram(self, name: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **labels: str) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self.histogram(name, **labels).observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """Set a gauge, or a counter kept elsewhere (e.g. the cache's)."""
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = float(value)
+
+    def clear(self, name: str) -> None:
+        """Drop every label set of a gauge or counter."""
+        with self._lock:
+            self._values = {key: v for key, v in self._values.items() if key[0] != name}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the block into ``neurocinema_stage_seconds{stage=name}``."""
+        thread = threading.get_ident()
+        outer = self.active.get(thread)
+        self.active[thread] = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("neurocinema_stage_seconds", time.perf_counter() - start, stage=name)
+            if outer is None:
+                self.active.pop(thread, None)
+            else:
+                self.active[thread] = outer
+
+    def render(self) -> str:
+        """Everything recorded so far in Prometheus text exposition format 0.0.4."""
+        with self._lock:
+            values = sorted(self._values.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        lines: list[str] = []
+        described: set[str] = set()
+
+        def describe(name: str) -> None:
+            if name not in described:
+                kind, text = METRICS.get(name, ("untyped", ""))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in values:
+            describe(name)
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), histogram in histograms:
+            describe(name)
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, n in zip((*histogram.buckets, float("inf")), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() and abs(value) < 1e15 else repr(float(value))
+
+
+class SamplingProfiler:
+    """Periodically samples the stacks of threads that are inside a stage."""
+
+    def __init__(self, metrics: Metrics, hz: float = 100.0):
+        self.metrics = metrics
+        self.interval = 1.0 / hz
+
+    def run(self, seconds: float) -> Counter:
+        """Sample for ``seconds`` (blocking) and count ``stage;outer;...;inner`` stacks."""
+        samples: Counter = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            active = dict(self.metrics.active)
+            for thread, frame in sys._current_frames().items():
+                stage = active.get(thread)
+                if thread == me or stage is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                samples[";".join([stage, *reversed(stack)])] += 1
+            time.sleep(self.interval)
+        return samples
+
+    @staticmethod
+    def folded(samples: Counter) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in samples.most_common())
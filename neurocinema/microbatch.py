@@ -0,0 +1,130 @@
+"""Coalesce concurrent single-film predictions into one model call.
+
+Each ``/predict`` miss submits its film to a ``MicroBatcher`` and awaits a
+future. A single collector task takes the first waiting film, keeps
+collecting until ``window`` seconds have passed or ``max_rows`` films are
+queued, scores the lot as one matrix in a worker thread and resolves the
+futures. Films that arrive while a batch is being scored are picked up by
+the next one, so batches grow with load on their own.
+
+The window is a trade: every film waits up to ``window`` before its batch
+is scored, which raises tail latency at moderate load (a 2 ms window took
+p99 from about 3 ms to about 8 ms) in exchange for fewer, larger model
+calls when many requests arrive at once. The server leaves it off unless
+``--batch-window-ms`` is set.
+
+The queue is bounded: once ``max_queue`` films are waiting, ``submit``
+raises ``Overloaded`` straight away and the server answers 503 instead of
+letting latency grow without limit.
+
+With ``metrics``, each film's wait until its batch starts is recorded as
+the ``queue`` stage and each batch's size in ``neurocinema_batch_rows``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Sequence
+
+from .metrics import BATCH_ROW_BUCKETS, Metrics
+
+
+class Overloaded(Exception):
+    """The batcher's queue is full."""
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        score: Callable[[list[Any]], Sequence[Any]],
+        window: float = 0.002,
+        max_rows: int = 256,
+        max_queue: int = 4096,
+        metrics: Metrics | None = None,
+    ):
+        self.score = score
+        self.metrics = metrics
+        self.window = window
+        self.max_rows = max_rows
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.batches = self.rows = self.rejected = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item: Any) -> Any:
+        """Score ``item`` with whatever else arrives in the same window."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((item, future, loop.time()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded(f"more than {self.max_queue} predictions queued") from None
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_rows:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            # Callers that gave up (e.g. disconnected) are not scored.
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+            if self.metrics is not None:
+                now = loop.time()
+                waits = self.metrics.histogram("neurocinema_stage_seconds", stage="queue")
+                for _, _, queued in batch:
+                    waits.observe(now - queued)
+                self.metrics.histogram("neurocinema_batch_rows", BATCH_ROW_BUCKETS).observe(len(batch))
+            try:
+                results = await loop.run_in_executor(None, self.score, [item for item, _, _ in batch])
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "windowMs": self.window * 1000.0,
+            "maxRows": self.max_rows,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "maxQueue": self.max_queue,
+            "batches": self.batches,
+            "rows": self.rows,
+            "meanBatchRows": self.rows / self.batches if self.batches else 0.0,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,436 @@
+"""Gradient-boosted gross model and its on-disk artifact."""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import pickle
+import time
+from typing import Any, Iterable, Mapping, Sequence
+
+import numpy as np
+
+from . import intervals
+from .explain import TreeExplainer, field_attributions
+from .features import FeatureEncoder, records_to_columns
+from .schema import REVENUE_LABELS, REVENUE_THRESHOLDS
+from .talent import TalentIndex
+from .trees import CompiledTrees
+
+DEFAULT_PARAMS = {
+    "learning_rate": 0.1,
+    "max_iter": 300,
+    "max_leaf_nodes": 31,
+    "min_samples_leaf": 20,
+    "l2_regularization": 0.0,
+}
+
+# Most boosting rounds ``continue_training`` adds to the point model by default.
+UPDATE_ITER = 100
+
+# Added rounds are small, slow and early-stopped on a fifth of the new films:
+# a week of films is a far smaller and noisier sample than the history.
+# ``min_samples_leaf`` is the cap; ``_update_params`` lowers it for small updates.
+UPDATE_PARAMS = {
+    "learning_rate": 0.05,
+    "max_leaf_nodes": 8,
+    "min_samples_leaf": 50,
+    "early_stopping": True,
+    "validation_fraction": 0.2,
+    "n_iter_no_change": 5,
+}
+
+# Smallest leaf an added round may grow, however few the new films.
+UPDATE_MIN_LEAF = 5
+
+# scikit-learn releases whose HistGradientBoostingRegressor internals
+# ``_add_rounds`` and ``CompiledTrees.from_sklearn`` are known to match:
+# [first, last) by (major, minor).
+SKLEARN_VERSIONS = ((1, 0), (1, 10))
+
+
+class GrossModel:
+    """Predicts worldwide gross (USD) from columnar ``movieData``.
+
+    The estimator is fitted on ``log1p(gross)`` so predictions are mapped
+    back with ``expm1``. With a ``TalentIndex`` the encoded fields are
+    extended with each director/star/writer/company's track record.
+
+    Unless trained without intervals, quantile models for ``QUANTILES``
+    come along and ``predict_distribution`` also returns calibrated
+    P10/P50/P90 gross and revenue-bucket probabilities (see
+    ``neurocinema.intervals``).
+
+    Predictions go through ``CompiledTrees`` when the artifact has them;
+    the pickled estimators (and with them scikit-learn) are then only
+    loaded if ``estimator`` or ``quantile_estimators`` is accessed.
+
+    ``thresholds`` are the revenue-bucket cutoffs (see ``getPredictionRange``)
+    this model's ranges and bucket probabilities use; they are stored in
+    the artifact so a retrained model can move them.
+
+    ``explain`` splits each log-gross prediction into exact per-field
+    Shapley values (see ``neurocinema.explain``).
+
+    ``continue_training`` derives a new model from newly reported films
+    alone by adding boosting rounds to the existing ones (see
+    ``neurocinema.update``).
+    """
+
+    def __init__(
+        self,
+        estimator: Any,
+        encoder: FeatureEncoder,
+        version: str,
+        metrics: Mapping[str, float] | None = None,
+        talent: TalentIndex | None = None,
+        trees: CompiledTrees | None = None,
+        quantile_estimators: Sequence[Any] | None = None,
+        interval_offsets: Sequence[float] | None = None,
+        thresholds: Sequence[float] = REVENUE_THRESHOLDS,
+    ):
+        if len(thresholds) != len(REVENUE_LABELS) - 1:
+            raise ValueError(f"expected {len(REVENUE_LABELS) - 1} revenue thresholds, got {len(thresholds)}")
+        self._estimator = estimator
+        self._estimator_path: str | None = None
+        self._quantile_estimators = quantile_estimators
+        self._quantile_path: str | None = None
+        self.interval_offsets = None if interval_offsets is None else np.asarray(interval_offsets, dtype=np.float64)
+        self.trees = trees
+        self._explainer: TreeExplainer | None = None
+        self.encoder = encoder
+        self.talent = talent
+        self.version = version
+        self.metrics = dict(metrics or {})
+        self.thresholds = tuple(float(t) for t in thresholds)
+
+    @staticmethod
+    def training_matrix(
+        columns: Mapping[str, Sequence[Any]],
+        gross: np.ndarray,
+        talent: TalentIndex | None = None,
+    ) -> tuple[FeatureEncoder, np.ndarray, np.ndarray]:
+        """Fit the encoder and return ``(encoder, X, log1p(gross))`` for training."""
+        encoder = FeatureEncoder.fit(columns)
+        X = encoder.encode(columns)
+        if talent is not None:
+            X = np.hstack([X, talent.features(columns, gross)])
+        return encoder, X, np.log1p(np.asarray(gross, dtype=np.float64))
+
+    @classmethod
+    def train(
+        cls,
+        columns: Mapping[str, Sequence[Any]],
+        gross: np.ndarray,
+        params: Mapping[str, Any] | None = None,
+        seed: int = 0,
+        talent: TalentIndex | None = None,
+        with_intervals: bool = True,
+    ) -> "GrossModel":
+        """Fit on historical films; ``talent`` must already contain them."""
+        encoder, X, y = cls.training_matrix(columns, gross, talent)
+        return cls.fit_matrix(encoder, X, y, params, seed, talent, with_intervals)
+
+    @classmethod
+    def fit_matrix(
+        cls,
+        encoder: FeatureEncoder,
+        X: np.ndarray,
+        y: np.ndarray,
+        params: Mapping[str, Any] | None = None,
+        seed: int = 0,
+        talent: TalentIndex | None = None,
+        with_intervals: bool = True,
+    ) -> "GrossModel":
+        """Fit on an already encoded matrix from ``training_matrix``.
+
+        The point model and the quantile models share the 80% training
+        split; the other 20% gives the metrics and calibrates the quantiles.
+        """
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        from sklearn.model_selection import train_test_split
+
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+        estimator = HistGradientBoostingRegressor(**{**DEFAULT_PARAMS, **(params or {})}, random_state=seed)
+        estimator.fit(X_train, y_train)
+        residual = estimator.predict(X_test) - y_test
+        metrics = {
+            "rmse_log": float(np.sqrt(np.mean(residual**2))),
+            "r2_log": float(estimator.score(X_test, y_test)),
+            "n_train": int(len(y_train)),
+        }
+        quantile_estimators = offsets = None
+        if with_intervals:
+            quantile_estimators = [
+                HistGradientBoostingRegressor(loss="quantile", quantile=q, **intervals.QUANTILE_PARAMS, random_state=seed)
+                .fit(X_train, y_train)
+                for q in intervals.QUANTILES
+            ]
+            held_out = np.column_stack([e.predict(X_test) for e in quantile_estimators])
+            offsets = intervals.calibrate(held_out, y_test)
+            q = intervals.adjust(held_out, offsets)
+            metrics["interval_width_log"] = float(np.mean(q[:, -1] - q[:, 0]))
+        model = cls(
+            estimator, encoder, time.strftime("%Y%m%d-%H%M%S"), metrics, talent,
+            quantile_estimators=quantile_estimators, interval_offsets=offsets,
+        )
+        model.trees = model.compile_trees()
+        return model
+
+    def continue_training(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        X_holdout: np.ndarray,
+        y_holdout: np.ndarray,
+        add_iter: int = UPDATE_ITER,
+    ) -> "GrossModel":
+        """A new model with up to ``add_iter`` more boosting rounds fitted on ``X, y`` only.
+
+        The rounds are boosted from this model's predictions on the new
+        films, so they correct its residuals there without revisiting the
+        history (see ``_add_rounds``). The quantile models get at most a
+        proportional number of rounds; they are recalibrated, and the
+        metrics measured, on the holdout. The encoder is kept: names first
+        seen in the new films encode as unknown until the next full fit,
+        though the talent index knows them.
+        """
+        n_iter = self.estimator.n_iter_
+        point = _add_rounds(self.estimator, X, y, add_iter)
+        estimators = [point]
+        if self.interval_offsets is not None:
+            estimators += [
+                _add_rounds(e, X, y, max(1, round(add_iter * e.n_iter_ / n_iter))) for e in self.quantile_estimators
+            ]
+        residual = point.predict(X_holdout) - y_holdout
+        metrics = {
+            **self.metrics,
+            "rmse_log": float(np.sqrt(np.mean(residual**2))),
+            "r2_log": float(point.score(X_holdout, y_holdout)),
+            "n_train": int(self.metrics.get("n_train", 0)) + len(y),
+            "updated_from": self.version,
+            "rounds_added": point.n_iter_ - n_iter,
+        }
+        offsets = None
+        if self.interval_offsets is not None:
+            held_out = np.column_stack([e.predict(X_holdout) for e in estimators[1:]])
+            offsets = intervals.calibrate(held_out, y_holdout)
+            q = intervals.adjust(held_out, offsets)
+            metrics["interval_width_log"] = float(np.mean(q[:, -1] - q[:, 0]))
+        model = type(self)(
+            point, self.encoder, time.strftime("%Y%m%d-%H%M%S"), metrics, self.talent,
+            quantile_estimators=estimators[1:] or None, interval_offsets=offsets, thresholds=self.thresholds,
+        )
+        model.trees = model.compile_trees()
+        return model
+
+    @property
+    def estimator(self) -> Any:
+        if self._estimator is None and self._estimator_path is not None:
+            with open(self._estimator_path, "rb") as fh:
+                self._estimator = pickle.load(fh)
+        return self._estimator
+
+    @property
+    def quantile_estimators(self) -> Sequence[Any] | None:
+        if self._quantile_estimators is None and self._quantile_path is not None:
+            with open(self._quantile_path, "rb") as fh:
+                self._quantile_estimators = pickle.load(fh)
+        return self._quantile_estimators
+
+    def compile_trees(self) -> CompiledTrees | None:
+        """Point and quantile models as one ``CompiledTrees``, or ``None`` if they cannot be compiled."""
+        estimators = [self.estimator, *(self.quantile_estimators if self.interval_offsets is not None else ())]
+        try:
+            return CompiledTrees.stack([CompiledTrees.from_sklearn(e) for e in estimators])
+        except ValueError:
+            return None  # e.g. more than 64 leaves per tree; predict with the estimators
+
+    @property
+    def feature_names(self) -> tuple[str, ...]:
+        names = self.encoder.feature_names
+        return names + TalentIndex.feature_names() if self.talent is not None else names
+
+    def encode(self, columns: Mapping[str, Sequence[Any]], gross: np.ndarray | None = None) -> np.ndarray:
+        """Model inputs; pass ``gross`` for films in the talent index (out-of-fold track records)."""
+        X = self.encoder.encode(columns)
+        if self.talent is not None:
+            X = np.hstack([X, self.talent.features(columns, gross)])
+        return X
+
+    def predict(self, columns: Mapping[str, Sequence[Any]]) -> np.ndarray:
+        return self.predict_matrix(self.encode(columns))
+
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        raw = self.trees.predict(X) if self.trees is not None else self.estimator.predict(X)
+        return np.maximum(np.expm1(raw), 0.0)
+
+    def predict_distribution(
+        self, columns: Mapping[str, Sequence[Any]]
+    ) -> tuple[np.ndarray, np.ndarray | None, np.ndarray | None]:
+        """``(gross, quantiles, bucket_probabilities)`` from one scoring pass.
+
+        ``quantiles`` is ``(n_rows, len(QUANTILES))`` gross and the bucket
+        probabilities follow ``REVENUE_LABELS``; both are ``None`` for a
+        model trained without intervals.
+        """
+        return self.predict_distribution_matrix(self.encode(columns))
+
+    def predict_distribution_matrix(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray | None, np.ndarray | None]:
+        if self.interval_offsets is None:
+            return self.predict_matrix(X), None, None
+        if self.trees is not None:
+            raw = self.trees.predict_all(X)
+        else:
+            raw = np.column_stack([e.predict(X) for e in (self.estimator, *self.quantile_estimators)])
+        log_q = intervals.adjust(raw[:, 1:], self.interval_offsets)
+        gross = np.maximum(np.expm1(raw[:, 0]), 0.0)
+        return gross, np.maximum(np.expm1(log_q), 0.0), intervals.bucket_probabilities(log_q, self.thresholds)
+
+    @property
+    def explainer(self) -> TreeExplainer:
+        if self._explainer is None:
+            trees = self.trees
+            if trees is None or trees.cover is None:
+                trees = CompiledTrees.from_sklearn(self.estimator)  # artifact predates node covers
+            self._explainer = TreeExplainer(trees)
+        return self._explainer
+
+    def explain(self, columns: Mapping[str, Sequence[Any]]) -> tuple[np.ndarray, float]:
+        """``(attributions, base)`` of the point prediction in ``log1p(gross)``.
+
+        ``attributions`` is ``(n_rows, len(FIELDS))``; ``base`` plus a row's
+        attributions is that row's log-gross prediction before ``expm1``.
+        """
+        return self.explain_matrix(self.encode(columns))
+
+    def explain_matrix(self, X: np.ndarray) -> tuple[np.ndarray, float]:
+        explainer = self.explainer
+        return field_attributions(explainer, X, self.feature_names), explainer.expected_value
+
+    def predict_records(self, records: Iterable[Mapping[str, Any]]) -> np.ndarray:
+        return self.predict(records_to_columns(records))
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "estimator.pkl"), "wb") as fh:
+            pickle.dump(self.estimator, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.interval_offsets is not None:
+            with open(os.path.join(directory, "quantiles.pkl"), "wb") as fh:
+                pickle.dump(list(self.quantile_estimators), fh, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.trees is not None:
+            self.trees.save(os.path.join(directory, "trees"))
+        self.encoder.save(os.path.join(directory, "vocab.json"))
+        meta = {
+            "version": self.version,
+            "features": list(self.feature_names),
+            "metrics": self.metrics,
+            "revenue_thresholds": list(self.thresholds),
+            "talent_index": os.path.abspath(self.talent.directory) if self.talent is not None else None,
+            "intervals": None if self.interval_offsets is None else {
+                "quantiles": list(intervals.QUANTILES),
+                "offsets": self.interval_offsets.tolist(),
+            },
+        }
+        with open(os.path.join(directory, "meta.json"), "w") as fh:
+            json.dump(meta, fh, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, talent_index: str | None = None, reuse: "GrossModel | None" = None) -> "GrossModel":
+        """Load an artifact; ``talent_index`` overrides the index path it was trained with.
+
+        Compiled trees and the talent index are memory-mapped; the pickled
+        estimators are only read if needed. A model being replaced can be
+        passed as ``reuse`` to share its talent index if it is the same one.
+        """
+        with open(os.path.join(directory, "meta.json")) as fh:
+            meta = json.load(fh)
+        trees = None
+        for name in ("trees", "trees.npz"):  # trees.npz: artifacts from before trees/
+            if os.path.exists(os.path.join(directory, name)):
+                trees = CompiledTrees.load(os.path.join(directory, name))
+                break
+        encoder = FeatureEncoder.load(os.path.join(directory, "vocab.json"))
+        talent_index = talent_index or meta.get("talent_index")
+        if reuse is not None and reuse.talent is not None and talent_index and (
+            os.path.abspath(talent_index) == os.path.abspath(reuse.talent.directory)
+        ):
+            talent = reuse.talent
+        else:
+            talent = TalentIndex(talent_index) if talent_index else None
+        offsets = (meta.get("intervals") or {}).get("offsets")
+        model = cls(
+            None, encoder, meta["version"], meta.get("metrics"), talent, trees,
+            interval_offsets=offsets, thresholds=meta.get("revenue_thresholds", REVENUE_THRESHOLDS),
+        )
+        model._estimator_path = os.path.join(directory, "estimator.pkl")
+        model._quantile_path = os.path.join(directory, "quantiles.pkl")
+        return model
+
+
+def _update_params(n_rows: int) -> dict:
+    """``UPDATE_PARAMS`` with ``min_samples_leaf`` scaled to fitting on ``n_rows`` films.
+
+    Early stopping holds out ``validation_fraction`` of them; at 50 films a
+    leaf, the 64 left of a 100-film update could not split at all. The leaf
+    size is capped at half an even split of those rows into
+    ``max_leaf_nodes`` leaves.
+    """
+    params = dict(UPDATE_PARAMS)
+    fitting = int(n_rows * (1 - params["validation_fraction"]))
+    params["min_samples_leaf"] = min(
+        params["min_samples_leaf"], max(UPDATE_MIN_LEAF, fitting // (2 * params["max_leaf_nodes"]))
+    )
+    return params
+
+
+def _check_sklearn() -> None:
+    """Fail before ``_add_rounds`` edits the internals of an untested scikit-learn."""
+    import sklearn
+
+    version = tuple(int(part) for part in sklearn.__version__.split(".")[:2])
+    first, last = SKLEARN_VERSIONS
+    if not first <= version < last:
+        raise RuntimeError(
+            f"continue_training supports scikit-learn >={first[0]}.{first[1]},<{last[0]}.{last[1]}, "
+            f"not {sklearn.__version__}; retrain with neurocinema.train instead"
+        )
+
+
+def _correction(estimator: Any, X: np.ndarray, y: np.ndarray, max_rounds: int) -> Any:
+    """A booster with the same loss fitted to ``estimator``'s residuals over ``X, y``."""
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    params = estimator.get_params()
+    return HistGradientBoostingRegressor(
+        loss=params["loss"], quantile=params["quantile"], max_iter=max_rounds,
+        random_state=params["random_state"], **_update_params(len(y)),
+    ).fit(X, y - estimator.predict(X))
+
+
+def _add_rounds(estimator: Any, X: np.ndarray, y: np.ndarray, max_rounds: int) -> Any:
+    """A copy of ``estimator`` with up to ``max_rounds`` trees boosted on its residuals over ``X, y``.
+
+    scikit-learn's ``warm_start`` cannot do this: it re-bins the new data and
+    then routes it through the old trees by bin index, which only matches
+    the thresholds the trees were grown with for the original data. A
+    separate booster with the same loss is fitted to the residuals instead
+    and its trees are appended. Prediction follows each tree's raw
+    thresholds, so old and new trees add up exactly; the new booster's
+    constant start is folded into its first tree. That relies on private
+    attributes, so the scikit-learn version is checked first and the sum
+    is checked on ``X`` after.
+    """
+    _check_sklearn()
+    correction = _correction(estimator, X, y, max_rounds)
+    predictors = copy.deepcopy(correction._predictors)
+    predictors[0][0].nodes["value"] += float(np.asarray(correction._baseline_prediction).reshape(-1)[0])
+    combined = copy.deepcopy(estimator)
+    combined._predictors = [*combined._predictors, *predictors]
+    expected = estimator.predict(X) + correction.predict(X)
+    if not np.allclose(combined.predict(X), expected, rtol=0.0, atol=1e-9):
+        raise RuntimeError(
+            "appended rounds do not add up under scikit-learn's internals; retrain with neurocinema.train instead"
+        )
+    return combined
@@ -0,0 +1,141 @@
+"""File-based registry of versioned model artifacts.
+
+    python -m neurocinema.registry publish --registry models/ staging/
+    python -m neurocinema.registry list --registry models/
+    python -m neurocinema.registry activate --registry models/ 20250101-120000
+    python -m neurocinema.registry prune --registry models/ --keep 5
+
+Layout::
+
+    models/CURRENT               name of the live version
+    models/versions/<version>/   an artifact written by ``GrossModel.save``:
+                                 trees, vocabularies (vocab.json) and
+                                 revenue-bucket thresholds (meta.json)
+
+Versions are immutable once published. ``publish`` writes or copies the
+artifact into a hidden staging directory and renames it into place, and
+``activate`` replaces ``CURRENT`` with a rename, so readers never see a
+half-written version or pointer. Servers started with ``--registry``
+watch ``CURRENT`` and swap models without restarting (see
+``neurocinema.server``). Pruned versions that a server still has mapped
+stay readable until it lets go of them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import uuid
+
+from .model import GrossModel
+
+
+class ModelRegistry:
+    def __init__(self, root: str):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+
+    def versions(self) -> list[str]:
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir) if not name.startswith("."))
+
+    def current(self) -> str | None:
+        try:
+            with open(os.path.join(self.root, "CURRENT"), encoding="utf-8") as fh:
+                return fh.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path(self, version: str) -> str:
+        path = os.path.join(self.versions_dir, version)
+        if version.startswith(".") or os.sep in version or not os.path.isdir(path):
+            raise KeyError(f"unknown model version {version!r}")
+        return path
+
+    def publish(self, source: str | GrossModel, activate: bool = True) -> str:
+        """Add an artifact directory (or a model) as a new version and return its name."""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = os.path.join(self.versions_dir, f".staging-{uuid.uuid4().hex}")
+        try:
+            if isinstance(source, GrossModel):
+                source.save(staging)
+            else:
+                shutil.copytree(source, staging)
+            with open(os.path.join(staging, "meta.json")) as fh:
+                version = json.load(fh)["version"]
+            if os.path.exists(os.path.join(self.versions_dir, version)):
+                raise ValueError(f"version {version} is already published")
+            os.rename(staging, os.path.join(self.versions_dir, version))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str) -> None:
+        """Point ``CURRENT`` at ``version``; watching servers pick it up."""
+        self.path(version)
+        pointer = os.path.join(self.root, f".CURRENT-{uuid.uuid4().hex}")
+        with open(pointer, "w", encoding="utf-8") as fh:
+            fh.write(version + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(pointer, os.path.join(self.root, "CURRENT"))
+
+    def load(
+        self, version: str | None = None, talent_index: str | None = None, reuse: GrossModel | None = None
+    ) -> GrossModel:
+        """Load ``version`` (default: the current one); see ``GrossModel.load``."""
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"{self.root} has no current model version")
+        return GrossModel.load(self.path(version), talent_index, reuse)
+
+    def prune(self, keep: int) -> list[str]:
+        """Delete all but the newest ``keep`` versions (never the current one)."""
+        current = self.current()
+        versions = self.versions()
+        removed = [v for v in versions[: max(len(versions) - keep, 0)] if v != current]
+        for version in removed:
+            shutil.rmtree(self.path(version))
+        return removed
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("publish", "list", "activate", "prune"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--registry", required=True, help="registry root directory")
+        if name == "publish":
+            cmd.add_argument("artifact", help="artifact directory written by neurocinema.train")
+            cmd.add_argument("--no-activate", action="store_true", help="publish without making it current")
+        elif name == "activate":
+            cmd.add_argument("version")
+        elif name == "prune":
+            cmd.add_argument("--keep", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    try:
+        if args.command == "publish":
+            version = registry.publish(args.artifact, activate=not args.no_activate)
+            print(json.dumps({"version": version, "current": registry.current()}))
+        elif args.command == "list":
+            print(json.dumps({"current": registry.current(), "versions": registry.versions()}))
+        elif args.command == "activate":
+            registry.activate(args.version)
+            print(json.dumps({"current": args.version}))
+        else:
+            print(json.dumps({"removed": registry.prune(args.keep)}))
+    except (KeyError, ValueError) as exc:
+        sys.exit(exc.args[0])
+
+
+if __name__ == "__main__":
+    main()
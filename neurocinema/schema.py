@@ -0,0 +1,90 @@
+"""The ``movieData`` schema shared by the frontend and the scoring service."""
+
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+import numpy as np
+
+# Field order matches the ``movieData`` state in the React component.
+FIELDS = (
+    "released",
+    "writer",
+    "rating",
+    "name",
+    "genre",
+    "director",
+    "star",
+    "country",
+    "company",
+    "runtime",
+    "score",
+    "budget",
+    "year",
+    "votes",
+)
+
+NUMERIC_FIELDS = ("runtime", "score", "budget", "year", "votes")
+TEXT_FIELDS = tuple(f for f in FIELDS if f not in NUMERIC_FIELDS)
+
+# Same fallbacks ``mockPrediction`` used for unparsable numbers.
+NUMERIC_DEFAULTS = {
+    "runtime": 120.0,
+    "score": 7.0,
+    "budget": 50_000_000.0,
+    "year": 2024.0,
+    "votes": 50_000.0,
+}
+
+# Fields ``isFormComplete`` insists on before the predict button is enabled.
+REQUIRED_FIELDS = ("name", "genre", "director", "runtime", "score", "budget", "year", "votes")
+
+# Inclusive upper bounds of the ``getPredictionRange`` buckets, in USD.
+REVENUE_THRESHOLDS = (10_000_000, 40_000_000, 70_000_000, 120_000_000, 200_000_000)
+REVENUE_LABELS = (
+    "Low Revenue",
+    "Medium-Low Revenue",
+    "Medium Revenue",
+    "Medium-High Revenue",
+    "High Revenue",
+    "Ultra High Revenue",
+)
+
+
+class ValidationError(ValueError):
+    """Raised when a ``movieData`` payload cannot be scored."""
+
+
+def validate(movie: Any) -> dict[str, Any]:
+    """Check a single ``movieData`` payload the way ``isFormComplete`` does.
+
+    Returns a copy restricted to the known fields; missing optional fields
+    are filled with empty strings.
+    """
+    if not isinstance(movie, Mapping):
+        raise ValidationError("movieData must be a JSON object")
+    missing = [f for f in REQUIRED_FIELDS if movie.get(f) in (None, "")]
+    if missing:
+        raise ValidationError("missing required fields: " + ", ".join(missing))
+    for field in NUMERIC_FIELDS:
+        value = movie.get(field)
+        if value in (None, ""):
+            continue
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            raise ValidationError(f"{field} must be a number") from None
+    return {f: movie.get(f, "") for f in FIELDS}
+
+
+def prediction_range(gross: float, thresholds=REVENUE_THRESHOLDS) -> str:
+    """Python port of ``getPredictionRange`` returning the bucket label."""
+    for bound, label in zip(thresholds, REVENUE_LABELS):
+        if gross <= bound:
+            return label
+    return REVENUE_LABELS[-1]
+
+
+def prediction_buckets(gross: np.ndarray, thresholds=REVENUE_THRESHOLDS) -> np.ndarray:
+    """Vectorized ``prediction_range``: index into ``REVENUE_LABELS`` per row."""
+    return np.searchsorted(np.asarray(thresholds, dtype=np.float64), gross, side="left")
@@ -0,0 +1,498 @@
+"""Asyncio HTTP scoring service for the React frontend.
+
+    python -m neurocinema.server --model models/current --port 8000
+
+Routes:
+    GET  /health         model version, status, prediction-cache and
+                         micro-batcher counters, registry reloads
+    GET  /metrics        per-stage latency histograms and counters in
+                         Prometheus text format (see ``neurocinema.metrics``)
+    GET  /debug/profile  with ``--profile`` only: ``?seconds=N&hz=H`` samples
+                         the threads inside a prediction stage and returns
+                         folded stacks, each prefixed with its stage
+    POST /predict        body is ``movieData`` (or ``{"movieData": {...}}``);
+                         returns ``{"gross", "range", "modelVersion"}`` plus
+                         ``"interval"`` (P10/P50/P90 gross) and
+                         ``"rangeProbabilities"`` when the model has quantile
+                         models, ``"talent"`` track records when a talent
+                         index is loaded and the ten ``"similar"`` historical
+                         films when a similar-films index is loaded;
+                         ``?explain=1`` adds ``"attributions"``, the exact
+                         per-field Shapley values of the log-gross prediction
+                         (see ``neurocinema.explain``);
+                         repeated payloads are answered from an LRU cache
+                         (``X-Cache: hit|miss``); with
+                         ``--batch-window-ms``, misses from concurrent
+                         requests are scored together (see
+                         ``neurocinema.microbatch``) and get 503 when the
+                         queue is full
+    GET  /talent         ``?field=director|star|writer|company&name=...``;
+                         track record from the talent index
+    POST /predict/batch  body is CSV, JSONL or Parquet (by Content-Type or
+                         ``?format=``); streams one result per row back in
+                         chunks (``?output=jsonl|csv``, ``?chunk_rows=N``,
+                         ``?explain=1``)
+    POST /predict/sweep  body is ``{"movieData": {...}, "sweep": {field: spec}}``
+                         for one or two numeric fields, each a list of values
+                         or ``{"start", "stop", "num", "scale": "linear|log"}``;
+                         returns the gross/ROI surface (see ``neurocinema.sweep``)
+
+Started with ``--registry`` instead of ``--model``, the server serves the
+registry's current version and checks ``CURRENT`` every
+``--reload-interval`` seconds (or on SIGHUP). A new version is loaded and
+warmed up in a worker thread while requests keep going to the old one,
+then swapped in with a single reference assignment. Requests already
+being scored finish on the model they started with, and the old model is
+released when the last of them is done. Artifacts are memory-mapped, so
+the overlap costs little more than the new model's vocabularies.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import signal
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Awaitable, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+from . import batch, sweep
+from .cache import PredictionCache, canonical_key
+from .features import records_to_columns
+from .intervals import QUANTILES
+from .metrics import Metrics, SamplingProfiler
+from .microbatch import MicroBatcher, Overloaded
+from .model import GrossModel
+from .registry import ModelRegistry
+from .schema import FIELDS, REVENUE_LABELS, ValidationError, prediction_range, validate
+from .similar import SimilarFilms
+from .talent import TALENT_FIELDS
+
+MAX_BODY = 256 * 1024 * 1024
+
+BATCH_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+OUTPUT_CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, str]
+    headers: dict[str, str]
+    body: bytes = b""
+
+    def json(self) -> Any:
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            raise HTTPError(400, "request body is not valid JSON") from None
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "application/json"
+    headers: dict[str, str] = field(default_factory=dict)
+    stream: AsyncIterator[bytes] | None = None
+
+    @classmethod
+    def json(cls, payload: Any, status: int = 200) -> "Response":
+        return cls(status, json.dumps(payload).encode())
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+
+class PredictionServer:
+    def __init__(
+        self,
+        model: GrossModel,
+        cache: PredictionCache | None = None,
+        batch_window: float = 0.0,
+        batch_rows: int = 256,
+        queue_size: int = 4096,
+        similar: SimilarFilms | None = None,
+        registry: ModelRegistry | None = None,
+        reload_interval: float = 2.0,
+        talent_index: str | None = None,
+        metrics: Metrics | None = None,
+        profile: bool = False,
+    ):
+        self.model = model
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.cache = cache if cache is not None else PredictionCache()
+        self.similar = similar
+        self.batcher = (
+            MicroBatcher(self.score_movies, batch_window, batch_rows, queue_size, self.metrics) if batch_window > 0 else None
+        )
+        self.registry = registry
+        self.reload_interval = reload_interval
+        self.talent_index = talent_index
+        self.reloads = 0
+        self._reload_lock = asyncio.Lock()
+        self._watcher: asyncio.Task | None = None
+        self.routes: dict[tuple[str, str], Handler] = {
+            ("GET", "/health"): self.health,
+            ("POST", "/predict"): self.predict,
+            ("POST", "/predict/batch"): self.predict_batch,
+            ("POST", "/predict/sweep"): self.predict_sweep,
+            ("GET", "/talent"): self.talent,
+            ("GET", "/metrics"): self.metrics_text,
+        }
+        if profile:
+            self.routes[("GET", "/debug/profile")] = self.profile
+
+    async def health(self, request: Request) -> Response:
+        payload = {"status": "ok", "modelVersion": self.model.version, "cache": self.cache.stats()}
+        if self.batcher is not None:
+            payload["batching"] = self.batcher.stats()
+        if self.registry is not None:
+            payload["registry"] = {"current": self.registry.current(), "reloads": self.reloads}
+        return Response.json(payload)
+
+    async def metrics_text(self, request: Request) -> Response:
+        metrics = self.metrics
+        cache = self.cache.stats()
+        metrics.set("neurocinema_cache_entries", cache["entries"])
+        metrics.set("neurocinema_cache_evictions_total", cache["evictions"])
+        if self.batcher is not None:
+            batching = self.batcher.stats()
+            metrics.set("neurocinema_batch_queue_depth", batching["queued"])
+            metrics.set("neurocinema_batch_rejected_total", batching["rejected"])
+        metrics.set("neurocinema_model_reloads_total", self.reloads)
+        metrics.clear("neurocinema_model_info")
+        metrics.set("neurocinema_model_info", 1, version=self.model.version)
+        return Response(body=metrics.render().encode(), content_type="text/plain; version=0.0.4")
+
+    async def profile(self, request: Request) -> Response:
+        try:
+            seconds = min(float(request.query.get("seconds", 5)), 60.0)
+            hz = min(float(request.query.get("hz", 100)), 1000.0)
+        except ValueError:
+            raise HTTPError(400, "seconds and hz must be numbers") from None
+        if not (seconds > 0 and hz > 0):
+            raise HTTPError(400, "seconds and hz must be positive")
+        profiler = SamplingProfiler(self.metrics, hz)
+        samples = await asyncio.get_running_loop().run_in_executor(None, profiler.run, seconds)
+        return Response(body=profiler.folded(samples).encode(), content_type="text/plain")
+
+    def load_version(self, version: str) -> GrossModel:
+        """Load a registry version and touch everything a prediction needs."""
+        model = self.registry.load(version, self.talent_index, reuse=self.model)
+        columns = records_to_columns([{}])
+        model.predict_distribution(columns)
+        model.explain(columns)  # builds the TreeSHAP paths ``?explain=1`` needs
+        return model
+
+    async def reload(self) -> bool:
+        """Swap to the registry's current version if it changed; True if swapped."""
+        async with self._reload_lock:
+            version = self.registry.current()
+            if version is None or version == self.model.version:
+                return False
+            loop = asyncio.get_running_loop()
+            self.model = await loop.run_in_executor(None, self.load_version, version)
+            self.reloads += 1
+            return True
+
+    async def _watch_registry(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as exc:  # keep serving the current model
+                print(f"model reload failed: {exc!r}", file=sys.stderr)
+
+    def score_movies(self, items: list[tuple[dict[str, Any], bool]]) -> list[tuple[dict[str, Any], GrossModel]]:
+        """Score ``(validated film, explain)`` pairs in one model call; each result names the model used."""
+        model, metrics = self.model, self.metrics
+        with metrics.stage("encoding"):
+            columns = records_to_columns([movie for movie, _ in items])
+            X = model.encode(columns)
+        with metrics.stage("inference"):
+            gross, quantiles, probabilities = model.predict_distribution_matrix(X)
+        similar = None
+        if self.similar is not None:
+            with metrics.stage("similar"):
+                similar = self.similar.similar(columns, model.talent)
+        explained = [i for i, (_, explain) in enumerate(items) if explain]
+        attributions = {}
+        if explained:
+            with metrics.stage("explain"):
+                values, base = model.explain_matrix(X[explained])
+            for i, row in zip(explained, values.tolist()):
+                attributions[i] = {"baseLogGross": base, "fields": dict(zip(FIELDS, row))}
+        results = []
+        for i, g in enumerate(gross.tolist()):
+            result: dict[str, Any] = {"gross": g, "range": prediction_range(g, model.thresholds)}
+            if quantiles is not None:
+                result["interval"] = {f"p{round(q * 100)}": v for q, v in zip(QUANTILES, quantiles[i].tolist())}
+                result["rangeProbabilities"] = dict(zip(REVENUE_LABELS, probabilities[i].tolist()))
+            if similar is not None:
+                result["similar"] = similar[i]
+            if i in attributions:
+                result["attributions"] = attributions[i]
+            results.append((result, model))
+        return results
+
+    async def predict(self, request: Request) -> Response:
+        metrics = self.metrics
+        with metrics.stage("validation"):
+            payload = request.json()
+            if isinstance(payload, dict) and isinstance(payload.get("movieData"), dict):
+                payload = payload["movieData"]
+            try:
+                movie = validate(payload)
+            except ValidationError as exc:
+                raise HTTPError(422, str(exc)) from None
+        explain = request.query.get("explain", "") in ("1", "true")
+        with metrics.stage("cache_lookup"):
+            key = canonical_key(movie) + (b"|explain" if explain else b"")
+            body = self.cache.get(self.model.version, key)
+        if body is not None:
+            metrics.inc("neurocinema_predictions_total", cache="hit")
+            return Response(body=body, headers={"X-Cache": "hit"})
+        metrics.inc("neurocinema_predictions_total", cache="miss")
+        if self.batcher is None:
+            result, model = self.score_movies([(movie, explain)])[0]
+        else:
+            try:
+                result, model = await self.batcher.submit((movie, explain))
+            except Overloaded as exc:
+                raise HTTPError(503, str(exc)) from None
+        result["modelVersion"] = model.version
+        with metrics.stage("serialization"):
+            if model.talent is not None:
+                result["talent"] = {f: model.talent.lookup(f, movie[f]) for f in TALENT_FIELDS if movie[f]}
+            response = Response.json(result)
+        self.cache.put(model.version, key, response.body)
+        response.headers["X-Cache"] = "miss"
+        return response
+
+    async def talent(self, request: Request) -> Response:
+        field, name = request.query.get("field"), request.query.get("name")
+        if self.model.talent is None:
+            raise HTTPError(404, "no talent index loaded")
+        if field not in TALENT_FIELDS or not name:
+            raise HTTPError(400, "field must be one of " + ", ".join(TALENT_FIELDS) + " and name is required")
+        return Response.json(self.model.talent.lookup(field, name))
+
+    async def predict_batch(self, request: Request) -> Response:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        in_fmt = request.query.get("format") or BATCH_CONTENT_TYPES.get(content_type, "csv")
+        out_fmt = request.query.get("output", "jsonl")
+        if in_fmt not in batch.FORMATS or out_fmt not in OUTPUT_CONTENT_TYPES:
+            raise HTTPError(400, "unsupported batch format")
+        try:
+            chunk_rows = max(1, int(request.query.get("chunk_rows", batch.DEFAULT_CHUNK_ROWS)))
+        except ValueError:
+            raise HTTPError(400, "chunk_rows must be an integer") from None
+        explain = request.query.get("explain", "") in ("1", "true")
+        chunks = batch.iter_chunks(io.BytesIO(request.body), in_fmt, chunk_rows)
+        results = batch.score_stream(self.model, chunks, out_fmt, explain)
+
+        # Parsing and scoring a chunk is CPU-bound; keep the event loop free.
+        loop = asyncio.get_running_loop()
+        try:
+            # Score the first chunk before any headers go out so that bad
+            # input still gets a proper error status.
+            first = await loop.run_in_executor(None, next, results, None)
+        except (ValueError, RuntimeError) as exc:
+            raise HTTPError(400, f"could not read {in_fmt} body: {exc}") from None
+
+        async def body() -> AsyncIterator[bytes]:
+            item = first
+            while item is not None:
+                yield item[1]
+                item = await loop.run_in_executor(None, next, results, None)
+
+        return Response(content_type=OUTPUT_CONTENT_TYPES[out_fmt], stream=body())
+
+    async def predict_sweep(self, request: Request) -> Response:
+        payload = request.json()
+        if not isinstance(payload, dict) or not isinstance(payload.get("sweep"), dict):
+            raise HTTPError(400, 'body must be {"movieData": {...}, "sweep": {...}}')
+        model = self.model
+        loop = asyncio.get_running_loop()
+        try:
+            movie = validate(payload.get("movieData"))
+            result = await loop.run_in_executor(None, sweep.sweep, model, movie, payload["sweep"])
+        except ValidationError as exc:
+            raise HTTPError(422, str(exc)) from None
+        return Response.json(result)
+
+    async def dispatch(self, request: Request) -> Response:
+        if request.method == "OPTIONS":
+            return Response(204)
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                raise HTTPError(405, "method not allowed")
+            raise HTTPError(404, "not found")
+        return await handler(request)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    response = await self.dispatch(request)
+                except HTTPError as exc:
+                    response = Response.json({"error": exc.message}, exc.status)
+                    if exc.status == 503:
+                        response.headers["Retry-After"] = "1"
+                except Exception:
+                    # A bug or an unexpected input; answer so the client sees more than a reset.
+                    print(f"error handling {request.method} {request.path}:", file=sys.stderr)
+                    traceback.print_exc()
+                    response = Response.json({"error": "internal server error"}, 500)
+                route = request.path if any(path == request.path for _, path in self.routes) else "other"
+                self.metrics.observe("neurocinema_http_request_seconds", time.perf_counter() - start, route=route)
+                self.metrics.inc("neurocinema_http_requests_total", route=route, status=str(response.status))
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                await send_response(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except HTTPError as exc:
+            await send_response(writer, Response.json({"error": exc.message}, exc.status), False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            # E.g. a streamed batch failing after its headers went out.
+            traceback.print_exc()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        if self.registry is not None and self._watcher is None:
+            loop = asyncio.get_running_loop()
+            self._watcher = loop.create_task(self._watch_registry())
+            loop.add_signal_handler(signal.SIGHUP, lambda: loop.create_task(self.reload()))
+        return await asyncio.start_server(self.handle_connection, host, port, reuse_address=True)
+
+
+async def read_request(reader: asyncio.StreamReader) -> Request | None:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as exc:
+        if exc.partial.strip():
+            raise HTTPError(400, "truncated request") from None
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "request headers too large") from None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "malformed Content-Length") from None
+    if length < 0:
+        raise HTTPError(400, "malformed Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body)
+
+
+async def send_response(writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+    reason = HTTPStatus(response.status).phrase
+    headers = {"Content-Type": response.content_type, "Connection": "keep-alive" if keep_alive else "close"}
+    if response.stream is None:
+        headers["Content-Length"] = str(len(response.body))
+    else:
+        headers["Transfer-Encoding"] = "chunked"
+    headers.update(CORS_HEADERS)
+    headers.update(response.headers)
+    head = f"HTTP/1.1 {response.status} {reason}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n" + response.body)
+    if response.stream is not None:
+        # A failure mid-stream propagates and drops the connection, which the
+        # client sees as a truncated chunked body rather than a clean end.
+        async for chunk in response.stream:
+            if chunk:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def run(args: argparse.Namespace) -> None:
+    registry = ModelRegistry(args.registry) if args.registry else None
+    model = registry.load(talent_index=args.talent_index) if registry else GrossModel.load(args.model, args.talent_index)
+    cache = PredictionCache(args.cache_size, args.cache_ttl)
+    similar = SimilarFilms(args.similar_index) if args.similar_index else None
+    app = PredictionServer(
+        model, cache, args.batch_window_ms / 1000.0, args.batch_rows, args.queue_size, similar,
+        registry, args.reload_interval, args.talent_index, profile=args.profile,
+    )
+    server = await app.serve(args.host, args.port)
+    print(f"serving on http://{args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--model", help="artifact directory written by neurocinema.train")
+    source.add_argument("--registry", help="model registry root; serve its current version and follow it")
+    parser.add_argument("--reload-interval", type=float, default=2.0, help="seconds between registry checks")
+    parser.add_argument("--talent-index", help="override the talent index path recorded in the model")
+    parser.add_argument("--similar-index", help="directory written by neurocinema.similar build")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-size", type=int, default=10_000, help="cached predictions (0 disables)")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="seconds a cached prediction stays valid")
+    # Off by default: the window adds to every miss's latency (see neurocinema.microbatch).
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="coalescing window for /predict (0: off)")
+    parser.add_argument("--batch-rows", type=int, default=256, help="score a batch early once this many films wait")
+    parser.add_argument("--queue-size", type=int, default=4096, help="films allowed to wait before /predict returns 503")
+    parser.add_argument("--profile", action="store_true", help="enable GET /debug/profile (sampling profiler)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
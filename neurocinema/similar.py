@@ -0,0 +1,310 @@
+"""Nearest historical films to a submitted ``movieData``.
+
+    python -m neurocinema.similar build --dataset data/movies --index similar/ --talent-index index/
+    python -m neurocinema.similar query --index similar/ '{"genre": "action", "budget": 1.5e8, ...}'
+
+Every historical film is embedded as a short ``float32`` vector. The
+vector holds its standardized log budget, year, runtime, score and log
+votes, one-hot genre and rating, and, with a talent index, the
+standardized mean log gross of its director, star, writer and company.
+Weights favour genre, then budget, era and rating, so neighbours share a
+genre and a budget class before anything else. Distances are plain L2.
+
+The search is an inverted-file (IVF) index. k-means splits the vectors
+into about ``sqrt(n)`` lists, and the vectors are stored grouped by list.
+A query ranks the list centroids and scans only the ``nprobe`` closest
+lists with one matrix-vector product each, using precomputed norms. The
+index is built offline into a directory of ``.npy`` files that the
+server memory-maps:
+
+    meta.json          embedding scales and weights, list count, dimensions
+    vocab.json         genre/rating vocabularies (a ``FeatureEncoder``)
+    centroids.npy      (lists, dim) list centroids
+    offsets.npy        start of each list in the arrays below
+    vectors.npy        (n, dim) embeddings, grouped by list
+    norms.npy          squared L2 norm per vector
+    rows.npy           row of each vector in the source dataset
+    gross.npy, budget.npy, year.npy
+    <field>.bin/.idx   UTF-8 strings for name, genre, rating and director
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+
+from .features import FeatureEncoder, _numbers, _strings, records_to_columns
+from .schema import NUMERIC_DEFAULTS
+from .talent import TALENT_FIELDS, TalentIndex
+
+# Encoder columns used as numeric dimensions, with their weights.
+NUMERIC_WEIGHTS = {"log_budget": 1.5, "year": 1.0, "runtime": 0.5, "score": 0.5, "log_votes": 0.5}
+GENRE_WEIGHT = 3.0
+RATING_WEIGHT = 1.0
+TALENT_WEIGHT = 0.75
+STRING_FIELDS = ("name", "genre", "rating", "director")
+
+DEFAULT_NPROBE = 8
+
+
+class Embedding:
+    """Maps columnar ``movieData`` to the vectors the index searches."""
+
+    def __init__(self, encoder: FeatureEncoder, mean: Sequence[float], scale: Sequence[float], talent: bool):
+        self.encoder = encoder
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.talent = talent
+        self._numeric = [encoder.feature_names.index(f) for f in NUMERIC_WEIGHTS]
+        self._onehot = [
+            (encoder.feature_names.index(f), len(encoder.vocabularies[f]), w)
+            for f, w in (("genre", GENRE_WEIGHT), ("rating", RATING_WEIGHT))
+        ]
+        self._weights = np.asarray(list(NUMERIC_WEIGHTS.values()) + [TALENT_WEIGHT] * (len(TALENT_FIELDS) if talent else 0))
+
+    @property
+    def dim(self) -> int:
+        return len(self._weights) + sum(size for _, size, _ in self._onehot)
+
+    @classmethod
+    def fit(cls, columns: Mapping[str, Any], talent: TalentIndex | None = None) -> "Embedding":
+        vocabularies = FeatureEncoder.fit({f: columns[f] for f in ("genre", "rating") if f in columns}).vocabularies
+        width = len(NUMERIC_WEIGHTS) + (len(TALENT_FIELDS) if talent is not None else 0)
+        embedding = cls(FeatureEncoder(vocabularies), np.zeros(width), np.ones(width), talent is not None)
+        raw = embedding._dense(embedding.encoder.encode(columns), columns, talent)
+        embedding.mean = np.nan_to_num(np.nanmean(raw, axis=0))
+        scale = np.nan_to_num(np.nanstd(raw, axis=0))
+        embedding.scale = np.where(scale > 0, scale, 1.0)
+        return embedding
+
+    def _dense(self, X: np.ndarray, columns: Mapping[str, Any], talent: TalentIndex | None) -> np.ndarray:
+        """Unscaled numeric and talent dimensions; NaN where unknown."""
+        parts = [X[:, self._numeric].astype(np.float64)]
+        if self.talent:
+            n = len(X)
+            # Mean log gross of each talent field; the film counts are skipped.
+            parts.append(talent.features(columns)[:, 1::2] if talent is not None else np.full((n, len(TALENT_FIELDS)), np.nan))
+        return np.hstack(parts)
+
+    def __call__(self, columns: Mapping[str, Any], talent: TalentIndex | None = None) -> np.ndarray:
+        X = self.encoder.encode(columns)
+        dense = self._dense(X, columns, talent)
+        out = np.zeros((len(X), self.dim), dtype=np.float32)
+        # Unknown values sit at the mean, i.e. zero after scaling.
+        out[:, : dense.shape[1]] = np.nan_to_num((dense - self.mean) / self.scale) * self._weights
+        start = dense.shape[1]
+        for column, size, weight in self._onehot:
+            # Vocabulary ids start at 1; UNKNOWN (0) gets no one-hot bit.
+            ids = X[:, column].astype(np.int64)
+            known = np.flatnonzero(ids > 0)
+            out[known, start + ids[known] - 1] = weight
+            start += size
+        return out
+
+
+def _sq_dist(queries: np.ndarray, vectors: np.ndarray, norms: np.ndarray) -> np.ndarray:
+    return norms[None, :] - 2.0 * (queries @ vectors.T) + np.einsum("ij,ij->i", queries, queries)[:, None]
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, sample: int = 50_000, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means on a sample; returns ``(k, dim)`` centroids."""
+    rng = np.random.default_rng(seed)
+    points = vectors[rng.choice(len(vectors), min(sample, len(vectors)), replace=False)]
+    centroids = points[rng.choice(len(points), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(points, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, labels, points)
+        filled = counts > 0
+        centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+    return centroids
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 65_536) -> np.ndarray:
+    """Closest centroid per vector, in blocks so the distance matrix stays small."""
+    norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        labels[start : start + block] = np.argmin(_sq_dist(vectors[start : start + block], centroids, norms), axis=1)
+    return labels
+
+
+def _write_strings(path: str, values: Sequence[str]) -> None:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    with open(path + ".bin", "wb") as fh:
+        fh.write(b"".join(encoded))
+    np.save(path + ".idx.npy", offsets)
+
+
+class SimilarFilms:
+    """Read-only, memory-mapped IVF index built by ``SimilarFilms.build``."""
+
+    def __init__(self, directory: str, nprobe: int = DEFAULT_NPROBE):
+        self.directory = directory
+        self.nprobe = nprobe
+        with open(os.path.join(directory, "meta.json")) as fh:
+            meta = json.load(fh)
+        encoder = FeatureEncoder.load(os.path.join(directory, "vocab.json"))
+        self.embedding = Embedding(encoder, meta["mean"], meta["scale"], meta["talent"])
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+
+        self.centroids = np.asarray(load("centroids"))
+        self.offsets = np.asarray(load("offsets"))
+        self.vectors, self.norms, self.rows = load("vectors"), load("norms"), load("rows")
+        self.gross, self.budget, self.year = load("gross"), load("budget"), load("year")
+        self._strings = {
+            f: (np.memmap(os.path.join(directory, f + ".bin"), dtype=np.uint8, mode="r")
+                if os.path.getsize(os.path.join(directory, f + ".bin")) else np.zeros(0, np.uint8), load(f + ".idx"))
+            for f in STRING_FIELDS
+        }
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _string(self, field: str, i: int) -> str:
+        blob, offsets = self._strings[field]
+        return bytes(blob[offsets[i] : offsets[i + 1]]).decode("utf-8")
+
+    def search(self, query: np.ndarray, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Positions and squared distances of the ``k`` nearest vectors to one query."""
+        centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        probe = np.argsort(_sq_dist(query[None, :], self.centroids, centroid_norms)[0])[: self.nprobe]
+        positions, distances = [], []
+        for c in probe.tolist():
+            lo, hi = int(self.offsets[c]), int(self.offsets[c + 1])
+            if hi > lo:
+                positions.append(np.arange(lo, hi))
+                distances.append(_sq_dist(query[None, :], self.vectors[lo:hi], self.norms[lo:hi])[0])
+        if not positions:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        positions, distances = np.concatenate(positions), np.concatenate(distances)
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return positions[top], np.maximum(distances[top], 0.0)
+
+    def similar(self, columns: Mapping[str, Any], talent: TalentIndex | None = None, k: int = 10) -> list[list[dict[str, Any]]]:
+        """Top ``k`` comparable historical films for each row of ``columns``."""
+        results = []
+        for query in self.embedding(columns, talent):
+            positions, dist = self.search(query, k)
+            results.append([
+                {
+                    "name": self._string("name", i),
+                    "year": int(self.year[i]) if np.isfinite(self.year[i]) else None,
+                    "genre": self._string("genre", i),
+                    "rating": self._string("rating", i),
+                    "director": self._string("director", i),
+                    "budget": float(self.budget[i]) if np.isfinite(self.budget[i]) else None,
+                    "gross": float(self.gross[i]),
+                    "distance": float(np.sqrt(d)),
+                }
+                for i, d in zip(positions.tolist(), dist.tolist())
+            ])
+        return results
+
+    @classmethod
+    def build(
+        cls,
+        directory: str,
+        columns: Mapping[str, Any],
+        gross: np.ndarray,
+        talent: TalentIndex | None = None,
+        n_lists: int | None = None,
+        seed: int = 0,
+    ) -> "SimilarFilms":
+        """Embed the historical films, cluster them and write the index."""
+        os.makedirs(directory, exist_ok=True)
+        embedding = Embedding.fit(columns, talent)
+        vectors = embedding(columns, talent)
+        n = len(vectors)
+        n_lists = n_lists or int(np.clip(np.sqrt(n), 1, 4096))
+        n_lists = max(1, min(n_lists, n))
+        centroids = kmeans(vectors, n_lists, seed=seed) if n else np.zeros((1, embedding.dim), np.float32)
+        labels = assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=offsets[1:])
+
+        vectors = np.ascontiguousarray(vectors[order])
+        np.save(os.path.join(directory, "centroids.npy"), centroids)
+        np.save(os.path.join(directory, "offsets.npy"), offsets)
+        np.save(os.path.join(directory, "vectors.npy"), vectors)
+        np.save(os.path.join(directory, "norms.npy"), np.einsum("ij,ij->i", vectors, vectors))
+        np.save(os.path.join(directory, "rows.npy"), order)
+        np.save(os.path.join(directory, "gross.npy"), np.asarray(gross, dtype=np.float64)[order])
+        blank = [""] * n
+        np.save(os.path.join(directory, "budget.npy"), _numbers(columns.get("budget", blank), np.nan)[order])
+        np.save(os.path.join(directory, "year.npy"), _numbers(columns.get("year", blank), NUMERIC_DEFAULTS["year"])[order])
+        for field in STRING_FIELDS:
+            values = columns.get(field, blank)
+            strings = values.decode() if hasattr(values, "decode") else _strings(values)
+            _write_strings(os.path.join(directory, field), strings[order].tolist())
+        embedding.encoder.save(os.path.join(directory, "vocab.json"))
+        meta = {
+            "n_films": n,
+            "dim": embedding.dim,
+            "lists": len(centroids),
+            "mean": embedding.mean.tolist(),
+            "scale": embedding.scale.tolist(),
+            "talent": embedding.talent,
+        }
+        # Written last: its presence marks a complete index.
+        with open(os.path.join(directory, "meta.json"), "w") as fh:
+            json.dump(meta, fh, indent=2)
+        return cls(directory)
+
+
+def main(argv=None) -> None:
+    from .data import Dataset, read_csv
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("build")
+    source = cmd.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="CSV with the movieData columns plus gross")
+    source.add_argument("--dataset", metavar="DIR", help="directory written by neurocinema.ingest")
+    cmd.add_argument("--index", required=True)
+    cmd.add_argument("--talent-index", help="add director/star/writer/company track records to the vectors")
+    cmd.add_argument("--lists", type=int, help="IVF lists (default sqrt(n))")
+    cmd = sub.add_parser("query")
+    cmd.add_argument("--index", required=True)
+    cmd.add_argument("--talent-index")
+    cmd.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    cmd.add_argument("-k", type=int, default=10)
+    cmd.add_argument("movie", help="movieData as JSON")
+    args = parser.parse_args(argv)
+
+    talent = TalentIndex(args.talent_index) if args.talent_index else None
+    if args.command == "build":
+        if args.data:
+            columns, gross = read_csv(args.data)
+        else:
+            dataset = Dataset(args.dataset)
+            columns, gross = dataset.columns(), dataset.gross
+        start = time.perf_counter()
+        index = SimilarFilms.build(args.index, columns, gross, talent, args.lists)
+        print(f"build: {len(index)} films in {len(index.centroids)} lists in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+    index = SimilarFilms(args.index, args.nprobe)
+    columns = records_to_columns([json.loads(args.movie)])
+    start = time.perf_counter()
+    films = index.similar(columns, talent, args.k)[0]
+    elapsed = time.perf_counter() - start
+    print(json.dumps(films, indent=2))
+    print(f"query: {elapsed * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
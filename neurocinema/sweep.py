@@ -0,0 +1,116 @@
+"""What-if sweeps: the predicted gross and ROI over a grid of one film's variants.
+
+A sweep takes one base ``movieData`` and one or two numeric fields to
+vary, e.g. budget x runtime on a 200 x 200 grid. Every variant becomes a
+row of one column set in which the unchanged string fields are
+``DictColumn``s with a single dictionary entry. Encoding then costs one
+vocabulary and talent lookup per field instead of one per variant, and
+the whole surface is scored with a single model call.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+
+from .features import DictColumn
+from .model import GrossModel
+from .schema import NUMERIC_DEFAULTS, NUMERIC_FIELDS, REVENUE_LABELS, TEXT_FIELDS, ValidationError, prediction_buckets
+
+MAX_AXES = 2
+MAX_POINTS = 250_000
+SCALES = ("linear", "log")
+
+
+def axis_values(field: str, spec: Any, limit: int = MAX_POINTS) -> np.ndarray:
+    """Values of one swept field from a list or ``{"start", "stop", "num", "scale"}``.
+
+    ``scale`` is ``"linear"`` (default) or ``"log"`` for geometric spacing.
+    More than ``limit`` values are rejected before anything is allocated.
+    """
+    if field not in NUMERIC_FIELDS:
+        raise ValidationError(f"can only sweep numeric fields: {', '.join(NUMERIC_FIELDS)}")
+    invalid = ValidationError(f"sweep over {field} needs a list of numbers or start/stop/num")
+    if isinstance(spec, Mapping):
+        try:
+            start, stop, num = float(spec["start"]), float(spec["stop"]), int(spec.get("num", 50))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise invalid from None
+        if num > limit:
+            raise ValidationError(f"sweep grid is limited to {MAX_POINTS} points")
+        scale = spec.get("scale", "linear")
+        if scale not in SCALES:
+            raise ValidationError(f"sweep scale must be one of: {', '.join(SCALES)}")
+        space = np.geomspace if scale == "log" else np.linspace
+        try:
+            values = space(start, stop, num)
+        except ValueError:
+            raise invalid from None
+    else:
+        try:
+            values = np.asarray(spec, dtype=np.float64).reshape(-1)
+        except (TypeError, ValueError):
+            raise invalid from None
+    if not len(values) or not np.all(np.isfinite(values)):
+        raise ValidationError(f"sweep over {field} needs at least one finite value")
+    if len(values) > limit:
+        raise ValidationError(f"sweep grid is limited to {MAX_POINTS} points")
+    return values
+
+
+def variant_columns(movie: Mapping[str, Any], axes: Mapping[str, np.ndarray]) -> dict[str, Any]:
+    """Column set with one row per grid point, first axis varying slowest."""
+    grids = np.meshgrid(*axes.values(), indexing="ij")
+    n = grids[0].size
+    columns: dict[str, Any] = {}
+    for field in TEXT_FIELDS:
+        value = movie.get(field)
+        columns[field] = DictColumn(np.zeros(n, dtype=np.int32), ["" if value is None else str(value)])
+    for field in NUMERIC_FIELDS:
+        try:
+            value = float(movie.get(field))
+        except (TypeError, ValueError):
+            value = NUMERIC_DEFAULTS[field]
+        columns[field] = np.full(n, value)
+    for field, grid in zip(axes, grids):
+        columns[field] = grid.reshape(-1)
+    return columns
+
+
+def sweep(model: GrossModel, movie: Mapping[str, Any], axes: Mapping[str, Any]) -> dict[str, Any]:
+    """Score every combination of the ``axes`` values for one validated film.
+
+    ``gross``, ``roi`` and ``bucket`` are nested lists shaped like the grid;
+    ``roi`` is ``gross / budget - 1`` and ``None`` where the budget is not
+    positive, and ``bucket`` indexes ``labels``.
+    """
+    if not 1 <= len(axes) <= MAX_AXES:
+        raise ValidationError(f"sweep needs 1 to {MAX_AXES} fields")
+    values: dict[str, np.ndarray] = {}
+    points = 1
+    for field, spec in axes.items():
+        # Each axis may only use what the earlier ones left of the point budget.
+        values[field] = axis_values(field, spec, MAX_POINTS // points)
+        points *= len(values[field])
+    shape = tuple(len(v) for v in values.values())
+    columns = variant_columns(movie, values)
+    gross = model.predict(columns)
+    budget = columns["budget"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = np.where(budget > 0, gross / budget - 1.0, np.nan)
+    return {
+        "axes": {field: v.tolist() for field, v in values.items()},
+        "gross": gross.reshape(shape).tolist(),
+        "roi": _nullable(roi.reshape(shape)),
+        "bucket": prediction_buckets(gross, model.thresholds).reshape(shape).tolist(),
+        "labels": list(REVENUE_LABELS),
+        "modelVersion": model.version,
+    }
+
+
+def _nullable(values: np.ndarray) -> Sequence[Any]:
+    """``tolist`` with NaN as ``None``, since JSON has no NaN."""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
@@ -0,0 +1,80 @@
+"""Synthetic movie data with the ``movieData`` schema, for demos and benchmarks."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from .features import MONTHS
+
+GENRES = (
+    "action", "adventure", "animation", "biography", "comedy", "crime",
+    "drama", "family", "fantasy", "horror", "music", "musical", "mystery",
+    "romance", "sci-fi", "sport", "thriller", "war", "western",
+)
+RATINGS = ("G", "PG", "PG-13", "R", "NC-17")
+COUNTRIES = ("United States", "United Kingdom", "France", "Canada", "Germany", "Japan", "India", "Australia")
+_GENRE_LIFT = {"action": 0.35, "adventure": 0.3, "animation": 0.4, "comedy": 0.15, "drama": -0.15, "horror": 0.1}
+
+
+def _talent_lift(ids: np.ndarray) -> np.ndarray:
+    # Fixed pseudo-random effect per person, in [-0.5, 0.5).
+    return ((ids * 2654435761) % 1000) / 1000.0 - 0.5
+
+
+def generate(n_rows: int, seed: int = 0) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """Return ``(columns, gross)`` for ``n_rows`` made-up films."""
+    rng = np.random.default_rng(seed)
+    genre = rng.choice(np.array(GENRES), n_rows)
+    rating = rng.choice(np.array(RATINGS), n_rows, p=[0.05, 0.15, 0.35, 0.4, 0.05])
+    country = rng.choice(np.array(COUNTRIES), n_rows, p=[0.6, 0.1, 0.06, 0.06, 0.05, 0.05, 0.04, 0.04])
+    director_id = rng.zipf(1.6, n_rows)
+    director = np.char.add("Director ", director_id.astype(str))
+    star = np.char.add("Star ", rng.zipf(1.5, n_rows).astype(str))
+    writer = np.char.add("Writer ", rng.zipf(1.7, n_rows).astype(str))
+    company = np.char.add("Studio ", rng.zipf(1.3, n_rows).astype(str))
+    name = np.char.add("Film ", np.arange(n_rows).astype(str))
+
+    year = rng.integers(1980, 2025, n_rows)
+    month = rng.integers(1, 13, n_rows)
+    day = rng.integers(1, 29, n_rows)
+    released = np.char.add(
+        np.char.add(np.char.add(np.array([m.capitalize() for m in MONTHS])[month - 1], " "), day.astype(str)),
+        np.char.add(np.char.add(", ", year.astype(str)), np.char.add(np.char.add(" (", country), ")")),
+    )
+
+    budget = np.exp(rng.normal(16.8, 1.2, n_rows)).round(-3)
+    runtime = rng.normal(110, 18, n_rows).clip(70, 210).round()
+    score = rng.normal(6.4, 1.0, n_rows).clip(1, 10).round(1)
+    votes = np.exp(rng.normal(10.5, 1.5, n_rows) + 0.4 * (score - 6.4)).round()
+
+    lift = np.array([_GENRE_LIFT.get(g, 0.0) for g in GENRES])[np.searchsorted(np.array(GENRES), genre)]
+    summer = np.isin(month, (5, 6, 7, 11, 12)) * 0.2
+    log_gross = (
+        np.log(budget)
+        + 0.35 * (score - 6.4)
+        + 0.25 * (np.log(votes) - 10.5)
+        + lift
+        + summer
+        + _talent_lift(director_id)
+        - 0.004 * np.abs(runtime - 120)
+        + rng.standard_t(3, n_rows) * 0.6
+    )
+    gross = np.exp(log_gross).round()
+
+    columns = {
+        "released": released,
+        "writer": writer,
+        "rating": rating,
+        "name": name,
+        "genre": genre,
+        "director": director,
+        "star": star,
+        "country": country,
+        "company": company,
+        "runtime": runtime,
+        "score": score,
+        "budget": budget,
+        "year": year.astype(np.float64),
+        "votes": votes,
+    }
+    return columns, gross
@@ -0,0 +1,363 @@
+"""Per-director/star/writer/company box-office track records.
+
+    python -m neurocinema.talent build  --data movies.csv --index index/
+    python -m neurocinema.talent update --data weekend.csv --index index/
+    python -m neurocinema.talent lookup --index index/ director "christopher nolan"
+
+The index keeps running sums per person or studio rather than finished
+aggregates, so new box-office results are folded in place with
+``update`` instead of re-reading the history. Each build is a generation
+directory named by ``CURRENT``; per field it holds
+
+    <field>.keys       normalized names, one per line, line i -> row i
+    <field>.stats.npy  float64 ``(capacity, N_STATS)`` sums, memory-mapped
+
+``build`` (``TalentIndex.create``) writes a new generation and then
+replaces ``CURRENT``, so an index can be rebuilt under running servers.
+The generation before it is kept for readers that have not switched yet.
+Indexes written before generations (fields directly in the directory)
+are still read.
+
+Server workers open the index read-only and share the mapped pages; they
+pick up appended names, regrown files and new generations on their own
+(see ``refresh``). A reader can observe a row midway through an update;
+the derived aggregates tolerate that.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+
+from .features import NUMERIC_DEFAULTS, _numbers, factorize, normalize
+
+TALENT_FIELDS = ("director", "star", "writer", "company")
+
+# Recency weight doubles every HALF_LIFE_YEARS of release year.
+HALF_LIFE_YEARS = 5.0
+# Histogram of log-gross used to read off medians.
+HIST_LO, HIST_HI, HIST_BINS = 9.0, 23.0, 28
+ROI_CAP = 100.0
+
+# Columns of the stats arrays.
+COUNT, SUM_LOG, SUM_ROI, ROI_COUNT, W_SUM, W_SUM_LOG, LAST_YEAR = range(7)
+HIST = 7
+N_STATS = HIST + HIST_BINS
+
+MIN_CAPACITY = 1024
+REFRESH_INTERVAL = 1.0
+
+# Names the live generation directory; absent in indexes from before generations.
+POINTER = "CURRENT"
+
+
+def _bin_edges() -> np.ndarray:
+    return np.linspace(HIST_LO, HIST_HI, HIST_BINS + 1)
+
+
+def contributions(columns: Mapping[str, Sequence[Any]], gross: np.ndarray) -> np.ndarray:
+    """Per-film rows of the sums each film adds to its director/star/... stats."""
+    n = len(gross)
+    blank = [""] * n
+    gross = np.asarray(gross, dtype=np.float64)
+    budget = _numbers(columns.get("budget", blank), np.nan)
+    year = _numbers(columns.get("year", blank), NUMERIC_DEFAULTS["year"])
+    log_gross = np.log1p(np.maximum(gross, 0.0))
+    has_budget = budget > 0
+    roi = np.where(has_budget, np.minimum(gross / np.where(has_budget, budget, 1.0) - 1.0, ROI_CAP), 0.0)
+    weight = np.exp2((year - 2000.0) / HALF_LIFE_YEARS)
+
+    rows = np.zeros((n, N_STATS), dtype=np.float64)
+    rows[:, COUNT] = 1.0
+    rows[:, SUM_LOG] = log_gross
+    rows[:, SUM_ROI] = roi
+    rows[:, ROI_COUNT] = has_budget
+    rows[:, W_SUM] = weight
+    rows[:, W_SUM_LOG] = weight * log_gross
+    rows[:, LAST_YEAR] = year
+    bins = np.clip(np.digitize(log_gross, _bin_edges()[1:-1]), 0, HIST_BINS - 1)
+    rows[np.arange(n), HIST + bins] = 1.0
+    return rows
+
+
+def summarize(stats: np.ndarray) -> dict[str, float | int | None]:
+    """Turn one stats row into the aggregates shown to users."""
+    count = int(stats[COUNT])
+    if count == 0:
+        return {"films": 0}
+    hist = stats[HIST:]
+    edges = _bin_edges()
+    cum = np.cumsum(hist)
+    b = int(np.searchsorted(cum, count / 2.0))
+    below = cum[b - 1] if b else 0.0
+    median_log = edges[b] + (edges[b + 1] - edges[b]) * ((count / 2.0 - below) / max(hist[b], 1.0))
+    return {
+        "films": count,
+        "meanGross": math.expm1(stats[SUM_LOG] / count),
+        "medianGross": math.expm1(median_log),
+        "meanRoi": float(stats[SUM_ROI] / stats[ROI_COUNT]) if stats[ROI_COUNT] else None,
+        "recentGross": math.expm1(stats[W_SUM_LOG] / stats[W_SUM]),
+        "lastYear": int(stats[LAST_YEAR]),
+    }
+
+
+class _FieldIndex:
+    def __init__(self, directory: str, field: str, writable: bool):
+        self.keys_path = os.path.join(directory, f"{field}.keys")
+        self.stats_path = os.path.join(directory, f"{field}.stats.npy")
+        self.field = field
+        self.writable = writable
+        self.names: list[str] = []
+        self.rows: dict[str, int] = {}
+        self._keys_size = 0
+        self._keys_ino = -1
+        self._ino = -1
+        self.stats: np.ndarray = np.zeros((0, N_STATS))
+        # Executor threads refresh concurrently; each tail must be consumed once.
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Load appended names and remap the stats file if it was regrown.
+
+        A keys file that was replaced or truncated is read from the start.
+        Stats are remapped before new names are published, so a name never
+        points past the mapped rows.
+        """
+        with self._lock:
+            keys = os.stat(self.keys_path)
+            if keys.st_ino != self._keys_ino or keys.st_size < self._keys_size:
+                names, rows, keys_size = [], {}, 0
+            else:
+                names, rows, keys_size = self.names, self.rows, self._keys_size
+            ino = os.stat(self.stats_path).st_ino
+            if ino != self._ino:
+                self.stats = np.load(self.stats_path, mmap_mode="r+" if self.writable else "r")
+                self._ino = ino
+            with open(self.keys_path, "rb") as fh:
+                fh.seek(keys_size)
+                tail = fh.read()
+            # Only consume complete lines; a writer may be mid-append.
+            tail = tail[: tail.rfind(b"\n") + 1]
+            for name in tail.decode("utf-8").splitlines():
+                rows[name] = len(names)
+                names.append(name)
+            self.names, self.rows = names, rows
+            self._keys_size = keys_size + len(tail)
+            self._keys_ino = keys.st_ino
+
+    def lookup_rows(self, names: list[str]) -> np.ndarray:
+        return np.fromiter((self.rows.get(n, -1) for n in names), dtype=np.int64, count=len(names))
+
+    def append(self, names: list[str]) -> None:
+        needed = len(self.names) + len(names)
+        if needed > self.stats.shape[0]:
+            self._grow(max(needed, 2 * self.stats.shape[0], MIN_CAPACITY))
+        with open(self.keys_path, "ab") as fh:
+            fh.write("".join(n + "\n" for n in names).encode("utf-8"))
+        self.refresh()
+
+    def _grow(self, capacity: int) -> None:
+        tmp = self.stats_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64, shape=(capacity, N_STATS))
+        grown[: self.stats.shape[0]] = self.stats
+        grown.flush()
+        del grown
+        os.replace(tmp, self.stats_path)
+        self._ino = -1
+
+
+class TalentIndex:
+    """Memory-mapped track records keyed by normalized director/star/writer/company."""
+
+    def __init__(self, directory: str, writable: bool = False, generation: str | None = None):
+        self.directory = directory
+        self.writable = writable
+        self._lock = threading.Lock()
+        self.generation = _generation(directory) if generation is None else generation
+        self._fields = self._open(self.generation)
+        self._checked = time.monotonic()
+
+    def _open(self, generation: str) -> dict[str, _FieldIndex]:
+        path = os.path.join(self.directory, generation)
+        return {f: _FieldIndex(path, f, self.writable) for f in TALENT_FIELDS}
+
+    @classmethod
+    def create(cls, directory: str, columns: Mapping[str, Sequence[Any]], gross: np.ndarray) -> "TalentIndex":
+        """Build a fresh index from historical films as a new generation and make it current."""
+        os.makedirs(directory, exist_ok=True)
+        previous = _generation(directory)
+        generation = f"gen-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(directory, generation)
+        os.makedirs(path)
+        for field in TALENT_FIELDS:
+            open(os.path.join(path, f"{field}.keys"), "wb").close()
+            np.lib.format.open_memmap(
+                os.path.join(path, f"{field}.stats.npy"), mode="w+", dtype=np.float64, shape=(0, N_STATS)
+            ).flush()
+        index = cls(directory, writable=True, generation=generation)
+        index.update(columns, gross)
+        pointer = os.path.join(directory, f".{POINTER}-{uuid.uuid4().hex}")
+        with open(pointer, "w", encoding="utf-8") as fh:
+            fh.write(generation + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(pointer, os.path.join(directory, POINTER))
+        _prune(directory, keep=(generation, previous))
+        return index
+
+    def _maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked >= REFRESH_INTERVAL:
+            self._checked = now
+            self.refresh()
+
+    def refresh(self) -> None:
+        """Switch to a newly built generation, or pick up appends to the current one."""
+        with self._lock:
+            generation = _generation(self.directory)
+            if generation != self.generation:
+                self._fields = self._open(generation)
+                self.generation = generation
+                return
+        for index in self._fields.values():
+            index.refresh()
+
+    def update(self, columns: Mapping[str, Sequence[Any]], gross: np.ndarray) -> None:
+        """Fold newly reported films into the running sums, in place."""
+        if not self.writable:
+            raise PermissionError("talent index was opened read-only")
+        rows = contributions(columns, gross)
+        years = rows[:, LAST_YEAR].copy()
+        # LAST_YEAR holds a maximum, not a sum.
+        rows[:, LAST_YEAR] = 0.0
+        for field, index in self._fields.items():
+            if field not in columns:
+                continue
+            names, inverse = factorize(field, columns[field])
+            ids = index.lookup_rows(names)
+            new = [n for n, i in zip(names, ids.tolist()) if i < 0 and n]
+            if new:
+                index.append(new)
+                ids = index.lookup_rows(names)
+            per_row = ids[inverse]
+            known = per_row >= 0
+            np.add.at(index.stats, per_row[known], rows[known])
+            np.maximum.at(index.stats[:, LAST_YEAR], per_row[known], years[known])
+            index.stats.flush()
+
+    def lookup(self, field: str, name: str) -> dict[str, Any]:
+        """Aggregates for one person or studio."""
+        self._maybe_refresh()
+        index = self._fields[field]
+        row = index.rows.get(normalize(field, str(name)))
+        return summarize(index.stats[row]) if row is not None and row < len(index.stats) else {"films": 0}
+
+    def features(
+        self, columns: Mapping[str, Sequence[Any]], gross: np.ndarray | None = None, folds: int = 5
+    ) -> np.ndarray:
+        """Model inputs: film count and mean log-gross per talent field.
+
+        With ``gross`` (training rows already in the index) the mean is
+        computed out-of-fold: films are split into ``folds`` groups and each
+        film only sees the results of other groups. Leaving out just the
+        film itself would leak its gross through the mean. The count leaks
+        nothing, so it only leaves out the film itself: a new film at
+        serving time sees every indexed film, and an out-of-fold count
+        would be about ``1 / folds`` smaller than what it is served with.
+        """
+        n = len(next(iter(columns.values())))
+        out = np.empty((n, 2 * len(TALENT_FIELDS)), dtype=np.float32)
+        blank = [""] * n
+        if gross is not None:
+            log_gross = contributions(columns, gross)[:, SUM_LOG]
+            fold = np.arange(n) % folds
+        for j, field in enumerate(TALENT_FIELDS):
+            self._maybe_refresh()
+            index = self._fields[field]
+            names, inverse = factorize(field, columns.get(field, blank))
+            ids = index.lookup_rows(names)[inverse]
+            stats = np.zeros((n, N_STATS))
+            known = (ids >= 0) & (ids < len(index.stats))
+            stats[known] = index.stats[ids[known]]
+            count, total = stats[:, COUNT], stats[:, SUM_LOG]
+            films = count
+            if gross is not None:
+                films = count - known
+                key = fold * len(names) + inverse
+                size = folds * len(names)
+                count = count - np.bincount(key, weights=known.astype(np.float64), minlength=size)[key]
+                total = total - np.bincount(key, weights=log_gross * known, minlength=size)[key]
+            out[:, 2 * j] = films
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[:, 2 * j + 1] = np.where(count > 0, total / count, np.nan)
+        return out
+
+    @staticmethod
+    def feature_names() -> tuple[str, ...]:
+        return tuple(f"{f}_{stat}" for f in TALENT_FIELDS for stat in ("films", "mean_log_gross"))
+
+
+def _generation(directory: str) -> str:
+    """The live generation's subdirectory, or ``""`` for an index without generations."""
+    try:
+        with open(os.path.join(directory, POINTER), encoding="utf-8") as fh:
+            return fh.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def _prune(directory: str, keep: Sequence[str]) -> None:
+    """Remove generations (and pre-generation files) other than ``keep``."""
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith("gen-") and name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+        elif "" not in keep and name.endswith((".keys", ".stats.npy", ".stats.npy.tmp")):
+            os.remove(path)
+
+
+def main(argv=None) -> None:
+    from .data import Dataset, read_csv
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("build", "update"):
+        cmd = sub.add_parser(name)
+        source = cmd.add_mutually_exclusive_group(required=True)
+        source.add_argument("--data", help="CSV with the movieData columns plus gross")
+        source.add_argument("--dataset", metavar="DIR", help="directory written by neurocinema.ingest")
+        cmd.add_argument("--index", required=True)
+    cmd = sub.add_parser("lookup")
+    cmd.add_argument("--index", required=True)
+    cmd.add_argument("field", choices=TALENT_FIELDS)
+    cmd.add_argument("name")
+    args = parser.parse_args(argv)
+
+    if args.command == "lookup":
+        print(json.dumps(TalentIndex(args.index).lookup(args.field, args.name)))
+        return
+    if args.data:
+        columns, gross = read_csv(args.data)
+    else:
+        dataset = Dataset(args.dataset)
+        columns, gross = dataset.columns(), dataset.gross
+    start = time.perf_counter()
+    if args.command == "build":
+        TalentIndex.create(args.index, columns, gross)
+    else:
+        TalentIndex(args.index, writable=True).update(columns, gross)
+    print(f"{args.command}: {len(gross)} films in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
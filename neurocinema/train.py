@@ -0,0 +1,93 @@
+"""Train a gross model and write its artifact directory.
+
+    python -m neurocinema.train --data movies.csv --out models/current
+    python -m neurocinema.train --dataset data/movies --out models/current
+    python -m neurocinema.train --synthetic 50000 --out models/current
+    python -m neurocinema.train --data movies.csv --talent-index index/ --out models/current
+
+``--talent-index`` (re)builds the director/star/writer/company index from
+the training data and adds its track records to the model inputs.
+
+``--tune`` picks hyperparameters first with a parallel successive-halving
+search (see ``neurocinema.tuning``); ``--compare-sequential`` reruns the
+search on a single process and reports the wall-clock speedup.
+
+Quantile models for the P10/P50/P90 interval are trained alongside the
+point model unless ``--no-intervals`` is given.
+
+``--registry`` publishes the model as a new version of a model registry
+and makes it current instead of writing ``--out`` (see
+``neurocinema.registry``); servers following the registry switch to it.
+
+Weekly results can be added without a full fit with ``neurocinema.update``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from . import synthetic, tuning
+from .data import Dataset, read_csv
+from .model import GrossModel
+from .registry import ModelRegistry
+from .talent import TalentIndex
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="CSV with the movieData columns plus gross")
+    source.add_argument("--dataset", metavar="DIR", help="directory written by neurocinema.ingest")
+    source.add_argument("--synthetic", type=int, metavar="N", help="train on N synthetic films")
+    dest = parser.add_mutually_exclusive_group(required=True)
+    dest.add_argument("--out", help="artifact directory to write")
+    dest.add_argument("--registry", metavar="DIR", help="publish to this model registry and make it current")
+    parser.add_argument("--talent-index", metavar="DIR", help="build a talent index here and train with it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tune", action="store_true", help="search hyperparameters before the final fit")
+    parser.add_argument("--jobs", type=int, help="search processes (default: all cores)")
+    parser.add_argument("--compare-sequential", action="store_true", help="also time the search on one process")
+    parser.add_argument("--cache-dir", help="keep the search's cached matrix and folds here")
+    parser.add_argument("--no-intervals", action="store_true", help="skip the P10/P50/P90 quantile models")
+    args = parser.parse_args(argv)
+
+    if args.data:
+        columns, gross = read_csv(args.data)
+    elif args.dataset:
+        dataset = Dataset(args.dataset)
+        columns, gross = dataset.columns(), dataset.gross
+    else:
+        columns, gross = synthetic.generate(args.synthetic, seed=args.seed)
+    talent = TalentIndex.create(args.talent_index, columns, gross) if args.talent_index else None
+    encoder, X, y = GrossModel.training_matrix(columns, gross, talent)
+    params = None
+    if args.tune:
+        parallel, sequential = tuning.search(
+            X, y, n_jobs=args.jobs, compare_sequential=args.compare_sequential, cache_dir=args.cache_dir, seed=args.seed
+        )
+        # Fit exactly what was cross-validated: a fixed number of rounds, no early stopping.
+        params = {**parallel.best_params, "max_iter": parallel.max_iter, "early_stopping": False}
+        report = {"best_params": params, "cv_rmse_log": parallel.best_rmse, "fits": parallel.n_fits,
+                  "search_s": round(parallel.elapsed, 2), "rounds": parallel.rounds}
+        if sequential is not None:
+            report["sequential_s"] = round(sequential.elapsed, 2)
+            report["speedup"] = round(sequential.elapsed / parallel.elapsed, 2)
+        print(json.dumps(report))
+    model = GrossModel.fit_matrix(encoder, X, y, params, seed=args.seed, talent=talent, with_intervals=not args.no_intervals)
+    if params:
+        model.metrics["params"] = params
+    if args.dataset:
+        # Where neurocinema.update finds the films ingested since, and this fit's held-out rows.
+        model.metrics["dataset_rows"] = len(dataset)
+        model.metrics["holdout_split"] = {"rows": len(dataset), "seed": args.seed}
+    if args.registry:
+        ModelRegistry(args.registry).publish(model)
+        print(json.dumps({"version": model.version, "registry": args.registry, **model.metrics}))
+    else:
+        model.save(args.out)
+        print(json.dumps({"version": model.version, "out": args.out, **model.metrics}))
+
+
+if __name__ == "__main__":
+    main()
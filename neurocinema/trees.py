@@ -0,0 +1,323 @@
+"""Serve-time engine for the boosted trees without scikit-learn.
+
+    python -m neurocinema.trees --model models/current
+
+The fitted ``HistGradientBoostingRegressor`` is flattened into one set of
+node arrays shared by every tree (feature index, threshold, missing-value
+direction, child pointers, leaf value) and saved under ``trees/`` next to
+the pickle, so loading a model and scoring a film never imports
+scikit-learn.
+
+Scoring does not walk the trees node by node. Leaves are numbered left to
+right within each tree, and every split is turned into a bitmask of the
+leaves that stay reachable when a row goes right. For each feature the
+distinct thresholds are sorted, and table row ``r`` holds, per tree, the
+AND of the masks of the splits with one of the first ``r`` thresholds.
+A row's value is ranked against that feature's thresholds with
+``searchsorted``; ANDing the looked-up rows of every feature leaves the
+reachable leaves of every tree, and the exit leaf is the lowest set bit.
+A whole block of rows is scored with one ``searchsorted`` and one table
+gather per feature.
+
+Artifacts store the node arrays and the precomputed tables as one
+``.npy`` file each under ``trees/``; loading memory-maps them, so a model
+is ready to score without building anything and every process serving
+the same artifact shares its pages.
+
+Leaf values are added tree by tree in training order, starting from the
+baseline, which is the order scikit-learn uses; predictions are
+bit-identical to ``estimator.predict``. The CLI compiles an existing
+artifact and checks that on synthetic films.
+
+Several ensembles over the same features (the point model and its
+quantile models) can be ``stack``ed into one; every tree then adds to
+its own output column and a single pass over the rows scores them all.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Sequence
+
+import numpy as np
+
+# Rows per block; keeps the (rows, trees) mask arrays in cache.
+BLOCK_ROWS = 4096
+
+
+class CompiledTrees:
+    """Flat node arrays of one or more stacked tree ensembles.
+
+    ``roots[t]`` is the index of tree ``t``'s root in the node arrays.
+    A row at split ``i`` moves to ``left[i]`` when its feature value is
+    ``<= threshold[i]`` (or missing and ``missing_left[i]``), otherwise to
+    ``right[i]``. Leaves have ``left[i] == right[i] == -1`` and carry
+    ``value[i]``. Trees may have at most 64 leaves. Tree ``t`` adds to
+    output ``output[t]``, which starts at ``baseline[output[t]]``; trees
+    are grouped by output in ascending order. ``cover[i]``, when present,
+    is the number of training rows that reached node ``i``.
+    """
+
+    ARRAYS = ("feature", "threshold", "missing_left", "left", "right", "value", "roots", "output", "baseline", "cover")
+    # Scoring tables derived from ARRAYS; per-feature lists are concatenated.
+    TABLES = ("cuts", "cut_offsets", "tables", "leaf_values", "leaf_offset")
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        missing_left: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        baseline: float | np.ndarray,
+        n_features: int,
+        output: np.ndarray | None = None,
+        cover: np.ndarray | None = None,
+        tables: dict[str, np.ndarray] | None = None,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.baseline = np.atleast_1d(np.asarray(baseline, dtype=np.float64))
+        self.output = np.zeros(len(roots), dtype=np.int32) if output is None else np.asarray(output, dtype=np.int32)
+        self.cover = None if cover is None else np.asarray(cover, dtype=np.float64)
+        self.n_features = int(n_features)
+        if tables is None:
+            self._build_tables()
+        else:
+            self._split_tables(**tables)
+
+    def __len__(self) -> int:
+        return len(self.roots)
+
+    def _build_tables(self) -> None:
+        n_trees = len(self.roots)
+        leaf_of = np.full(len(self.left), -1, dtype=np.int64)
+        tree_of = np.empty(len(self.left), dtype=np.int64)
+        leaf_values: list[float] = []
+        leaf_offset = np.empty(n_trees, dtype=np.int64)
+        max_leaves = 0
+        left, right = self.left.tolist(), self.right.tolist()
+        for t, root in enumerate(self.roots.tolist()):
+            leaf_offset[t] = len(leaf_values)
+            stack = [root]
+            while stack:
+                i = stack.pop()
+                tree_of[i] = t
+                if left[i] < 0:
+                    leaf_of[i] = len(leaf_values) - leaf_offset[t]
+                    leaf_values.append(float(self.value[i]))
+                else:
+                    stack += (right[i], left[i])
+            max_leaves = max(max_leaves, len(leaf_values) - int(leaf_offset[t]))
+        if max_leaves > 64:
+            raise ValueError("trees with more than 64 leaves cannot be compiled")
+        dtype = np.uint32 if max_leaves <= 32 else np.uint64
+
+        # Leaves under each node as a bitmask; children come after parents.
+        reach = np.zeros(len(self.left), dtype=np.uint64)
+        is_leaf = self.left < 0
+        reach[is_leaf] = np.left_shift(np.uint64(1), leaf_of[is_leaf].astype(np.uint64))
+        for i in np.flatnonzero(~is_leaf)[::-1].tolist():
+            reach[i] = reach[left[i]] | reach[right[i]]
+        splits = np.flatnonzero(~is_leaf)
+        # Going right rules out the leaves of the left subtree.
+        keep = (~reach[self.left[splits]]).astype(dtype)
+
+        everything = np.iinfo(dtype).max
+        self._cuts, self._tables = [], []
+        for f in range(self.n_features):
+            on_f = self.feature[splits] == f
+            cuts = np.unique(self.threshold[splits][on_f])
+            table = np.full((len(cuts) + 2, n_trees), everything, dtype=dtype)
+            trees = tree_of[splits][on_f]
+            # Row r + 1 gets the splits whose threshold is the r-th cut, then a
+            # running AND makes row r cover every split with a threshold < x.
+            np.bitwise_and.at(table, (np.searchsorted(cuts, self.threshold[splits][on_f]) + 1, trees), keep[on_f])
+            np.bitwise_and.accumulate(table[:-1], axis=0, out=table[:-1])
+            # Last row is for missing values: only splits sending them right apply.
+            table[-1] = everything
+            go_right = ~self.missing_left[splits][on_f]
+            np.bitwise_and.at(table[-1], trees[go_right], keep[on_f][go_right])
+            self._cuts.append(cuts)
+            self._tables.append(table)
+        self._dtype = dtype
+        self._leaf_values = np.asarray(leaf_values, dtype=np.float64)
+        self._leaf_offset = leaf_offset
+
+    def _split_tables(self, cuts, cut_offsets, tables, leaf_values, leaf_offset) -> None:
+        # Feature f's cuts are cuts[cut_offsets[f]:cut_offsets[f + 1]]; its
+        # table has two more rows than it has cuts.
+        bounds = cut_offsets.tolist()
+        self._cuts = [cuts[a:b] for a, b in zip(bounds, bounds[1:])]
+        self._tables = [tables[a + 2 * f : b + 2 * f + 2] for f, (a, b) in enumerate(zip(bounds, bounds[1:]))]
+        self._dtype = tables.dtype.type
+        self._leaf_values = leaf_values
+        self._leaf_offset = leaf_offset
+
+    def _joined_tables(self) -> dict[str, np.ndarray]:
+        return {
+            "cuts": np.concatenate(self._cuts),
+            "cut_offsets": np.cumsum([0] + [len(c) for c in self._cuts]),
+            "tables": np.concatenate(self._tables),
+            "leaf_values": self._leaf_values,
+            "leaf_offset": self._leaf_offset,
+        }
+
+    @classmethod
+    def from_sklearn(cls, estimator: Any) -> "CompiledTrees":
+        """Flatten a fitted single-output ``HistGradientBoostingRegressor``."""
+        if estimator.n_trees_per_iteration_ != 1:
+            raise ValueError("only single-output ensembles can be compiled")
+        nodes = [predictors[0].nodes for predictors in estimator._predictors]
+        if any(n["is_categorical"].any() for n in nodes):
+            raise ValueError("native categorical splits are not supported")
+        sizes = np.array([len(n) for n in nodes], dtype=np.int64)
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        offsets = np.repeat(roots, sizes)
+        flat = np.concatenate(nodes)
+        leaf = flat["is_leaf"].astype(bool)
+        return cls(
+            feature=np.where(leaf, -1, flat["feature_idx"]).astype(np.int32),
+            threshold=np.where(leaf, 0.0, flat["num_threshold"]).astype(np.float64),
+            missing_left=flat["missing_go_to_left"].astype(bool),
+            left=np.where(leaf, -1, flat["left"] + offsets).astype(np.int32),
+            right=np.where(leaf, -1, flat["right"] + offsets).astype(np.int32),
+            value=np.where(leaf, flat["value"], 0.0).astype(np.float64),
+            roots=roots,
+            baseline=float(np.asarray(estimator._baseline_prediction).reshape(-1)[0]),
+            n_features=estimator.n_features_in_,
+            cover=flat["count"].astype(np.float64),
+        )
+
+    @classmethod
+    def stack(cls, ensembles: Sequence["CompiledTrees"]) -> "CompiledTrees":
+        """One ensemble whose outputs are those of ``ensembles``, in order."""
+        if len({e.n_features for e in ensembles}) != 1:
+            raise ValueError("stacked ensembles must share their features")
+        nodes = np.cumsum([0] + [len(e.left) for e in ensembles[:-1]])
+        outputs = np.cumsum([0] + [len(e.baseline) for e in ensembles[:-1]])
+
+        def children(name: str) -> np.ndarray:
+            return np.concatenate([np.where(e.left < 0, -1, getattr(e, name) + n) for e, n in zip(ensembles, nodes)])
+
+        return cls(
+            feature=np.concatenate([e.feature for e in ensembles]),
+            threshold=np.concatenate([e.threshold for e in ensembles]),
+            missing_left=np.concatenate([e.missing_left for e in ensembles]),
+            left=children("left").astype(np.int32),
+            right=children("right").astype(np.int32),
+            value=np.concatenate([e.value for e in ensembles]),
+            roots=np.concatenate([e.roots + n for e, n in zip(ensembles, nodes)]).astype(np.int32),
+            baseline=np.concatenate([e.baseline for e in ensembles]),
+            n_features=ensembles[0].n_features,
+            output=np.concatenate([e.output + o for e, o in zip(ensembles, outputs)]),
+            cover=None if any(e.cover is None for e in ensembles) else np.concatenate([e.cover for e in ensembles]),
+        )
+
+    def save(self, directory: str) -> None:
+        """Write one ``.npy`` per node array and scoring table into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in self.ARRAYS if getattr(self, name) is not None}
+        for name, array in {**arrays, **self._joined_tables()}.items():
+            np.save(os.path.join(directory, name + ".npy"), array)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledTrees":
+        """Memory-map a directory written by ``save``; ``.npz`` files from older artifacts are read whole."""
+        if not os.path.isdir(path):
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in cls.ARRAYS if name in data.files}
+                return cls(**arrays, n_features=int(data["n_features"]))
+
+        def mapped(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+        arrays = {name: mapped(name) for name in cls.ARRAYS if os.path.exists(os.path.join(path, name + ".npy"))}
+        tables = {name: mapped(name) for name in cls.TABLES}
+        return cls(**arrays, n_features=len(tables["cut_offsets"]) - 1, tables=tables)
+
+    def leaves(self, X: np.ndarray, n_trees: int | None = None) -> np.ndarray:
+        """Exit leaf of each of the first ``n_trees`` trees (default all), numbered left to right."""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got shape {X.shape}")
+        n_trees = len(self.roots) if n_trees is None else n_trees
+        out = np.empty((len(X), n_trees), dtype=np.intp)
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start : start + BLOCK_ROWS]
+            reachable = np.full((len(block), n_trees), np.iinfo(self._dtype).max, dtype=self._dtype)
+            for f, (cuts, table) in enumerate(zip(self._cuts, self._tables)):
+                if not len(cuts):
+                    continue
+                x = block[:, f]
+                rank = np.searchsorted(cuts, x)
+                rank[np.isnan(x)] = len(cuts) + 1
+                reachable &= table[:, :n_trees][rank]
+            # Lowest set bit; its log2 is exact for a power of two.
+            lowest = reachable & (~reachable + self._dtype(1))
+            out[start : start + len(block)] = np.log2(lowest.astype(np.float64)).astype(np.intp)
+        return out
+
+    def predict_all(self, X: np.ndarray, n_outputs: int | None = None) -> np.ndarray:
+        """Raw ``(n_rows, n_outputs)`` output of the first ``n_outputs`` ensembles (default all).
+
+        Each output is its baseline plus its trees' leaf values in tree order.
+        """
+        n_outputs = len(self.baseline) if n_outputs is None else n_outputs
+        # Trees are grouped by output, so the first n_outputs own a prefix.
+        n_trees = int(np.searchsorted(self.output, n_outputs))
+        leaves = self.leaves(X, n_trees)
+        # Tree t sits in column t + 1. Output k's trees are preceded by one
+        # spare column (column 0, or the last tree of output k - 1, already
+        # summed) that takes its baseline; a running sum then adds the
+        # leaf values strictly in tree order.
+        values = np.empty((len(leaves), n_trees + 1), dtype=np.float64)
+        values[:, 1:] = self._leaf_values[self._leaf_offset[:n_trees] + leaves]
+        bounds = np.searchsorted(self.output[:n_trees], np.arange(n_outputs + 1))
+        totals = np.empty((len(leaves), n_outputs), dtype=np.float64)
+        for k in range(n_outputs):
+            start, stop = bounds[k], bounds[k + 1]
+            values[:, start] = self.baseline[k]
+            totals[:, k] = np.add.accumulate(values[:, start : stop + 1], axis=1)[:, -1]
+        return totals
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Raw output of the first ensemble."""
+        return self.predict_all(X, 1)[:, 0]
+
+
+def main(argv=None) -> None:
+    from . import synthetic
+    from .model import GrossModel
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="artifact directory written by neurocinema.train")
+    parser.add_argument("--check-rows", type=int, default=20_000, help="synthetic films to compare on")
+    args = parser.parse_args(argv)
+
+    model = GrossModel.load(args.model)
+    trees = model.compile_trees()
+    if trees is None:
+        sys.exit("this model's trees cannot be compiled")
+    columns, _ = synthetic.generate(args.check_rows, seed=7)
+    X = model.encode(columns)
+    estimators = [model.estimator, *(model.quantile_estimators if model.interval_offsets is not None else ())]
+    expected = np.column_stack([e.predict(X) for e in estimators])
+    if not np.array_equal(trees.predict_all(X), expected):
+        sys.exit("compiled trees disagree with the estimators; not writing trees/")
+    trees.save(os.path.join(args.model, "trees"))
+    print(json.dumps({"trees": len(trees), "nodes": int(len(trees.value)), "checked_rows": args.check_rows}))
+
+
+if __name__ == "__main__":
+    main()
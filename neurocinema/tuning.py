@@ -0,0 +1,148 @@
+"""Parallel hyperparameter search with successive halving.
+
+Every candidate is scored by K-fold CV on the log-gross target. The first
+round uses a small number of boosting iterations. Each later round keeps
+the best ``1/factor`` of the candidates and multiplies their iteration
+budget by ``factor``, so poor configurations are dropped after only a
+few cheap fits. The winner is the best (candidate, iterations) pair seen
+in any round, so a larger budget that overfits is not preferred.
+
+The encoded matrix, target and fold assignment are written once to
+``.npy`` files. Worker processes memory-map them, so every worker reads
+the same page-cache copy instead of receiving pickled arrays.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+
+DEFAULT_GRID = {
+    "learning_rate": [0.03, 0.1, 0.3],
+    "max_leaf_nodes": [15, 31, 63],
+    "min_samples_leaf": [20, 100],
+    "l2_regularization": [0.0, 1.0],
+}
+
+_worker: dict[str, Any] = {}
+
+
+def write_cache(directory: str, X: np.ndarray, y: np.ndarray, n_folds: int = 5, seed: int = 0) -> str:
+    """Persist the search inputs and a fixed fold assignment for the workers."""
+    os.makedirs(directory, exist_ok=True)
+    folds = np.random.default_rng(seed).permutation(len(y)) % n_folds
+    np.save(os.path.join(directory, "X.npy"), np.ascontiguousarray(X, dtype=np.float32))
+    np.save(os.path.join(directory, "y.npy"), np.asarray(y, dtype=np.float64))
+    np.save(os.path.join(directory, "folds.npy"), folds.astype(np.int8))
+    return directory
+
+
+def _init_worker(cache_dir: str) -> None:
+    from threadpoolctl import threadpool_limits
+
+    # Parallelism comes from the processes; one OpenMP thread per fit avoids
+    # oversubscribing the cores.
+    threadpool_limits(1)
+    folds = np.load(os.path.join(cache_dir, "folds.npy"), mmap_mode="r")
+    _worker["X"] = np.load(os.path.join(cache_dir, "X.npy"), mmap_mode="r")
+    _worker["y"] = np.load(os.path.join(cache_dir, "y.npy"), mmap_mode="r")
+    _worker["splits"] = [(np.flatnonzero(folds != k), np.flatnonzero(folds == k)) for k in range(int(folds.max()) + 1)]
+
+
+def _cv_rmse(task: tuple[dict, int, int]) -> float:
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    params, max_iter, seed = task
+    X, y = _worker["X"], _worker["y"]
+    sq_err, n = 0.0, 0
+    for train, test in _worker["splits"]:
+        model = HistGradientBoostingRegressor(**params, max_iter=max_iter, early_stopping=False, random_state=seed)
+        model.fit(X[train], y[train])
+        residual = model.predict(X[test]) - y[test]
+        sq_err += float(residual @ residual)
+        n += len(test)
+    return math.sqrt(sq_err / n)
+
+
+@dataclass
+class SearchResult:
+    best_params: dict[str, Any]
+    best_rmse: float
+    max_iter: int
+    elapsed: float
+    n_fits: int
+    rounds: list[dict[str, Any]] = field(default_factory=list)
+
+
+def successive_halving(
+    cache_dir: str,
+    grid: Mapping[str, Sequence[Any]] = DEFAULT_GRID,
+    n_jobs: int | None = None,
+    min_iter: int = 25,
+    max_iter: int = 400,
+    factor: int = 3,
+    seed: int = 0,
+) -> SearchResult:
+    """Run the search over every combination in ``grid`` on ``n_jobs`` processes."""
+    names = list(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    n_folds = int(np.load(os.path.join(cache_dir, "folds.npy"), mmap_mode="r").max()) + 1
+    rounds = []
+    budget = min_iter
+    best: tuple[float, dict[str, Any], int] = (math.inf, {}, budget)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(n_jobs or os.cpu_count(), initializer=_init_worker, initargs=(cache_dir,)) as pool:
+        while True:
+            tick = time.perf_counter()
+            scores = list(pool.map(_cv_rmse, [(c, budget, seed) for c in candidates]))
+            i = int(np.argmin(scores))
+            if scores[i] < best[0]:
+                best = (scores[i], candidates[i], budget)
+            rounds.append({
+                "max_iter": budget,
+                "candidates": len(candidates),
+                "best_rmse": min(scores),
+                "seconds": round(time.perf_counter() - tick, 3),
+            })
+            if len(candidates) == 1 or budget >= max_iter:
+                break
+            keep = np.argsort(scores, kind="stable")[: max(1, len(candidates) // factor)]
+            candidates = [candidates[i] for i in keep]
+            budget = min(budget * factor, max_iter)
+    return SearchResult(
+        best_params=best[1],
+        best_rmse=best[0],
+        max_iter=best[2],
+        elapsed=time.perf_counter() - start,
+        n_fits=sum(r["candidates"] for r in rounds) * n_folds,
+        rounds=rounds,
+    )
+
+
+def search(
+    X: np.ndarray,
+    y: np.ndarray,
+    grid: Mapping[str, Sequence[Any]] = DEFAULT_GRID,
+    n_jobs: int | None = None,
+    compare_sequential: bool = False,
+    cache_dir: str | None = None,
+    **kwargs: Any,
+) -> tuple[SearchResult, SearchResult | None]:
+    """Cache ``X``/``y`` and run the search; optionally repeat it on one process.
+
+    Returns ``(parallel, sequential)``, where ``sequential`` is ``None``
+    unless ``compare_sequential`` is set.
+    """
+    with tempfile.TemporaryDirectory(prefix="neurocinema-search-") as tmp:
+        cache_dir = write_cache(cache_dir or tmp, X, y, seed=kwargs.get("seed", 0))
+        parallel = successive_halving(cache_dir, grid, n_jobs, **kwargs)
+        sequential = successive_halving(cache_dir, grid, 1, **kwargs) if compare_sequential else None
+    return parallel, sequential
@@ -0,0 +1,162 @@
+"""Continue training the current model on newly reported films.
+
+    python -m neurocinema.update --registry models/ --dataset data/movies
+    python -m neurocinema.update --model models/current --data weekend.csv --holdout holdout.csv --out models/next
+
+Instead of refitting on the whole history, the new films (the rows
+ingested into ``--dataset`` since the model was fitted, or all of
+``--data``) are split 80/20 and the model gets ``--add-iter`` more boosting
+rounds fitted on the 80%, early-stopped (``GrossModel.continue_training``).
+The new films are encoded with the director & cast track records of the
+films before them; their own results are folded into the talent index
+only after the new model has been written or published, so a run that
+fails before then can simply be repeated.
+
+Before the new model is written or published, a drift check compares it
+with the current one on two holdouts: the other 20% of the new films
+("recent") and earlier films ("reference"): ``--holdout``, or with
+``--dataset`` by default a sample of the rows held out by the last full
+fit. Reference films must already be in the talent index. Without a
+reference holdout nothing is written. If the updated model's log-gross
+RMSE on either holdout is more than ``--tolerance`` (relative) above the
+current model's, nothing is written and the exit status is 1; retrain
+from scratch with ``neurocinema.train`` then. A failed run changes
+nothing, so it can be repeated with other settings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from .data import Dataset, read_csv
+from .model import UPDATE_ITER, GrossModel
+from .registry import ModelRegistry
+from .talent import TalentIndex
+
+# Fewer new films than this cannot fit or check anything meaningful.
+MIN_FILMS = 100
+
+# Reference holdout rows sampled from the last full fit's held-out split.
+REFERENCE_ROWS = 20_000
+
+
+def rmse_log(model: GrossModel, X: np.ndarray, y: np.ndarray) -> float:
+    return float(np.sqrt(np.mean((np.log1p(model.predict_matrix(X)) - y) ** 2)))
+
+
+def drift_check(
+    current: GrossModel, updated: GrossModel, holdouts: dict[str, tuple[np.ndarray, np.ndarray]], tolerance: float
+) -> dict[str, dict]:
+    """Per holdout: both models' log-gross RMSE and whether the update stays within ``tolerance``."""
+    report = {}
+    for name, (X, y) in holdouts.items():
+        before, after = rmse_log(current, X, y), rmse_log(updated, X, y)
+        report[name] = {
+            "rows": len(y),
+            "rmse_log_before": round(before, 5),
+            "rmse_log_after": round(after, 5),
+            "ok": after <= before * (1 + tolerance),
+        }
+    return report
+
+
+def reference_rows(split: dict, seed: int) -> np.ndarray:
+    """A sample of the rows ``GrossModel.fit_matrix`` held out in the last full fit."""
+    from sklearn.model_selection import train_test_split
+
+    _, held_out = train_test_split(np.arange(split["rows"]), test_size=0.2, random_state=split["seed"])
+    if len(held_out) > REFERENCE_ROWS:
+        held_out = np.random.default_rng(seed).choice(held_out, REFERENCE_ROWS, replace=False)
+    return np.sort(held_out)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    current = parser.add_mutually_exclusive_group(required=True)
+    current.add_argument("--registry", metavar="DIR", help="update the registry's current version and publish the result")
+    current.add_argument("--model", help="artifact directory to update (requires --out)")
+    new = parser.add_mutually_exclusive_group(required=True)
+    new.add_argument("--dataset", metavar="DIR", help="dataset the model was trained on, with new films appended")
+    new.add_argument("--data", help="CSV of new films only")
+    parser.add_argument("--holdout", help="CSV of earlier films, already in the talent index, for the reference check")
+    parser.add_argument("--since-row", type=int, help="first new dataset row (default: recorded at the last fit)")
+    parser.add_argument("--out", help="artifact directory to write")
+    parser.add_argument("--talent-index", metavar="DIR", help="override the talent index the model was trained with")
+    parser.add_argument("--talent-updated", action="store_true", help="the new films are already in the talent index")
+    parser.add_argument("--add-iter", type=int, default=UPDATE_ITER, help="most boosting rounds to add")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="allowed relative RMSE increase on a holdout")
+    parser.add_argument("--force", action="store_true", help="write the model even if the drift check fails")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.model and not args.out:
+        parser.error("--model requires --out")
+    if args.data and not args.holdout:
+        parser.error("--data requires --holdout: the drift check needs films from before the update")
+
+    start = time.perf_counter()
+    registry = ModelRegistry(args.registry) if args.registry else None
+    model = registry.load(talent_index=args.talent_index) if registry else GrossModel.load(args.model, args.talent_index)
+    dataset = None
+    if args.dataset:
+        dataset = Dataset(args.dataset)
+        first = args.since_row if args.since_row is not None else model.metrics.get("dataset_rows")
+        if first is None:
+            sys.exit(f"model {model.version} does not record its dataset size; pass --since-row")
+        columns = {f: c[first:] for f, c in dataset.columns().items()}
+        gross = np.asarray(dataset.gross[first:], dtype=np.float64)
+    else:
+        columns, gross = read_csv(args.data)
+    if len(gross) < MIN_FILMS:
+        sys.exit(f"only {len(gross)} new films; need at least {MIN_FILMS}")
+    split = model.metrics.get("holdout_split")
+    if not args.holdout and split is None:
+        sys.exit(f"model {model.version} does not record its holdout split; pass --holdout")
+
+    # Films already in the talent index get out-of-fold track records, as in training.
+    X, y = model.encode(columns, gross if args.talent_updated else None), np.log1p(gross)
+    order = np.random.default_rng(args.seed).permutation(len(y))
+    fit, recent = order[len(y) // 5 :], order[: len(y) // 5]
+    holdouts = {"recent": (X[recent], y[recent])}
+    if args.holdout:
+        reference, reference_gross = read_csv(args.holdout)
+    else:
+        rows = reference_rows(split, args.seed)
+        reference = {f: c[rows] for f, c in dataset.columns().items()}
+        reference_gross = np.asarray(dataset.gross[rows], dtype=np.float64)
+    holdouts["reference"] = (model.encode(reference, reference_gross), np.log1p(reference_gross))
+    X_holdout = np.vstack([X for X, _ in holdouts.values()])
+    y_holdout = np.concatenate([y for _, y in holdouts.values()])
+
+    updated = model.continue_training(X[fit], y[fit], X_holdout, y_holdout, args.add_iter)
+    if dataset is not None:
+        updated.metrics["dataset_rows"] = len(dataset)
+    drift = drift_check(model, updated, holdouts, args.tolerance)
+    report = {
+        "version": updated.version,
+        "updated_from": model.version,
+        "new_films": len(y),
+        "update_s": round(time.perf_counter() - start, 2),
+        "drift": drift,
+    }
+    if not all(check["ok"] for check in drift.values()) and not args.force:
+        print(json.dumps(report))
+        sys.exit(f"drift check failed (tolerance {args.tolerance:.0%}); not writing {updated.version}")
+    if registry:
+        registry.publish(updated)
+        report["registry"] = args.registry
+    else:
+        updated.save(args.out)
+        report["out"] = args.out
+    # Only now: a run that failed to write (e.g. a version already published) must not count the films.
+    if model.talent is not None and not args.talent_updated:
+        TalentIndex(model.talent.directory, writable=True).update(columns, gross)
+    print(json.dumps({**report, **updated.metrics}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from neurocinema import synthetic
+from neurocinema.model import GrossModel
+from neurocinema.talent import TalentIndex
+
+FILM = {
+    "name": "Test Film", "rating": "PG-13", "genre": "action", "year": 2015,
+    "released": "June 12, 2015 (United States)", "score": 7.1, "votes": 150000,
+    "director": "Director 3", "writer": "Writer 2", "star": "Star 5",
+    "country": "United States", "budget": 90000000, "company": "Studio 1", "runtime": 121,
+}
+
+
+def train_tiny(directory, seed: int = 0, rows: int = 3000) -> GrossModel:
+    """A small model with intervals and a talent index under ``directory``, saved to ``directory/model``."""
+    columns, gross = synthetic.generate(rows, seed=seed)
+    talent = TalentIndex.create(str(directory / "index"), columns, gross)
+    model = GrossModel.train(columns, gross, {"max_iter": 40}, seed=seed, talent=talent)
+    model.save(str(directory / "model"))
+    return model
+
+
+@pytest.fixture(scope="session")
+def tiny_model(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tiny")
+    train_tiny(directory)
+    return GrossModel.load(str(directory / "model"))
+
+
+async def http(port: int, method: str, path: str, body: bytes = b"", headers: dict | None = None):
+    """One request on a fresh connection; returns ``(status, headers, body)``."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = {"Host": "test", "Connection": "close", "Content-Length": str(len(body)), **(headers or {})}
+    writer.write(f"{method} {path} HTTP/1.1\r\n".encode() + "".join(f"{k}: {v}\r\n" for k, v in head.items()).encode()
+                 + b"\r\n" + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head_bytes, _, payload = raw.partition(b"\r\n\r\n")
+    lines = head_bytes.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1]) if lines[0] else 0
+    response_headers = {k.lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+    if response_headers.get("transfer-encoding") == "chunked":
+        payload = _dechunk(payload)
+    return status, response_headers, payload
+
+
+def _dechunk(data: bytes) -> bytes:
+    out = b""
+    while data:
+        size, _, data = data.partition(b"\r\n")
+        n = int(size, 16)
+        if n == 0:
+            break
+        out, data = out + data[:n], data[n + 2 :]
+    return out
+
+
+def serve(app, check) -> None:
+    """Run ``await check(port)`` against ``app`` (a ``PredictionServer``) listening on a free port."""
+
+    async def main() -> None:
+        server = await app.serve("127.0.0.1", 0)
+        async with server:
+            await check(server.sockets[0].getsockname()[1])
+
+    asyncio.run(main())
+
+
+def body(payload) -> bytes:
+    return json.dumps(payload).encode()
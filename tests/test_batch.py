@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import io
+import json
+
+import numpy as np
+
+from neurocinema import batch, synthetic
+
+
+def test_explain_encodes_each_chunk_once(tiny_model, monkeypatch):
+    columns, _ = synthetic.generate(300, seed=3)
+    calls = []
+    encode = tiny_model.encode
+    monkeypatch.setattr(tiny_model, "encode", lambda c, gross=None: calls.append(1) or encode(c, gross))
+
+    chunks = [{f: c[lo : lo + 100] for f, c in columns.items()} for lo in range(0, 300, 100)]
+    out = b"".join(data for _, data in batch.score_stream(tiny_model, chunks, "jsonl", explain=True))
+    assert len(calls) == 3
+
+    rows = [json.loads(line) for line in io.BytesIO(out)]
+    assert [r["row"] for r in rows] == list(range(300))
+    expected = tiny_model.predict_matrix(encode(columns))
+    np.testing.assert_allclose([r["gross"] for r in rows], expected.round(2))
+    for row, gross in zip(rows[:20], expected):
+        attributions = row["attributions"]
+        log_gross = attributions["baseLogGross"] + sum(attributions["fields"].values())
+        assert abs(np.expm1(log_gross) - gross) <= 1e-4 * gross + 0.01
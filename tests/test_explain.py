@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import itertools
+from math import factorial
+
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from neurocinema import synthetic
+from neurocinema.explain import TreeExplainer, field_attributions
+from neurocinema.trees import CompiledTrees
+
+N_FEATURES = 4
+
+
+def subset_value(nodes, x: np.ndarray, subset: frozenset) -> float:
+    """Path-dependent expected output of one sklearn tree when only ``subset`` is known."""
+
+    def walk(i: int) -> float:
+        node = nodes[i]
+        if node["is_leaf"]:
+            return float(node["value"])
+        left, right = int(node["left"]), int(node["right"])
+        f = int(node["feature_idx"])
+        if f in subset:
+            value = x[f]
+            goes_left = bool(node["missing_go_to_left"]) if np.isnan(value) else value <= node["num_threshold"]
+            return walk(left if goes_left else right)
+        return (walk(left) * nodes[left]["count"] + walk(right) * nodes[right]["count"]) / node["count"]
+
+    return walk(0)
+
+
+def brute_force_shap(estimator, x: np.ndarray) -> np.ndarray:
+    trees = [predictors[0].nodes for predictors in estimator._predictors]
+    value = {
+        frozenset(s): sum(subset_value(nodes, x, frozenset(s)) for nodes in trees)
+        for r in range(N_FEATURES + 1)
+        for s in itertools.combinations(range(N_FEATURES), r)
+    }
+    phi = np.zeros(N_FEATURES)
+    for i in range(N_FEATURES):
+        for subset, v in value.items():
+            if i in subset:
+                continue
+            weight = factorial(len(subset)) * factorial(N_FEATURES - len(subset) - 1) / factorial(N_FEATURES)
+            phi[i] += weight * (value[subset | {i}] - v)
+    return phi
+
+
+@pytest.fixture(scope="module")
+def estimator():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1500, N_FEATURES))
+    X[rng.random(X.shape) < 0.15] = np.nan
+    filled = np.nan_to_num(X)
+    y = 2 * filled[:, 0] * (filled[:, 1] > 0) + np.sin(filled[:, 2]) + 0.5 * filled[:, 3] + rng.normal(0, 0.1, len(X))
+    return HistGradientBoostingRegressor(max_iter=15, max_leaf_nodes=12, random_state=0).fit(X, y)
+
+
+def rows(seed: int, n: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, N_FEATURES))
+    X[rng.random(X.shape) < 0.25] = np.nan
+    return X
+
+
+def test_attributions_are_exact_shapley_values(estimator):
+    explainer = TreeExplainer(CompiledTrees.from_sklearn(estimator))
+    X = rows(1, 25)
+    values = explainer.shap_values(X)
+    for x, phi in zip(X, values):
+        np.testing.assert_allclose(phi, brute_force_shap(estimator, x), atol=1e-9)
+
+
+def test_attributions_add_up_to_the_prediction(estimator):
+    explainer = TreeExplainer(CompiledTrees.from_sklearn(estimator))
+    X = rows(2, 500)
+    raw = estimator.predict(X)
+    np.testing.assert_allclose(explainer.expected_value + explainer.shap_values(X).sum(axis=1), raw, atol=1e-9)
+    # The expected value is the prediction with nothing known.
+    empty = sum(subset_value(p[0].nodes, X[0], frozenset()) for p in estimator._predictors)
+    assert explainer.expected_value == pytest.approx(float(estimator._baseline_prediction.ravel()[0]) + empty)
+
+    names = ("log_budget", "director_films", "release_month", "genre")
+    fields = field_attributions(explainer, X, names)
+    np.testing.assert_allclose(fields.sum(axis=1), explainer.shap_values(X).sum(axis=1), atol=1e-12)
+
+
+def test_trained_model_attributions_add_up(tiny_model):
+    X = tiny_model.encode(synthetic.generate(200, seed=8)[0])
+    values, base = tiny_model.explain_matrix(X)
+    np.testing.assert_allclose(base + values.sum(axis=1), tiny_model.estimator.predict(X), atol=1e-9)
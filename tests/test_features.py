@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import numpy as np
+from conftest import FILM
+
+from neurocinema import synthetic
+from neurocinema.features import CATEGORICAL_FIELDS, NUMERIC_FEATURES, UNKNOWN, DictColumn, FeatureEncoder, distinct, records_to_columns
+
+
+def test_fit_is_deterministic_and_frequency_ranked():
+    columns = {"genre": ["Drama", "action, comedy", " ACTION ", "drama", "Horror", "action"]}
+    encoder = FeatureEncoder.fit(columns)
+    assert encoder.vocabularies["genre"] == ["action", "drama", "horror"]
+    assert FeatureEncoder.fit({"genre": columns["genre"][::-1]}).vocabularies == encoder.vocabularies
+    assert FeatureEncoder.fit(columns, min_count=2).vocabularies["genre"] == ["action", "drama"]
+
+
+def test_columnar_encoding_matches_row_by_row(tmp_path):
+    columns, _ = synthetic.generate(500, seed=1)
+    encoder = FeatureEncoder.fit({f: c[:250] for f, c in columns.items()})
+    X = encoder.encode(columns)
+    assert X.dtype == np.float32 and X.flags.c_contiguous and X.shape == (500, len(encoder.feature_names))
+
+    rows = [{f: columns[f][i].item() for f in columns} for i in range(0, 500, 25)]
+    single = np.vstack([encoder.encode(records_to_columns([row])) for row in rows])
+    np.testing.assert_array_equal(X[::25], single)
+
+    encoder.save(str(tmp_path / "vocab.json"))
+    np.testing.assert_array_equal(FeatureEncoder.load(str(tmp_path / "vocab.json")).encode(columns), X)
+
+
+def test_dictionary_columns_encode_like_plain_ones():
+    columns, _ = synthetic.generate(300, seed=2)
+    encoder = FeatureEncoder.fit(columns)
+    encoded = {}
+    for field, values in columns.items():
+        if values.dtype.kind in "OU":
+            uniques, inverse = distinct(values)
+            encoded[field] = DictColumn(inverse.astype(np.int32), uniques)
+        else:
+            encoded[field] = values
+    np.testing.assert_array_equal(encoder.encode(encoded), encoder.encode(columns))
+
+
+def test_unknown_and_missing_values():
+    encoder = FeatureEncoder.fit(records_to_columns([FILM]))
+    X = encoder.encode(records_to_columns([{**FILM, "director": "Someone New"}, {"budget": "n/a"}]))
+    names = encoder.feature_names
+    assert X[0, names.index("director")] == UNKNOWN
+    assert X[0, names.index("star")] != UNKNOWN
+    assert np.all(X[1, len(NUMERIC_FEATURES) :] == UNKNOWN) and len(names) == len(NUMERIC_FEATURES) + len(CATEGORICAL_FIELDS)
+    assert np.isfinite(X).all()
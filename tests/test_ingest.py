@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+from conftest import FILM
+
+from neurocinema.data import Dataset
+from neurocinema.ingest import film_keys, ingest
+
+
+def write_jsonl(path, films) -> str:
+    path.write_text("".join(json.dumps(film) + "\n" for film in films))
+    return str(path)
+
+
+def film(i: int, director: str = "Director 3") -> dict:
+    return {**FILM, "name": f"Film {i}", "director": director, "gross": 1e6 + i}
+
+
+def ingest_keys(films) -> np.ndarray:
+    names = np.asarray([f["name"] for f in films], dtype=object)
+    return film_keys(names, np.asarray([float(f["year"]) for f in films]))
+
+
+def snapshot(directory) -> dict:
+    return {path.name: path.read_bytes() for path in directory.iterdir()}
+
+
+def test_failed_append_is_rolled_back(tmp_path):
+    out = tmp_path / "data"
+    ingest(write_jsonl(tmp_path / "a.jsonl", [film(i) for i in range(10)]), str(out), "jsonl", chunk_rows=4)
+    before = snapshot(out)
+
+    # New directors reach the dictionary and rows reach the columns before the bad line.
+    bad = [film(i, f"New {i}") for i in range(10, 20)] + [[1, 2]]
+    with pytest.raises(ValueError):
+        ingest(write_jsonl(tmp_path / "b.jsonl", bad), str(out), "jsonl", chunk_rows=4, append=True)
+    assert snapshot(out) == before
+
+    stats = ingest(write_jsonl(tmp_path / "c.jsonl", [film(i, "Late") for i in range(5, 15)]), str(out), "jsonl",
+                   chunk_rows=4, append=True)
+    assert stats.rows_written == 5 and stats.duplicates == 5
+    dataset = Dataset(str(out))
+    assert len(dataset) == 15
+    assert list(dataset.column("director").dictionary) == ["Director 3", "Late"]
+    assert list(dataset.column("director")[10:].decode()) == ["Late"] * 5
+
+
+def test_interrupted_append_is_cut_back(tmp_path):
+    out = tmp_path / "data"
+    ingest(write_jsonl(tmp_path / "a.jsonl", [film(i) for i in range(3)]), str(out), "jsonl")
+    with open(out / "director.dict", "a") as fh:
+        fh.write("Orphan\nHalf a na")
+    with open(out / "gross.f64", "ab") as fh:
+        fh.write(b"\0" * 12)
+
+    ingest(write_jsonl(tmp_path / "b.jsonl", [film(9, "Next")]), str(out), "jsonl", append=True)
+    dataset = Dataset(str(out))
+    assert len(dataset) == 4
+    assert list(dataset.column("director").dictionary) == ["Director 3", "Next"]
+    assert dataset.gross[-1] == 1e6 + 9
+
+
+def test_keys_are_committed_with_the_schema(tmp_path):
+    out = tmp_path / "data"
+    ingest(write_jsonl(tmp_path / "a.jsonl", [film(i) for i in range(4)]), str(out), "jsonl")
+    schema = json.loads((out / "schema.json").read_text())
+    assert schema["keys"] == "keys-4.npy" and sorted(p.name for p in out.glob("keys*")) == ["keys-4.npy"]
+
+    ingest(write_jsonl(tmp_path / "b.jsonl", [film(i) for i in range(2, 6)]), str(out), "jsonl", append=True)
+    assert sorted(p.name for p in out.glob("keys*")) == ["keys-6.npy"]
+
+
+@pytest.mark.parametrize("damage", ["extra", "missing", "legacy"])
+def test_mismatched_keys_are_rebuilt(tmp_path, damage):
+    out = tmp_path / "data"
+    ingest(write_jsonl(tmp_path / "a.jsonl", [film(i) for i in range(5)]), str(out), "jsonl")
+    schema = json.loads((out / "schema.json").read_text())
+    keys = out / schema["keys"]
+    if damage == "extra":
+        # A crash between the keys and the schema: keys for rows the schema never counted.
+        extra = ingest_keys([film(i) for i in range(5, 8)])
+        np.save(keys, np.union1d(np.load(keys), extra))
+    elif damage == "missing":
+        keys.unlink()
+    else:
+        keys.rename(out / "keys.npy")
+        del schema["keys"]
+        (out / "schema.json").write_text(json.dumps(schema))
+
+    stats = ingest(write_jsonl(tmp_path / "b.jsonl", [film(i) for i in range(3, 8)]), str(out), "jsonl", append=True)
+    assert (stats.rows_written, stats.duplicates) == (3, 2)
+    assert len(Dataset(str(out))) == 8
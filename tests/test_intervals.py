@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import copy
+import math
+
+import numpy as np
+
+from neurocinema import intervals, synthetic
+
+
+def test_calibrated_quantiles_never_cross():
+    rng = np.random.default_rng(0)
+    # Raw quantile models that disagree wildly, as small boosters can far from the data.
+    raw = rng.normal(15, 3, size=(5000, 3))
+    offsets = intervals.calibrate(raw, rng.normal(15, 1, size=5000))
+    adjusted = intervals.adjust(raw, offsets)
+    assert np.all(np.diff(adjusted, axis=1) >= 0)
+    assert np.all(adjusted >= raw + offsets - 1e-12) and np.allclose(adjusted[:, 0], raw[:, 0] + offsets[0])
+
+
+def test_calibration_hits_held_out_coverage():
+    rng = np.random.default_rng(1)
+    y = rng.normal(15, 1, size=20_000)
+    predicted = np.column_stack([np.full(len(y), 15.0)] * 3)  # uncalibrated: every quantile at the median
+    log_q = intervals.adjust(predicted, intervals.calibrate(predicted, y))
+    for j, q in enumerate(intervals.QUANTILES):
+        assert abs(np.mean(y <= log_q[:, j]) - q) < 0.01
+
+
+def test_bucket_probabilities_are_a_distribution():
+    rng = np.random.default_rng(2)
+    p50 = rng.uniform(10, 22, size=1000)
+    log_q = np.column_stack([p50 - rng.uniform(0, 2, 1000), p50, p50 + rng.uniform(0, 2, 1000)])
+    log_q[:10, 0] = log_q[:10, 2] = log_q[:10, 1]  # zero-width intervals
+    probabilities = intervals.bucket_probabilities(log_q)
+    assert probabilities.shape == (1000, len(intervals.REVENUE_THRESHOLDS) + 1)
+    assert np.all(probabilities >= -1e-12)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, atol=1e-12)
+    # Zero-width: all mass in the bucket holding P50.
+    assert np.all(np.isclose(probabilities[:10].max(axis=1), 1.0))
+
+
+def test_split_normal_puts_p10_and_p90_at_their_percentiles():
+    log_q = np.array([[14.0, 15.0, 17.0]])
+    thresholds = np.expm1(log_q[0])  # bucket edges exactly at the three quantiles
+    probabilities = intervals.bucket_probabilities(log_q, thresholds)
+    np.testing.assert_allclose(np.cumsum(probabilities[0])[:3], [0.1, 0.5, 0.9], atol=1e-6)
+    np.testing.assert_allclose(intervals._erf(np.array([0.5, -1.0, 2.0])), [math.erf(0.5), math.erf(-1.0), math.erf(2.0)],
+                               atol=2e-7)
+
+
+def test_compiled_distribution_matches_the_estimators(tiny_model):
+    columns, _ = synthetic.generate(1000, seed=4)
+    X = tiny_model.encode(columns)
+    assert tiny_model.trees is not None
+    uncompiled = copy.copy(tiny_model)
+    uncompiled.trees = None
+    for compiled, reference in zip(tiny_model.predict_distribution_matrix(X), uncompiled.predict_distribution_matrix(X)):
+        np.testing.assert_array_equal(compiled, reference)
+    _, quantiles, probabilities = tiny_model.predict_distribution_matrix(X)
+    assert np.all(np.diff(quantiles, axis=1) >= 0)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, atol=1e-12)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+
+from conftest import FILM, body, http, serve
+
+from neurocinema.metrics import Metrics, SamplingProfiler
+from neurocinema.server import PredictionServer
+
+
+def test_histograms_render_cumulative_prometheus_buckets():
+    metrics = Metrics()
+    for value in (0.0001, 0.003, 0.003, 20.0):
+        metrics.observe("neurocinema_stage_seconds", value, stage="encoding")
+    metrics.inc("neurocinema_http_requests_total", route="/predict", status="200")
+    text = metrics.render()
+    assert "# TYPE neurocinema_stage_seconds histogram" in text
+    assert 'neurocinema_stage_seconds_bucket{stage="encoding",le="0.0001"} 1' in text
+    assert 'neurocinema_stage_seconds_bucket{stage="encoding",le="0.0025"} 1' in text
+    assert 'neurocinema_stage_seconds_bucket{stage="encoding",le="0.005"} 3' in text
+    assert 'neurocinema_stage_seconds_bucket{stage="encoding",le="+Inf"} 4' in text
+    assert 'neurocinema_stage_seconds_count{stage="encoding"} 4' in text
+    assert 'neurocinema_http_requests_total{route="/predict",status="200"} 1' in text
+
+
+def test_nested_stages_restore_the_outer_stage():
+    metrics = Metrics()
+    with metrics.stage("encoding"):
+        with metrics.stage("similar"):
+            assert metrics.active[threading.get_ident()] == "similar"
+        assert metrics.active[threading.get_ident()] == "encoding"
+    assert threading.get_ident() not in metrics.active
+    assert metrics.histogram("neurocinema_stage_seconds", stage="similar").count == 1
+
+
+def test_profiler_samples_threads_inside_a_stage():
+    metrics = Metrics()
+    done = threading.Event()
+
+    def busy_inference():
+        with metrics.stage("inference"):
+            while not done.is_set():
+                sum(range(1000))
+
+    worker = threading.Thread(target=busy_inference)
+    worker.start()
+    try:
+        time.sleep(0.02)
+        samples = SamplingProfiler(metrics, hz=200).run(0.2)
+    finally:
+        done.set()
+        worker.join()
+    assert samples and all(stack.startswith("inference;") for stack in samples)
+    assert any("busy_inference" in stack for stack in samples)
+    assert re.fullmatch(r"(inference;\S.* \d+\n)+", SamplingProfiler.folded(samples))
+
+
+def test_predict_is_timed_per_stage(tiny_model):
+    app = PredictionServer(tiny_model)
+
+    async def check(port):
+        for _ in range(2):
+            await http(port, "POST", "/predict?explain=1", body(FILM))
+        status, headers, payload = await http(port, "GET", "/metrics")
+        assert status == 200 and headers["content-type"].startswith("text/plain")
+        text = payload.decode()
+        for stage in ("validation", "cache_lookup", "encoding", "inference", "explain", "serialization"):
+            count = re.search(rf'neurocinema_stage_seconds_count{{stage="{stage}"}} (\d+)', text)
+            assert count, stage
+        assert 'neurocinema_predictions_total{cache="hit"} 1' in text
+        assert 'neurocinema_predictions_total{cache="miss"} 1' in text
+        assert f'neurocinema_model_info{{version="{tiny_model.version}"}} 1' in text
+
+    serve(app, check)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import threading
+
+import pytest
+from conftest import FILM, body, http, serve
+
+from neurocinema.cache import PredictionCache
+from neurocinema.microbatch import MicroBatcher, Overloaded
+from neurocinema.server import PredictionServer
+
+
+def test_coalesced_results_reach_their_callers():
+    sizes = []
+
+    def score(items):
+        sizes.append(len(items))
+        return [item * 10 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(score, window=0.005, max_rows=16)
+
+        async def caller(i):
+            await asyncio.sleep(random.random() * 0.02)
+            return i, await batcher.submit(i)
+
+        async def gives_up():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(batcher.submit(-1), 0.001)
+
+        try:
+            results = await asyncio.gather(*(caller(i) for i in random.Random(0).sample(range(200), 200)), gives_up())
+        finally:
+            await batcher.close()
+        return results[:-1]
+
+    random.seed(1)
+    results = asyncio.run(main())
+    assert all(result == i * 10 for i, result in results)
+    assert sum(sizes) in (200, 201) and len(sizes) < 200 and max(sizes) <= 16
+
+
+def test_full_queue_raises_overloaded():
+    release = threading.Event()
+
+    def score(items):
+        release.wait(5)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(score, window=0.0, max_queue=2)
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.05)  # now being scored; the next two wait in the queue
+        queued = [asyncio.ensure_future(batcher.submit(i)) for i in (1, 2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await batcher.submit(3)
+        release.set()
+        results = await asyncio.gather(first, *queued)
+        await batcher.close()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == [0, 1, 2]
+    assert stats["rejected"] == 1
+
+
+def test_server_answers_503_with_retry_after_when_the_queue_is_full(tiny_model):
+    release = threading.Event()
+    app = PredictionServer(tiny_model, cache=PredictionCache(0), batch_window=0.001, queue_size=2)
+    score = app.batcher.score
+    app.batcher.score = lambda items: release.wait(5) and score(items)
+
+    async def check(port):
+        films = [{**FILM, "budget": 1e6 * (i + 1)} for i in range(6)]
+        first = asyncio.ensure_future(http(port, "POST", "/predict", body(films[0])))
+        await asyncio.sleep(0.2)
+        rest = [asyncio.ensure_future(http(port, "POST", "/predict", body(film))) for film in films[1:]]
+        await asyncio.sleep(0.2)
+        release.set()
+        responses = await asyncio.gather(first, *rest)
+        statuses = sorted(status for status, _, _ in responses)
+        assert statuses == [200, 200, 200, 503, 503, 503]
+        for status, headers, payload in responses:
+            if status == 503:
+                assert headers["retry-after"] == "1"
+            else:
+                assert json.loads(payload)["gross"] > 0
+
+    serve(app, check)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from conftest import FILM, body, http, serve, train_tiny
+
+from neurocinema.registry import ModelRegistry
+from neurocinema.server import PredictionServer
+
+REQUESTS = 300
+
+
+def test_reload_under_load(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "models"))
+    for seed, version in enumerate(("v1", "v2")):
+        model = train_tiny(tmp_path / version, seed=seed, rows=2000)
+        model.version = version
+        registry.publish(model, activate=version == "v1")
+    app = PredictionServer(registry.load(), batch_window=0.002, registry=registry, reload_interval=0.01)
+
+    async def check(port):
+        async def predict(i: int):
+            film = {**FILM, "budget": 1e6 * (1 + i % 50)}
+            path = "/predict?explain=1" if i % 5 == 0 else "/predict"
+            status, _, payload = await http(port, "POST", path, body({"movieData": film}))
+            return status, json.loads(payload)
+
+        first = asyncio.gather(*(predict(i) for i in range(REQUESTS)))
+        await asyncio.sleep(0.01)
+        registry.activate("v2")
+        results = await first
+        for _ in range(200):
+            if app.model.version == "v2":
+                break
+            await asyncio.sleep(0.01)
+        results += await asyncio.gather(*(predict(i) for i in range(REQUESTS // 3)))
+
+        assert all(status == 200 for status, _ in results), [r for r in results if r[0] != 200][:3]
+        versions = [payload["modelVersion"] for _, payload in results]
+        assert set(versions) <= {"v1", "v2"}
+        assert all("attributions" in payload for _, payload in results[::5])
+        assert versions[-(REQUESTS // 3) :] == ["v2"] * (REQUESTS // 3)
+        assert app.reloads == 1
+        # The swapped-in model was fully warmed before it took traffic.
+        assert app.model._explainer is not None
+
+    serve(app, check)
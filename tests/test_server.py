@@ -0,0 +1,118 @@
+import copy
+import json
+
+from conftest import FILM, body, http, serve
+
+from neurocinema.cache import PredictionCache, canonical_key
+from neurocinema.server import PredictionServer
+
+
+def test_predict(tiny_model):
+    async def check(port):
+        status, headers, payload = await http(port, "POST", "/predict", body({"movieData": FILM}))
+        assert status == 200
+        assert headers["access-control-allow-origin"] == "*"
+        assert json.loads(payload)["gross"] > 0
+
+    serve(PredictionServer(tiny_model), check)
+
+
+def test_unexpected_errors_get_a_500_with_cors(tiny_model, monkeypatch):
+    app = PredictionServer(tiny_model, batch_window=0.001)
+
+    def broken(items):
+        raise RuntimeError("scoring failed")
+
+    monkeypatch.setattr(app, "score_movies", broken)
+    app.batcher.score = broken
+
+    async def check(port):
+        status, headers, payload = await http(port, "POST", "/predict", body(FILM))
+        assert status == 500
+        assert json.loads(payload) == {"error": "internal server error"}
+        assert headers["access-control-allow-origin"] == "*"
+        # The server keeps answering afterwards.
+        status, _, _ = await http(port, "GET", "/health")
+        assert status == 200
+
+    serve(app, check)
+
+
+def test_bad_requests_get_a_4xx(tiny_model):
+    async def check(port):
+        status, _, _ = await http(port, "POST", "/predict", b"{}", {"Content-Length": "abc"})
+        assert status == 400
+        status, _, _ = await http(port, "POST", "/predict/batch?format=jsonl", b'{"name": "a"}\n[1, 2]\n')
+        assert status == 400
+        status, _, _ = await http(port, "GET", "/debug/profile?hz=0")
+        assert status == 400
+
+    serve(PredictionServer(tiny_model, profile=True), check)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PredictionCache(max_entries=2)
+    cache.put("v1", b"a", 1)
+    cache.put("v1", b"b", 2)
+    assert cache.get("v1", b"a") == 1  # b is now the least recently used
+    cache.put("v1", b"c", 3)
+    assert cache.get("v1", b"b") is None
+    assert (cache.get("v1", b"a"), cache.get("v1", b"c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1 and len(cache) == 2
+
+
+def test_cache_entries_expire():
+    clock = Clock()
+    cache = PredictionCache(ttl=10.0, clock=clock)
+    cache.put("v1", b"a", 1)
+    clock.now = 9.9
+    assert cache.get("v1", b"a") == 1
+    clock.now = 10.0
+    assert cache.get("v1", b"a") is None
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
+
+
+def test_cache_is_dropped_on_a_new_model_version():
+    cache = PredictionCache()
+    cache.put("v1", b"a", 1)
+    assert cache.get("v2", b"a") is None
+    assert cache.stats()["invalidations"] == 1 and cache.version == "v2"
+    cache.put("v2", b"a", 2)
+    assert cache.get("v2", b"a") == 2
+
+
+def test_cache_key_ignores_formatting_and_name():
+    key = canonical_key(FILM)
+    assert canonical_key({**FILM, "name": "Other", "director": "  director   3 ", "budget": "90000000"}) == key
+    assert canonical_key({**FILM, "budget": 1}) != key
+
+
+def test_server_cache_hits_and_reload_invalidation(tiny_model):
+    app = PredictionServer(tiny_model)
+
+    async def check(port):
+        renamed = {**FILM, "name": "Same Film, Other Title"}
+        first = await http(port, "POST", "/predict", body({"movieData": FILM}))
+        second = await http(port, "POST", "/predict", body({"movieData": renamed}))
+        assert (first[1]["x-cache"], second[1]["x-cache"]) == ("miss", "hit")
+        assert first[2] == second[2]
+        explained = await http(port, "POST", "/predict?explain=1", body(FILM))
+        assert explained[1]["x-cache"] == "miss"
+
+        app.model = copy.copy(tiny_model)
+        app.model.version = "next"
+        third = await http(port, "POST", "/predict", body(FILM))
+        assert third[1]["x-cache"] == "miss"
+        assert json.loads(third[2])["modelVersion"] == "next"
+        _, _, health = await http(port, "GET", "/health")
+        assert json.loads(health)["cache"]["invalidations"] == 1
+
+    serve(app, check)
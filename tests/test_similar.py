@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+from conftest import FILM, body, http, serve
+
+from neurocinema import synthetic
+from neurocinema.server import PredictionServer
+from neurocinema.similar import SimilarFilms
+from neurocinema.talent import TalentIndex
+
+
+def build(tmp_path, rows: int = 3000):
+    columns, gross = synthetic.generate(rows, seed=6)
+    talent = TalentIndex.create(str(tmp_path / "talent"), columns, gross)
+    return SimilarFilms.build(str(tmp_path / "similar"), columns, gross, talent), columns, talent
+
+
+def exact(index: SimilarFilms, query: np.ndarray, k: int) -> np.ndarray:
+    distances = ((np.asarray(index.vectors, dtype=np.float64) - query) ** 2).sum(axis=1)
+    return np.sort(distances)[:k]
+
+
+def test_ivf_search_matches_brute_force(tmp_path):
+    index, columns, talent = build(tmp_path)
+    queries = index.embedding({f: c[:50] for f, c in columns.items()}, talent)
+
+    index.nprobe = len(index.centroids)  # every list: exact
+    for query in queries:
+        _, distances = index.search(query, 10)
+        np.testing.assert_allclose(distances, exact(index, query, 10), rtol=1e-4, atol=1e-4)
+
+    index.nprobe = 8
+    recall = np.mean([
+        np.mean(index.search(query, 10)[1] <= exact(index, query, 10)[-1] + 1e-4) for query in queries
+    ])
+    assert recall >= 0.9
+
+
+def test_a_historical_film_finds_itself_first(tmp_path):
+    index, columns, talent = build(tmp_path)
+    rows = [5, 500, 2500]
+    results = index.similar({f: c[rows] for f, c in columns.items()}, talent, k=3)
+    for row, neighbours in zip(rows, results):
+        assert len(neighbours) == 3
+        assert neighbours[0]["distance"] < 1e-3
+        assert neighbours[0]["name"] == str(columns["name"][row])
+        assert [n["distance"] for n in neighbours] == sorted(n["distance"] for n in neighbours)
+    reopened = SimilarFilms(index.directory)
+    assert len(reopened) == 3000 and reopened.similar({f: c[rows] for f, c in columns.items()}, talent, k=3) == results
+
+
+def test_predict_includes_similar_films(tmp_path, tiny_model):
+    index, _, _ = build(tmp_path, rows=500)
+
+    async def check(port):
+        status, _, payload = await http(port, "POST", "/predict", body({"movieData": FILM}))
+        assert status == 200
+        similar = json.loads(payload)["similar"]
+        assert len(similar) == 10 and {"name", "gross", "distance"} <= set(similar[0])
+
+    serve(PredictionServer(tiny_model, similar=index), check)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import pytest
+from conftest import FILM, body, http, serve
+
+from neurocinema import sweep
+from neurocinema.schema import ValidationError, validate
+from neurocinema.server import PredictionServer
+
+
+def test_sweep_grid(tiny_model):
+    result = sweep.sweep(tiny_model, validate(FILM), {"budget": {"start": 1e6, "stop": 1e8, "num": 3, "scale": "log"},
+                                                      "runtime": [90, 120]})
+    assert len(result["gross"]) == 3 and len(result["gross"][0]) == 2
+
+
+@pytest.mark.parametrize("axes", [
+    {"budget": {"start": 1, "stop": 2, "num": 1e12}},
+    {"budget": {"start": 1, "stop": 2, "num": float("inf")}},
+    {"budget": {"start": 1, "stop": 2, "num": 1000}, "runtime": {"start": 1, "stop": 2, "num": 1000}},
+    {"budget": {"start": 1, "stop": 2, "num": -5}},
+    {"budget": {"start": 0, "stop": 2, "num": 5, "scale": "log"}},
+    {"budget": {"start": 1, "stop": 2, "num": 5, "scale": "logarithmic"}},
+    {"budget": {"start": 1, "stop": 2, "num": 5, "scale": None}},
+])
+def test_oversized_or_malformed_axes_are_rejected(tiny_model, monkeypatch, axes):
+    def no_allocation(*args, **kwargs):
+        raise AssertionError("grid allocated")
+
+    monkeypatch.setattr(sweep, "variant_columns", no_allocation)
+    with pytest.raises(ValidationError):
+        sweep.sweep(tiny_model, validate(FILM), axes)
+
+
+def test_oversized_sweep_gets_a_422(tiny_model):
+    async def check(port):
+        request = {"movieData": FILM, "sweep": {"budget": {"start": 1, "stop": 2, "num": 1e12}}}
+        status, _, payload = await http(port, "POST", "/predict/sweep", body(request))
+        assert status == 422 and b"limited" in payload
+
+    serve(PredictionServer(tiny_model), check)
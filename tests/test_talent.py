@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import threading
+
+import numpy as np
+
+from neurocinema import talent
+from neurocinema.talent import TalentIndex
+
+
+def films(names: list[str], gross: float) -> tuple[dict, np.ndarray]:
+    n = len(names)
+    columns = {"director": names, "star": names, "writer": names, "company": names, "year": [2010] * n}
+    return columns, np.full(n, gross)
+
+
+def test_rebuild_under_an_open_reader(tmp_path, monkeypatch):
+    monkeypatch.setattr(talent, "REFRESH_INTERVAL", 0.0)
+    directory = str(tmp_path / "index")
+    TalentIndex.create(directory, *films([f"Old {i}" for i in range(50)], 1e6))
+    reader = TalentIndex(directory)
+    assert reader.lookup("director", "Old 49")["films"] == 1
+
+    # Fewer, different names: an in-place rebuild would leave the reader with stale rows.
+    TalentIndex.create(directory, *films(["New 0", "New 1"], 5e7))
+    assert reader.lookup("director", "Old 49") == {"films": 0}
+    assert reader.lookup("director", "New 1")["films"] == 1
+    features = reader.features(films(["New 0", "Old 3"], 0.0)[0])
+    assert features.shape[0] == 2 and np.any(features[0] != features[1])
+
+    TalentIndex.create(directory, *films(["Newer"], 1e6))
+    generations = sorted(name for name in os.listdir(directory) if name.startswith("gen-"))
+    assert len(generations) == 2
+    assert reader.lookup("director", "Newer")["films"] == 1
+
+
+def test_legacy_layout_is_read_and_replaced(tmp_path):
+    directory = tmp_path / "index"
+    TalentIndex.create(str(directory), *films(["A", "B"], 1e6))
+    generation = (directory / talent.POINTER).read_text().strip()
+    for path in (directory / generation).iterdir():
+        path.rename(directory / path.name)
+    (directory / generation).rmdir()
+    (directory / talent.POINTER).unlink()
+
+    assert TalentIndex(str(directory)).lookup("star", "B")["films"] == 1
+    TalentIndex.create(str(directory), *films(["C"], 1e6))
+    TalentIndex.create(str(directory), *films(["D"], 1e6))
+    assert not list(directory.glob("*.keys"))
+    assert TalentIndex(str(directory)).lookup("star", "D")["films"] == 1
+
+
+def test_concurrent_refreshes_read_each_append_once(tmp_path):
+    directory = str(tmp_path / "index")
+    writer = TalentIndex.create(directory, *films(["A"], 1e6))
+    reader = TalentIndex(directory)
+    writer.update(*films([f"N {i}" for i in range(2000)], 1e6))
+
+    threads = [threading.Thread(target=reader.refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    field = reader._fields["director"]
+    assert len(field.names) == len(field.rows) == 2001
+    assert field.rows == writer._fields["director"].rows
+
+
+def test_training_counts_match_serving_scale(tmp_path):
+    names = [f"Director {i % 37}" for i in range(1000)]
+    columns, gross = films(names, 1e6)
+    gross = gross * np.linspace(1, 100, len(gross))
+    index = TalentIndex.create(str(tmp_path / "index"), columns, gross)
+
+    training, serving = index.features(columns, gross), index.features(columns)
+    # Counts leave out only the film itself, as a new film with the same talent would see them.
+    np.testing.assert_array_equal(training[:, 0], serving[:, 0] - 1)
+    # Means stay out-of-fold: no film's own gross is in its feature.
+    leave_one_out = (serving[:, 1] * serving[:, 0] - np.log1p(gross)) / (serving[:, 0] - 1)
+    assert not np.allclose(training[:, 1], leave_one_out)
+    assert np.isfinite(training[:, 1]).all()
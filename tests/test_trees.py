@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from neurocinema import synthetic
+from neurocinema.trees import CompiledTrees
+
+
+def awkward_rows(rng, n: int, n_features: int) -> np.ndarray:
+    """Rows with missing values, infinities and values sitting on split thresholds."""
+    X = rng.normal(size=(n, n_features))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    X[rng.random(X.shape) < 0.02] = np.inf
+    X[rng.random(X.shape) < 0.02] = -np.inf
+    return X
+
+
+@pytest.fixture(scope="module")
+def estimators():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 5))
+    X[rng.random(X.shape) < 0.1] = np.nan  # so splits learn a direction for missing values
+    y = np.nan_to_num(X[:, 0]) * 2 + np.sin(np.nan_to_num(X[:, 1])) + rng.normal(scale=0.1, size=len(X))
+    point = HistGradientBoostingRegressor(max_iter=30, random_state=0).fit(X, y)
+    quantiles = [
+        HistGradientBoostingRegressor(loss="quantile", quantile=q, max_iter=20, random_state=0).fit(X, y)
+        for q in (0.1, 0.9)
+    ]
+    return point, quantiles
+
+
+def test_matches_sklearn_bit_for_bit(estimators):
+    point, _ = estimators
+    X = awkward_rows(np.random.default_rng(1), 5000, 5)
+    # Exact thresholds, just either side of them, and the features' extremes.
+    thresholds = point._predictors[0][0].nodes["num_threshold"][:5]
+    X[: len(thresholds), 0] = thresholds
+    X[len(thresholds) : 2 * len(thresholds), 0] = np.nextafter(thresholds, np.inf)
+    np.testing.assert_array_equal(CompiledTrees.from_sklearn(point).predict(X), point.predict(X))
+
+
+def test_float32_input(estimators):
+    point, _ = estimators
+    X = awkward_rows(np.random.default_rng(2), 1000, 5).astype(np.float32)
+    np.testing.assert_array_equal(CompiledTrees.from_sklearn(point).predict(X), point.predict(X))
+
+
+def test_stacked_quantile_models(estimators):
+    point, quantiles = estimators
+    X = awkward_rows(np.random.default_rng(3), 3000, 5)
+    stacked = CompiledTrees.stack([CompiledTrees.from_sklearn(e) for e in (point, *quantiles)])
+    expected = np.column_stack([e.predict(X) for e in (point, *quantiles)])
+    np.testing.assert_array_equal(stacked.predict_all(X), expected)
+    np.testing.assert_array_equal(stacked.predict_all(X, 1)[:, 0], point.predict(X))
+
+
+def test_saved_and_loaded(estimators, tmp_path):
+    point, quantiles = estimators
+    X = awkward_rows(np.random.default_rng(4), 1000, 5)
+    CompiledTrees.stack([CompiledTrees.from_sklearn(e) for e in (point, *quantiles)]).save(str(tmp_path / "trees"))
+    loaded = CompiledTrees.load(str(tmp_path / "trees"))
+    np.testing.assert_array_equal(loaded.predict_all(X), np.column_stack([e.predict(X) for e in (point, *quantiles)]))
+
+
+def test_trained_model(tiny_model):
+    columns, _ = synthetic.generate(500, seed=9)
+    X = tiny_model.encode(columns)
+    X[::7, 0] = np.nan
+    trees = tiny_model.compile_trees()
+    expected = np.column_stack([e.predict(X) for e in (tiny_model.estimator, *tiny_model.quantile_estimators)])
+    np.testing.assert_array_equal(trees.predict_all(X), expected)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from neurocinema import tuning
+
+
+def data(n: int = 600):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 4))
+    y = 3 * X[:, 0] + np.sin(2 * X[:, 1]) + rng.normal(scale=0.1, size=n)
+    return X, y
+
+
+def test_successive_halving(tmp_path):
+    X, y = data()
+    grid = {"learning_rate": [0.001, 0.1, 0.3], "max_leaf_nodes": [7, 15], "min_samples_leaf": [20]}
+    parallel, sequential = tuning.search(
+        X, y, grid, n_jobs=2, compare_sequential=True, cache_dir=str(tmp_path), min_iter=5, max_iter=45, factor=3
+    )
+    assert [r["candidates"] for r in parallel.rounds] == [6, 2, 1]
+    assert [r["max_iter"] for r in parallel.rounds] == [5, 15, 45]
+    assert parallel.n_fits == (6 + 2 + 1) * 5
+    # A learning rate this small cannot get anywhere in the budget.
+    assert parallel.best_params["learning_rate"] != 0.001
+    # Same folds and seeds: the process pool changes nothing but the wall time.
+    assert (parallel.best_params, parallel.best_rmse, parallel.max_iter) == (
+        sequential.best_params, sequential.best_rmse, sequential.max_iter
+    )
+
+    with ProcessPoolExecutor(1, initializer=tuning._init_worker, initargs=(str(tmp_path),)) as pool:
+        rescored = pool.submit(tuning._cv_rmse, (parallel.best_params, parallel.max_iter, 0)).result()
+    assert rescored == parallel.best_rmse
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import csv
+
+import numpy as np
+import pytest
+import sklearn
+from conftest import train_tiny
+
+from neurocinema import model as model_module
+from neurocinema import synthetic, talent, update
+from neurocinema.registry import ModelRegistry
+from neurocinema.schema import FIELDS
+from neurocinema.talent import TalentIndex
+
+
+def write_csv(path, columns, gross) -> str:
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow([*FIELDS, "gross"])
+        writer.writerows(zip(*(np.asarray(columns[f]).tolist() for f in FIELDS), np.asarray(gross).tolist()))
+    return str(path)
+
+
+@pytest.fixture
+def setup(tmp_path):
+    model = train_tiny(tmp_path, rows=2000)
+    model.version = "base"  # versions are timestamps; the update may land in the same second
+    registry = ModelRegistry(str(tmp_path / "models"))
+    registry.publish(model)
+    history, history_gross = synthetic.generate(2000, seed=0)
+    new, new_gross = synthetic.generate(300, seed=5)
+    holdout = write_csv(tmp_path / "holdout.csv", {f: c[:300] for f, c in history.items()}, history_gross[:300])
+    return registry, write_csv(tmp_path / "new.csv", new, new_gross), holdout, str(tmp_path / "index")
+
+
+def films_indexed(directory: str) -> float:
+    return float(TalentIndex(directory)._fields["company"].stats[:, talent.COUNT].sum())
+
+
+def test_data_needs_a_reference_holdout(setup):
+    registry, new, _, _ = setup
+    with pytest.raises(SystemExit) as exc:
+        update.main(["--registry", registry.root, "--data", new])
+    assert exc.value.code == 2
+    assert len(registry.versions()) == 1
+
+
+def test_talent_index_is_updated_after_publishing(setup, monkeypatch):
+    registry, new, holdout, index = setup
+    before = films_indexed(index)
+    args = ["--registry", registry.root, "--data", new, "--holdout", holdout, "--force"]
+
+    def duplicate(self, model, activate=True):
+        raise ValueError(f"version {model.version} is already published")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ModelRegistry, "publish", duplicate)
+        with pytest.raises(ValueError):
+            update.main(args)
+    assert films_indexed(index) == before
+
+    update.main(args)
+    assert len(registry.versions()) == 2
+    assert films_indexed(index) == before + 300
+
+
+def test_added_rounds_are_the_base_plus_a_correction(setup):
+    registry, _, _, _ = setup
+    estimator = registry.load().estimator
+    # The smallest update allowed: 80 films fit, of which early stopping holds out 16.
+    new, new_gross = synthetic.generate(update.MIN_FILMS, seed=5)
+    X, y = registry.load().encode(new), np.log1p(new_gross)
+    X_fit, y_fit = X[: len(y) * 4 // 5], y[: len(y) * 4 // 5]
+
+    combined = model_module._add_rounds(estimator, X_fit, y_fit, 20)
+    correction = model_module._correction(estimator, X_fit, y_fit, 20)
+    np.testing.assert_allclose(combined.predict(X), estimator.predict(X) + correction.predict(X), rtol=0, atol=1e-9)
+    added = combined._predictors[estimator.n_iter_ :]
+    assert len(added) == correction.n_iter_ and all(tree.get_n_leaf_nodes() > 1 for (tree,) in added)
+
+
+def test_untested_sklearn_is_refused(setup, monkeypatch):
+    registry, _, _, _ = setup
+    model = registry.load()
+    monkeypatch.setattr(sklearn, "__version__", "2.0.0")
+    new, new_gross = synthetic.generate(update.MIN_FILMS, seed=5)
+    X, y = model.encode(new), np.log1p(new_gross)
+    with pytest.raises(RuntimeError, match="retrain"):
+        model.continue_training(X, y, X, y)